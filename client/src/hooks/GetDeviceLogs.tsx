@@ -11,6 +11,12 @@ export interface DeviceLog {
   device?: string;
 }
 
+// Newest-first page of logs; `next` is null on the last page
+interface Page<T> {
+  next: string | null;
+  results: T[];
+}
+
 /**
  * Hook to fetch logs for a given device id (UUID string).
  * Pass `deviceId` (string) and the hook will fetch when it's available.
@@ -35,8 +41,8 @@ const useDeviceLogs = (deviceId?: string) => {
         const base = process.env.REACT_APP_API_BASE_URL || '';
         // ensure trailing slash to avoid redirects
         const url = `${base}/api/v1/devices/${deviceId}/logs/`;
-        const response = await axios.get<DeviceLog[]>(url);
-        if (!cancelled) setDeviceLogs(response.data);
+        const response = await axios.get<Page<DeviceLog>>(url);
+        if (!cancelled) setDeviceLogs(response.data.results);
       } catch (err: any) {
         const msg =
           err?.response?.data?.detail ||
@@ -15,6 +15,12 @@ interface ApiDevice {
   category?: { id: number; name: string; icon?: string } | null;
 }
 
+// List endpoints are keyset-paginated: follow `next` until it is null
+interface Page<T> {
+  next: string | null;
+  results: T[];
+}
+
 // Simplified shape that the UI components may expect
 export interface Device {
   id: number;
@@ -38,12 +44,18 @@ const GetDevices = () => {
         const rawBase = process.env.REACT_APP_API_BASE_URL || '';
         const base = rawBase.replace(/\/$/, '');
         console.log('Fetching devices from API at', `${base}/api/v1/devices/`);
-        const response = await axios.get<ApiDevice[]>(
-          `${base}/api/v1/devices/`,
-        );
+        const apiDevices: ApiDevice[] = [];
+        let url: string | null = `${base}/api/v1/devices/`;
+        while (url) {
+          const response: { data: Page<ApiDevice> } = await axios.get<
+            Page<ApiDevice>
+          >(url);
+          apiDevices.push(...response.data.results);
+          url = response.data.next;
+        }
 
         // Map API shape to the simplified UI shape (keeps TS types correct)
-        const mapped: Device[] = response.data.map((d) => ({
+        const mapped: Device[] = apiDevices.map((d) => ({
           id: d.id,
           name: d.name,
           type: d.device_type,
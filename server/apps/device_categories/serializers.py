@@ -10,6 +10,10 @@ class DeviceCategorySerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'icon', 'device_count')
 
     def get_device_count(self, obj):
+        # annotated by DeviceCategoryViewSet / plan_device_queryset
+        annotated = getattr(obj, 'num_devices', None)
+        if annotated is not None:
+            return annotated
         devices_attr = getattr(obj, 'devices', None)
         if devices_attr is None:
             return 0
@@ -1,11 +1,16 @@
+from django.db.models import Count
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
 
 from server.apps.device_categories.models import DeviceCategory
+from server.caching import ResponseCacheMixin
+from server.pagination import NameKeysetPagination
 from .serializers import DeviceCategorySerializer
 
 
-class DeviceCategoryViewSet(viewsets.ModelViewSet):
-    queryset = DeviceCategory.objects.all().order_by('name')
+class DeviceCategoryViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
+    queryset = DeviceCategory.objects.annotate(num_devices=Count('devices')).order_by('name')
     serializer_class = DeviceCategorySerializer
     permission_classes = [AllowAny]
+    cache_resource = 'device_categories'
+    pagination_class = NameKeysetPagination
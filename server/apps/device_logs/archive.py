@@ -0,0 +1,100 @@
+"""Monthly gzip NDJSON segments of expired DeviceLog rows.
+
+Each month of log history is one file, ``device_logs-YYYY-MM.ndjson.gz``,
+under ``DEVICE_LOG_RETENTION['ARCHIVE_DIR']``. Every retention chunk is
+appended as a new gzip member; gzip readers see members as one stream, so a
+segment never has to be rewritten.
+
+Rows are archived before they are deleted. A run interrupted between the two
+archives the same rows again on the next run, into the same month segment;
+``read_archive`` drops the duplicates by id, one segment at a time.
+"""
+
+import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+SEGMENT_PREFIX = 'device_logs-'
+SEGMENT_SUFFIX = '.ndjson.gz'
+
+
+def archive_dir():
+    directory = settings.DEVICE_LOG_RETENTION.get('ARCHIVE_DIR')
+    return Path(directory) if directory else None
+
+
+def segment_path(directory, month):
+    return Path(directory) / f'{SEGMENT_PREFIX}{month:%Y-%m}{SEGMENT_SUFFIX}'
+
+
+def _month(moment):
+    moment = moment.astimezone(datetime.timezone.utc)
+    return datetime.date(moment.year, moment.month, 1)
+
+
+def _record(log):
+    return {
+        'id': str(log.pk),
+        'device_id': str(log.device_id),
+        'action': log.action,
+        'old_value': log.old_value,
+        'new_value': log.new_value,
+        'timestamp': log.timestamp.isoformat(),
+    }
+
+
+def append_logs(logs, directory):
+    """Append DeviceLog rows to their month segments and fsync them."""
+    by_month = {}
+    for log in logs:
+        by_month.setdefault(_month(log.timestamp), []).append(log)
+
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for month, rows in by_month.items():
+        lines = ''.join(json.dumps(_record(log), separators=(',', ':')) + '\n' for log in rows)
+        with open(segment_path(directory, month), 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as segment:
+                segment.write(lines.encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def _months(start, end):
+    month, last = _month(start), _month(end)
+    while month <= last:
+        yield month
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def read_archive(start, end, device_id=None, action=None, directory=None):
+    """Yield archived records with ``start <= timestamp < end``.
+
+    Only the segments of the months overlapping the range are opened. Records
+    come out in archive order (roughly chronological per segment).
+    """
+    directory = directory or archive_dir()
+    if directory is None:
+        return
+    device_id = str(device_id) if device_id is not None else None
+    for month in _months(start, end):
+        path = segment_path(directory, month)
+        if not path.exists():
+            continue
+        # a row is only ever archived into its own month's segment
+        seen = set()
+        with gzip.open(path, 'rt', encoding='utf-8') as segment:
+            for line in segment:
+                record = json.loads(line)
+                if device_id is not None and record['device_id'] != device_id:
+                    continue
+                if action is not None and record['action'] != action:
+                    continue
+                if not start <= parse_datetime(record['timestamp']) < end or record['id'] in seen:
+                    continue
+                seen.add(record['id'])
+                yield record
@@ -0,0 +1,199 @@
+"""In-process buffered writer for high-volume DeviceLog ingestion.
+
+The ingestion endpoint validates a batch of events and hands the resulting
+DeviceLog instances to the process-wide ``LogBuffer``. The buffer coalesces
+events from many requests and writes them with one ``bulk_create`` per flush,
+either when ``FLUSH_SIZE`` events are pending or every ``FLUSH_INTERVAL``
+seconds, whichever comes first.
+
+Backpressure: at most ``MAX_PENDING`` events are held in memory. ``offer``
+refuses batches beyond that and the endpoint answers 429 with Retry-After,
+so slow storage pushes back on producers instead of growing the heap.
+
+Failed flushes: an ``OperationalError`` (database locked or unreachable) puts
+the batch back in front of the queue, up to ``MAX_ATTEMPTS`` flushes per
+event. Any other database error, or running out of attempts, means some
+events cannot be written: the batch is then split in halves until the
+failing events are alone, and those are logged and dropped so they cannot
+block the events behind them.
+
+Shutdown: the buffer flushes on interpreter exit (``atexit``) and whenever
+``close()`` is called. Events are acknowledged (202) before they are durable;
+anything still pending when the process is killed hard is lost.
+
+Settings (``DEVICE_LOG_INGEST``): ``FLUSH_SIZE``, ``FLUSH_INTERVAL`` (seconds,
+``None`` disables the background thread and flushes inline once
+``FLUSH_SIZE`` is reached), ``MAX_PENDING`` and ``MAX_ATTEMPTS``.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, IntegrityError, OperationalError, close_old_connections, transaction
+from django.dispatch import receiver
+
+from server.apps.devices.models import Device
+from server.apps.device_logs.writers import write_logs
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_PENDING': 50_000,
+    'MAX_ATTEMPTS': 5,
+}
+
+
+class LogBuffer:
+    def __init__(self, flush_size=500, flush_interval=1.0, max_pending=50_000, max_attempts=5):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def offer(self, logs):
+        """Queue unsaved DeviceLog instances. Returns False when full."""
+        with self._lock:
+            if self._stopped.is_set() or len(self._pending) + len(logs) > self.max_pending:
+                return False
+            self._pending.extend(logs)
+            full = len(self._pending) >= self.flush_size
+
+        if self.flush_interval is None:
+            if full:
+                self.flush()
+        else:
+            self._ensure_worker()
+            if full:
+                self._wakeup.set()
+        return True
+
+    def flush(self):
+        """Write everything pending. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                return self._write(batch)
+            except OperationalError:
+                retry, exhausted = [], []
+                for log in batch:
+                    log._flush_attempts = getattr(log, '_flush_attempts', 0) + 1
+                    (retry if log._flush_attempts < self.max_attempts else exhausted).append(log)
+                logger.exception("DeviceLog flush failed, requeueing %d events", len(retry))
+                self._requeue(retry)
+                return self._isolate(exhausted) if exhausted else 0
+            except DatabaseError:
+                logger.exception("DeviceLog flush failed, isolating the events that cannot be written")
+                return self._isolate(batch)
+
+    def close(self):
+        """Stop the background thread and flush what is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='device-log-flusher', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Unexpected error while flushing DeviceLog buffer")
+            finally:
+                close_old_connections()
+
+    def _write(self, batch):
+        try:
+            with transaction.atomic():
+                write_logs(batch)
+        except IntegrityError:
+            # a device was deleted between acceptance and flush; its usage
+            # rollups reference it
+            batch = self._drop_orphans(batch)
+            with transaction.atomic():
+                write_logs(batch)
+        return len(batch)
+
+    def _isolate(self, batch):
+        """Write ``batch`` in ever smaller halves, dropping the events that fail alone."""
+        try:
+            return self._write(batch)
+        except DatabaseError:
+            if len(batch) == 1:
+                log = batch[0]
+                logger.exception("Dropping DeviceLog event %r for device %s that cannot be written",
+                                 log.action, log.device_id)
+                return 0
+        middle = len(batch) // 2
+        return self._isolate(batch[:middle]) + self._isolate(batch[middle:])
+
+    def _requeue(self, batch):
+        with self._lock:
+            room = self.max_pending - len(self._pending)
+            if room < len(batch):
+                logger.error("DeviceLog buffer full, dropping %d events", len(batch) - room)
+            self._pending[:0] = batch[:max(room, 0)]
+
+    def _drop_orphans(self, batch):
+        live = set(Device.objects.filter(pk__in={log.device_id for log in batch}).values_list('pk', flat=True))
+        kept = [log for log in batch if log.device_id in live]
+        if len(kept) != len(batch):
+            logger.warning("Dropping %d events for deleted devices", len(batch) - len(kept))
+        return kept
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Return the process-wide buffer, configured from ``DEVICE_LOG_INGEST``."""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                options = {**DEFAULTS, **getattr(settings, 'DEVICE_LOG_INGEST', {})}
+                _buffer = LogBuffer(
+                    flush_size=options['FLUSH_SIZE'],
+                    flush_interval=options['FLUSH_INTERVAL'],
+                    max_pending=options['MAX_PENDING'],
+                    max_attempts=options['MAX_ATTEMPTS'],
+                )
+    return _buffer
+
+
+@receiver(setting_changed)
+def _reset_buffer(setting, **kwargs):
+    global _buffer
+    if setting == 'DEVICE_LOG_INGEST' and _buffer is not None:
+        _buffer.close()
+        _buffer = None
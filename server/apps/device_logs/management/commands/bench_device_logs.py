@@ -0,0 +1,110 @@
+"""Benchmark the DeviceLog read paths against a large synthetic SQLite table.
+
+Example (generate once, then re-measure with --reuse):
+
+    python manage.py bench_device_logs --rows 10000000 --devices 5000
+    python manage.py bench_device_logs --rows 10000000 --reuse
+"""
+
+import datetime
+import random
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.models import Device
+from server.benchmarks import scratch_database, summarize, timed
+
+ACTIONS = ('turned_on', 'turned_off', 'status_change', 'brightness_change', 'temperature_change')
+BATCH = 50_000
+
+
+class Command(BaseCommand):
+    help = 'Measure per-device, global and per-action DeviceLog queries on a scratch SQLite database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='DeviceLog rows to generate')
+        parser.add_argument('--devices', type=int, default=1_000, help='devices the logs are spread over')
+        parser.add_argument('--queries', type=int, default=200, help='samples per query shape')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--db', default='bench_device_logs.sqlite3', help='scratch database file')
+        parser.add_argument('--reuse', action='store_true', help='keep an existing scratch file instead of regenerating')
+
+    def handle(self, *args, **options):
+        with scratch_database(options['db'], reuse=options['reuse']) as alias:
+            if DeviceLog.objects.using(alias).count() < options['rows']:
+                self._generate(alias, options['rows'], options['devices'])
+            self._measure(alias, options['queries'], options['page_size'])
+
+    def _generate(self, alias, rows, devices):
+        Device.objects.using(alias).all().delete()
+        Device.objects.using(alias).bulk_create(
+            [Device(name=f'bench-{i}', device_type='light') for i in range(devices)],
+            batch_size=1000,
+        )
+        device_ids = [pk.hex for pk in Device.objects.using(alias).values_list('pk', flat=True)]
+
+        # Raw executemany keeps generation to minutes at 10M rows; values are
+        # stored exactly as the ORM would (hex UUIDs, naive UTC datetimes).
+        sql = (
+            'INSERT INTO device_logs (id, action, old_value, new_value, timestamp, device_id) '
+            'VALUES (%s, %s, %s, %s, %s, %s)'
+        )
+        start = datetime.datetime(2024, 1, 1)
+        step = datetime.timedelta(seconds=1)
+        rng = random.Random(42)
+        written = 0
+        with connections[alias].cursor() as cursor:
+            while written < rows:
+                size = min(BATCH, rows - written)
+                batch = [
+                    (
+                        uuid.UUID(int=rng.getrandbits(128), version=4).hex,
+                        rng.choice(ACTIONS),
+                        'off',
+                        'on',
+                        str(start + step * (written + i)),
+                        rng.choice(device_ids),
+                    )
+                    for i in range(size)
+                ]
+                with transaction.atomic(using=alias):
+                    cursor.executemany(sql, batch)
+                written += size
+                self.stdout.write(f'generated {written}/{rows} rows', ending='\r')
+            cursor.execute('ANALYZE')
+        self.stdout.write('')
+
+    def _measure(self, alias, queries, page_size):
+        total = DeviceLog.objects.using(alias).count()
+        device_ids = list(Device.objects.using(alias).values_list('pk', flat=True))
+        self.stdout.write(f'{total} log rows over {len(device_ids)} devices, page size {page_size}')
+
+        logs = DeviceLog.objects.using(alias)
+        rng = random.Random(7)
+        shapes = {
+            'per-device newest': lambda: logs.filter(device_id=rng.choice(device_ids)).order_by('-timestamp', '-id'),
+            'global newest': lambda: logs.order_by('-timestamp', '-id'),
+            'per-action newest': lambda: logs.filter(action=rng.choice(ACTIONS)).order_by('-timestamp'),
+        }
+
+        cursor = connections[alias].cursor()
+        for label, build in shapes.items():
+            qs = build()[:page_size]
+            self.stdout.write(f'\n{label}: {qs.explain()}')
+
+            # compile up front so the sql timings are pure SQLite work
+            compiled = iter([build()[:page_size].query.sql_with_params() for _ in range(queries)])
+
+            def run_sql():
+                cursor.execute(*next(compiled))
+                cursor.fetchall()
+
+            def run_orm():
+                list(build()[:page_size])
+
+            self.stdout.write(f'  sql  {summarize(timed(run_sql, queries))}')
+            self.stdout.write(f'  orm  {summarize(timed(run_orm, queries))}')
+        cursor.close()
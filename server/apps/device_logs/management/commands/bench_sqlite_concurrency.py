@@ -0,0 +1,141 @@
+"""Compare SQLite connection profiles under concurrent reads and writes.
+
+Writer threads ingest small DeviceLog batches (and touch the device's
+``last_seen``, like a status report) while reader threads page through the
+device list and per-device logs. Every operation ends the way a request
+does, with ``close_if_unusable_or_obsolete()``, so the connection reuse
+policy of each profile is part of what is measured.
+
+    python manage.py bench_sqlite_concurrency --writers 4 --readers 8 --seconds 10
+    python manage.py bench_sqlite_concurrency --profile tuned --conn-max-age 600
+"""
+
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.models import Device
+from server.apps.devices.queries import plan_device_queryset
+from server.benchmarks import scratch_database, summarize
+from server.sqlite_profiles import PROFILES, sqlite_profile
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput, latency and lock errors of each SQLite profile with concurrent readers and writers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES, action='append',
+                            help='profile to measure (repeatable, default: all)')
+        parser.add_argument('--writers', type=int, default=4, help='writer threads')
+        parser.add_argument('--readers', type=int, default=8, help='reader threads')
+        parser.add_argument('--seconds', type=float, default=10.0, help='duration per profile')
+        parser.add_argument('--devices', type=int, default=500)
+        parser.add_argument('--logs', type=int, default=50_000, help='DeviceLog rows seeded before measuring')
+        parser.add_argument('--batch', type=int, default=10, help='logs per write')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--conn-max-age', type=int, default=0,
+                            help='CONN_MAX_AGE for the tuned profile (>0 measures WSGI-style connection reuse)')
+        parser.add_argument('--db', default='bench_sqlite_concurrency', help='scratch database file prefix')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['seconds']:g}s per profile"
+        )
+        for name in options['profile'] or PROFILES:
+            profile = (
+                sqlite_profile(name, conn_max_age=options['conn_max_age']) if name == 'tuned' else sqlite_profile(name)
+            )
+            options_ = profile.pop('OPTIONS')
+            with scratch_database(f"{options['db']}-{name}.sqlite3", options=options_, overrides=profile) as alias:
+                device_ids = self._seed(alias, options['devices'], options['logs'])
+                # seeding happened on this thread's connection; workers open their own
+                connections[alias].close()
+                self._report(name, self._run(alias, device_ids, options))
+
+    def _seed(self, alias, devices, logs):
+        Device.objects.using(alias).bulk_create(
+            [Device(name=f'bench-{i:05}', device_type='light') for i in range(devices)], batch_size=1000,
+        )
+        device_ids = list(Device.objects.using(alias).values_list('pk', flat=True))
+        rng = random.Random(42)
+        now = timezone.now()
+        with transaction.atomic(using=alias):
+            DeviceLog.objects.using(alias).bulk_create(
+                [
+                    DeviceLog(device_id=rng.choice(device_ids), action='status_change', old_value='offline',
+                              new_value='online', timestamp=now - timezone.timedelta(seconds=i))
+                    for i in range(logs)
+                ],
+                batch_size=5000,
+            )
+        return device_ids
+
+    def _run(self, alias, device_ids, options):
+        deadline = time.perf_counter() + options['seconds']
+        page_size = options['page_size']
+        results = {'write': ([], []), 'read': ([], [])}
+        lock = threading.Lock()
+
+        def write(rng):
+            device_id = rng.choice(device_ids)
+            now = timezone.now()
+            with transaction.atomic(using=alias):
+                DeviceLog.objects.using(alias).bulk_create([
+                    DeviceLog(device_id=device_id, action='status_change', old_value='online',
+                              new_value='online', timestamp=now)
+                    for _ in range(options['batch'])
+                ])
+                Device.objects.using(alias).filter(pk=device_id).update(last_seen=now)
+
+        def read(rng):
+            list(plan_device_queryset(Device.objects.using(alias)).order_by('name', 'id')[:page_size])
+            list(DeviceLog.objects.using(alias).filter(device_id=rng.choice(device_ids))
+                 .order_by('-timestamp', '-id')[:page_size])
+
+        def worker(kind, op, seed):
+            rng = random.Random(seed)
+            latencies, errors = [], []
+            connection = connections[alias]
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        op(rng)
+                    except OperationalError as exc:
+                        errors.append(str(exc))
+                    else:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+            with lock:
+                results[kind][0].extend(latencies)
+                results[kind][1].extend(errors)
+
+        threads = [
+            threading.Thread(target=worker, args=('write', write, i)) for i in range(options['writers'])
+        ] + [
+            threading.Thread(target=worker, args=('read', read, 1000 + i)) for i in range(options['readers'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {kind: (latencies, errors, elapsed) for kind, (latencies, errors) in results.items()}
+
+    def _report(self, name, results):
+        self.stdout.write(f'\n{name}')
+        for kind, (latencies, errors, elapsed) in results.items():
+            line = f'  {kind:5} {len(latencies) / elapsed:8.1f} ops/s'
+            if latencies:
+                line += f'  {summarize(latencies)}'
+            locked = sum('locked' in message for message in errors)
+            line += f'  errors={len(errors)} (locked={locked})'
+            self.stdout.write(line)
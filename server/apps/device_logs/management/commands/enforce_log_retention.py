@@ -0,0 +1,42 @@
+"""Apply DeviceLog retention (see server/apps/device_logs/retention.py).
+
+Run it from cron, or keep it running with --every:
+
+    python manage.py enforce_log_retention --every 3600
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from server.apps.device_logs.retention import enforce_retention
+
+
+class Command(BaseCommand):
+    help = 'Purge logs of deleted devices, archive and delete expired logs, prune minute rollups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None, help='rows per delete transaction')
+        parser.add_argument('--no-archive', action='store_true', help='delete expired rows without archiving them')
+        parser.add_argument('--all-orphans', action='store_true',
+                            help='scan the whole table for logs of deleted devices, not only tombstoned ones')
+        parser.add_argument('--every', type=float, default=None, help='repeat every N seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            summary = enforce_retention(
+                chunk_size=options['chunk_size'],
+                archive=not options['no_archive'],
+                all_orphans=options['all_orphans'],
+            )
+            expired = ', '.join(f'{name}={count}' for name, count in summary['expired'].items()) or 'none'
+            self.stdout.write(self.style.SUCCESS(
+                f"Purged {summary['orphans']} orphaned logs, expired {expired}, "
+                f"pruned {summary['minute_rollups']} minute rollups in {time.perf_counter() - started:.1f}s."
+            ))
+            if options['every'] is None:
+                return
+            close_old_connections()
+            time.sleep(options['every'])
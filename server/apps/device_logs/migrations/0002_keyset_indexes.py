@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_logs', '0001_initial'),
+        ('devices', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='devicelog',
+            index=models.Index(fields=['timestamp', 'id'], name='device_logs_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_logs', '0002_keyset_indexes'),
+        ('devices', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='devicelog',
+            name='device',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='devices.device'),
+        ),
+        migrations.AddIndex(
+            model_name='devicelog',
+            index=models.Index(fields=['device', '-timestamp', '-id'], name='device_logs_dev_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devicelog',
+            index=models.Index(fields=['action', 'timestamp'], name='device_logs_action_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_logs', '0003_log_query_indexes'),
+        ('devices', '0003_device_tombstones'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='devicelog',
+            name='device',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='logs', to='devices.device'),
+        ),
+    ]
@@ -12,6 +12,15 @@ from django.utils.timezone import now
 class DeviceLog(models.Model):
     class Meta:
         db_table = "device_logs"
+        indexes = [
+            # DeviceLogViewSet: global newest-first keyset order. Its leading
+            # column also serves plain timestamp range scans.
+            models.Index(fields=['timestamp', 'id'], name='device_logs_ts_id_idx'),
+            # DeviceViewSet.logs: one device's logs, newest first
+            models.Index(fields=['device', '-timestamp', '-id'], name='device_logs_dev_ts_idx'),
+            # per-action history, retention sweeps and activity feeds
+            models.Index(fields=['action', 'timestamp'], name='device_logs_action_ts_idx'),
+        ]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     action = models.CharField(max_length=100)
     old_value = models.TextField(null=True, blank=True)
@@ -20,7 +29,11 @@ class DeviceLog(models.Model):
 
     # Foreign Key - explicitly reference the devices app so Django does not
     # assume the related model lives in this app (device_logs.Device).
-    device = models.ForeignKey('devices.Device', related_name='logs', on_delete=models.CASCADE)
+    # No standalone FK index: device_logs_dev_ts_idx leads with device_id.
+    # Deleting a device leaves its logs in place (no cascade, no constraint);
+    # the retention sweep purges them in chunks, see retention.py.
+    device = models.ForeignKey('devices.Device', related_name='logs', on_delete=models.DO_NOTHING,
+                               db_index=False, db_constraint=False)
 
     def __str__(self):
         # device_id attribute provided by Django; use device_id to avoid accessing related object
@@ -0,0 +1,131 @@
+"""DeviceLog retention: orphan purge, per-action expiry and archival.
+
+Deleting a device no longer cascades to its logs (that made
+``DeviceViewSet.destroy`` a single huge delete); the rows are left behind
+and ``purge_orphans`` removes them here, a chunk at a time, using the
+device tombstones to find them.
+
+``expire_logs`` drops rows older than their action's TTL
+(``DEVICE_LOG_RETENTION``), oldest first. Each chunk is archived to the
+monthly gzip NDJSON segments (``archive.py``) and deleted in its own short
+transaction, so the API keeps writing between chunks. Usage rollups are not
+touched: hour and day rollups outlive the raw rows they summarize, and only
+minute rollups expire (``MINUTE_ROLLUP_TTL_DAYS``).
+"""
+
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from server.apps.device_logs.archive import append_logs, archive_dir
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_usage.rollups import prune_minute_rollups
+from server.apps.devices.models import Device, DeviceTombstone
+
+logger = logging.getLogger(__name__)
+
+
+def _options():
+    return settings.DEVICE_LOG_RETENTION
+
+
+def _delete_chunk(pks):
+    # QuerySet.delete() fetches and signals every row as soon as a delete
+    # listener is connected for DeviceLog. Nothing references log rows, so
+    # one plain DELETE does the same job at any chunk size.
+    connection = connections[router.db_for_write(DeviceLog)]
+    opts = DeviceLog._meta
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(opts.db_table)} WHERE {quote(opts.pk.column)} IN ({placeholders})',
+            [opts.pk.get_db_prep_value(pk, connection) for pk in pks],
+        )
+        return cursor.rowcount
+
+
+def _drain(queryset, chunk_size, archive_to=None):
+    """Delete (and optionally archive) ``queryset`` in chunks, oldest first."""
+    total = 0
+    queryset = queryset.order_by('timestamp', 'id')
+    while True:
+        with transaction.atomic():
+            if archive_to is not None:
+                rows = list(queryset[:chunk_size])
+                if rows:
+                    append_logs(rows, archive_to)
+                pks = [row.pk for row in rows]
+            else:
+                pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return total
+            total += _delete_chunk(pks)
+
+
+def purge_orphans(chunk_size=None, everything=False):
+    """Delete logs of deleted devices. Returns the number of rows deleted.
+
+    By default only devices with a tombstone are considered, which reads the
+    per-device index; ``everything`` scans the whole table instead, for logs
+    whose tombstone was pruned before retention ran.
+    """
+    chunk_size = chunk_size or _options()['CHUNK_SIZE']
+    if everything:
+        orphans = DeviceLog.objects.filter(~Exists(Device.objects.filter(pk=OuterRef('device_id'))))
+    else:
+        # a tombstoned id can come back (imports keep ids); skip those
+        gone = DeviceTombstone.objects.exclude(device_id__in=Device.objects.values('pk')).values('device_id')
+        orphans = DeviceLog.objects.filter(device_id__in=gone)
+    return _drain(orphans, chunk_size)
+
+
+def expiry_rules(now=None):
+    """Return ``[(actions, excluded actions, cutoff)]`` from the settings."""
+    now = now or timezone.now()
+    options = _options()
+    overrides = options.get('ACTION_TTL_DAYS', {})
+    rules = [
+        ((action,), (), now - datetime.timedelta(days=days))
+        for action, days in sorted(overrides.items()) if days > 0
+    ]
+    if options['DEFAULT_TTL_DAYS'] > 0:
+        rules.append(((), tuple(overrides), now - datetime.timedelta(days=options['DEFAULT_TTL_DAYS'])))
+    return rules
+
+
+def expire_logs(now=None, chunk_size=None, archive=True):
+    """Archive and delete rows past their TTL. Returns ``{rule: rows}``."""
+    chunk_size = chunk_size or _options()['CHUNK_SIZE']
+    archive_to = archive_dir() if archive else None
+    expired = {}
+    for actions, excluded, cutoff in expiry_rules(now):
+        queryset = DeviceLog.objects.filter(timestamp__lt=cutoff)
+        if actions:
+            queryset = queryset.filter(action__in=actions)
+        if excluded:
+            queryset = queryset.exclude(action__in=excluded)
+        name = actions[0] if actions else '*'
+        expired[name] = _drain(queryset, chunk_size, archive_to)
+        if expired[name]:
+            logger.info("Expired %d DeviceLog rows (%s) older than %s", expired[name], name, cutoff.isoformat())
+    return expired
+
+
+def enforce_retention(now=None, chunk_size=None, archive=True, all_orphans=False):
+    """Run every retention step once. Returns a summary dict."""
+    now = now or timezone.now()
+    chunk_size = chunk_size or _options()['CHUNK_SIZE']
+    summary = {
+        'orphans': purge_orphans(chunk_size, everything=all_orphans),
+        'expired': expire_logs(now, chunk_size, archive),
+        'minute_rollups': 0,
+    }
+    minute_ttl = _options().get('MINUTE_ROLLUP_TTL_DAYS', 0)
+    if minute_ttl > 0:
+        summary['minute_rollups'] = prune_minute_rollups(now - datetime.timedelta(days=minute_ttl), chunk_size)
+    return summary
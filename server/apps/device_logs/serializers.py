@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.models import Device
+from server.projection import SparseFieldsMixin
 
 
-class DeviceLogSerializer(serializers.ModelSerializer):
+class DeviceLogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DeviceLog
         fields = ('id', 'action', 'old_value', 'new_value', 'timestamp', 'device')
@@ -10,3 +12,52 @@ class DeviceLogSerializer(serializers.ModelSerializer):
             'device': {'read_only': True},
             'timestamp': {'read_only': True},
         }
+
+
+class DeviceLogIngestListSerializer(serializers.ListSerializer):
+    """Checks every referenced device exists with a single query."""
+
+    def to_internal_value(self, data):
+        events = super().to_internal_value(data)
+        ids = {event['device'] for event in events}
+        known = set(Device.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        errors = [
+            {} if event['device'] in known else {'device': [f'Invalid pk "{event["device"]}" - object does not exist.']}
+            for event in events
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return events
+
+
+class DeviceLogIngestSerializer(serializers.Serializer):
+    """One telemetry event; ``timestamp`` defaults to the time of ingestion."""
+    device = serializers.UUIDField()
+    action = serializers.CharField(max_length=100)
+    old_value = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    new_value = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    timestamp = serializers.DateTimeField(required=False)
+
+    class Meta:
+        list_serializer_class = DeviceLogIngestListSerializer
+
+
+class ArchiveQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    device = serializers.UUIDField(required=False)
+    action = serializers.CharField(max_length=100, required=False)
+
+    def validate(self, attrs):
+        if attrs['start'] >= attrs['end']:
+            raise serializers.ValidationError({'start': 'Must be before end.'})
+        return attrs
+
+
+class LogExportQuerySerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    device = serializers.UUIDField(required=False)
+    room = serializers.UUIDField(required=False)
+    action = serializers.CharField(max_length=100, required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
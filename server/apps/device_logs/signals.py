@@ -0,0 +1,11 @@
+"""Signals for DeviceLog writes that bypass ``post_save``.
+
+``bulk_create`` does not send per-row model signals, so the batched write
+paths (bulk device operations, the ingestion buffer) announce their rows
+through ``logs_created`` instead. Receivers get ``logs``, the list of saved
+DeviceLog instances, and run inside the writing transaction.
+"""
+
+from django.dispatch import Signal
+
+logs_created = Signal()
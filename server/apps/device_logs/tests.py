@@ -0,0 +1,164 @@
+import datetime
+import json
+import tempfile
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from server.apps.device_logs.ingest import LogBuffer, get_buffer
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.retention import enforce_retention
+from server.apps.device_logs.writers import write_logs
+from server.apps.devices.models import Device
+
+
+@override_settings(DEVICE_LOG_INGEST={'FLUSH_SIZE': 3, 'FLUSH_INTERVAL': None, 'MAX_PENDING': 5})
+class DeviceLogIngestTests(APITestCase):
+    url = '/api/v1/device_logs/ingest/'
+
+    def setUp(self):
+        self.lamp = Device.objects.create(name='Lamp', device_type='light')
+        self.plug = Device.objects.create(name='Plug', device_type='plug')
+
+    def _events(self, count):
+        devices = [self.lamp, self.plug]
+        return [{'device': str(devices[i % 2].pk), 'action': 'turned_on'} for i in range(count)]
+
+    def test_buffers_until_flush_size(self):
+        response = self.client.post(self.url, self._events(2), format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(DeviceLog.objects.count(), 0)
+
+        self.client.post(self.url, self._events(1), format='json')
+        self.assertEqual(DeviceLog.objects.count(), 3)
+        self.assertEqual(self.lamp.logs.count(), 2)
+
+    def test_refuses_batches_beyond_capacity(self):
+        response = self.client.post(self.url, self._events(6), format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(get_buffer().pending, 0)
+
+    def test_rejects_unknown_devices(self):
+        events = self._events(1) + [{'device': '00000000-0000-0000-0000-000000000000', 'action': 'turned_on'}]
+        response = self.client.post(self.url, events, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+
+    def test_drops_events_that_cannot_be_written(self):
+        buffer = LogBuffer(flush_size=10, flush_interval=None)
+        logs = [DeviceLog(device=self.lamp, action='turned_on') for _ in range(4)]
+        logs[2].action = None
+        buffer.offer(logs)
+        with self.assertLogs('server.apps.device_logs.ingest', 'ERROR'):
+            self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(buffer.pending, 0)
+        self.assertEqual(DeviceLog.objects.count(), 3)
+
+    def test_retries_operational_errors_a_limited_number_of_times(self):
+        buffer = LogBuffer(flush_size=10, flush_interval=None, max_attempts=2)
+        buffer.offer([DeviceLog(device=self.lamp, action='turned_on') for _ in range(3)])
+        with mock.patch('server.apps.device_logs.ingest.write_logs', side_effect=OperationalError('locked')), \
+                self.assertLogs('server.apps.device_logs.ingest', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+            self.assertEqual(buffer.pending, 3)
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(buffer.pending, 0)
+
+
+class DeviceLogRetentionTests(APITestCase):
+    def setUp(self):
+        archive = tempfile.TemporaryDirectory()
+        self.addCleanup(archive.cleanup)
+        retention = override_settings(DEVICE_LOG_RETENTION={
+            'DEFAULT_TTL_DAYS': 30,
+            'ACTION_TTL_DAYS': {'heartbeat': 1, 'status_change': 0},
+            'ARCHIVE_DIR': archive.name,
+            'CHUNK_SIZE': 2,
+            'MINUTE_ROLLUP_TTL_DAYS': 0,
+        })
+        retention.enable()
+        self.addCleanup(retention.disable)
+        self.lamp = Device.objects.create(name='Lamp', device_type='light')
+        self.now = timezone.now()
+
+    def _logs(self, device, action, *ages_in_days):
+        return write_logs([
+            DeviceLog(device=device, action=action, timestamp=self.now - datetime.timedelta(days=age))
+            for age in ages_in_days
+        ])
+
+    def test_deleting_a_device_leaves_logs_for_the_sweep(self):
+        plug = Device.objects.create(name='Plug', device_type='plug')
+        self._logs(plug, 'turned_on', 0, 0, 0)
+        self._logs(self.lamp, 'turned_on', 0)
+        plug.delete()
+        self.assertEqual(DeviceLog.objects.count(), 4)
+
+        summary = enforce_retention(now=self.now)
+        self.assertEqual(summary['orphans'], 3)
+        self.assertEqual(list(DeviceLog.objects.values_list('device_id', flat=True)), [self.lamp.pk])
+
+    def test_expires_per_action_and_archives(self):
+        self._logs(self.lamp, 'heartbeat', 0.5, 2, 3)
+        self._logs(self.lamp, 'turned_on', 10, 40, 45)
+        self._logs(self.lamp, 'status_change', 400)
+
+        summary = enforce_retention(now=self.now)
+        self.assertEqual(summary['expired'], {'heartbeat': 2, '*': 2})
+        self.assertEqual(DeviceLog.objects.count(), 3)
+
+        response = self.client.get('/api/v1/device_logs/archive/', {
+            'start': (self.now - datetime.timedelta(days=60)).isoformat(),
+            'end': self.now.isoformat(),
+            'device': str(self.lamp.pk),
+        })
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(sorted(r['action'] for r in records), ['heartbeat', 'heartbeat', 'turned_on', 'turned_on'])
+
+
+class DeviceLogExportTests(APITestCase):
+    url = '/api/v1/device_logs/export/'
+
+    def setUp(self):
+        self.lamp = Device.objects.create(name='Lamp', device_type='light')
+        self.plug = Device.objects.create(name='Plug', device_type='plug')
+        start = timezone.now() - datetime.timedelta(hours=1)
+        write_logs([
+            DeviceLog(device=device, action=action, timestamp=start + datetime.timedelta(minutes=minute))
+            for minute, (device, action) in enumerate([
+                (self.lamp, 'turned_on'), (self.plug, 'turned_on'), (self.lamp, 'turned_off'),
+            ])
+        ])
+
+    def test_streams_filtered_ndjson(self):
+        response = self.client.get(self.url, {'device': str(self.lamp.pk)})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['action'] for row in rows], ['turned_on', 'turned_off'])
+        self.assertEqual({row['device_id'] for row in rows}, {str(self.lamp.pk)})
+
+    def test_streams_csv_with_header(self):
+        response = self.client.get(self.url, {'output': 'csv', 'action': 'turned_on'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,device_id,action,old_value,new_value,timestamp')
+        self.assertEqual(len(lines), 3)
+
+
+class DeviceLogSparseFieldsTests(APITestCase):
+    def test_list_and_detail_return_only_requested_fields(self):
+        lamp = Device.objects.create(name='Lamp', device_type='light')
+        log = DeviceLog.objects.create(device=lamp, action='turned_on')
+
+        response = self.client.get('/api/v1/device_logs/', {'fields': 'action,device'})
+        self.assertEqual(response.data['results'], [{'action': 'turned_on', 'device': lamp.pk}])
+
+        response = self.client.get(f'/api/v1/device_logs/{log.pk}/', {'fields': 'timestamp'})
+        self.assertEqual(list(response.data), ['timestamp'])
+
+        response = self.client.get('/api/v1/device_logs/', {'fields': 'device__name'})
+        self.assertEqual(response.status_code, 400)
@@ -1,11 +1,105 @@
-from rest_framework import viewsets
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import Throttled
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
+from server.apps.device_logs.archive import read_archive
+from server.apps.device_logs.ingest import get_buffer
 from server.apps.device_logs.models import DeviceLog
-from .serializers import DeviceLogSerializer
+from server.exports import export_response
+from server.pagination import TimestampKeysetPagination
+from server.parsers import FastJSONParser, NDJSONParser
+from server.projection import SparseFieldsViewMixin
+from .serializers import (
+    ArchiveQuerySerializer,
+    DeviceLogIngestSerializer,
+    DeviceLogSerializer,
+    LogExportQuerySerializer,
+)
+
+INGEST_MAX_EVENTS = 10_000
+EXPORT_FIELDS = ('id', 'device_id', 'action', 'old_value', 'new_value', 'timestamp')
 
 
-class DeviceLogViewSet(viewsets.ModelViewSet):
-    queryset = DeviceLog.objects.all().order_by('-timestamp')
+class DeviceLogViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    """Device logs; list and detail responses accept ``?fields=``."""
+    queryset = DeviceLog.objects.all().order_by('-timestamp', '-id')
     serializer_class = DeviceLogSerializer
     permission_classes = [AllowAny]
+    pagination_class = TimestampKeysetPagination
+    projection_always = ('id', 'timestamp')
+
+    @action(detail=False, methods=['post'], url_path='ingest', parser_classes=[FastJSONParser, NDJSONParser])
+    def ingest(self, request):
+        """Accept a batch of log events for any number of devices.
+
+        POST /api/v1/device_logs/ingest/ with a JSON array (or NDJSON) of
+        ``{"device", "action", "old_value", "new_value", "timestamp"}``.
+        Events are buffered and written in bulk shortly after the 202; a full
+        buffer answers 429 with Retry-After.
+        """
+        serializer = DeviceLogIngestSerializer(data=request.data, many=True, max_length=INGEST_MAX_EVENTS)
+        serializer.is_valid(raise_exception=True)
+
+        now = timezone.now()
+        logs = [
+            DeviceLog(
+                device_id=event['device'],
+                action=event['action'],
+                old_value=event.get('old_value'),
+                new_value=event.get('new_value'),
+                timestamp=event.get('timestamp') or now,
+            )
+            for event in serializer.validated_data
+        ]
+        if not get_buffer().offer(logs):
+            raise Throttled(wait=1, detail='Log ingestion is saturated, retry shortly.')
+        return Response({'accepted': len(logs)}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='archive')
+    def archive(self, request):
+        """Read expired logs back from the archive segments.
+
+        GET /api/v1/device_logs/archive/?start=&end=[&device=][&action=]
+        streams NDJSON; only the monthly segments overlapping the range are
+        decompressed.
+        """
+        query = ArchiveQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        records = read_archive(params['start'], params['end'], params.get('device'), params.get('action'))
+        return StreamingHttpResponse(
+            (json.dumps(record, separators=(',', ':')) + '\n' for record in records),
+            content_type='application/x-ndjson',
+        )
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Stream logs as NDJSON (default) or CSV, oldest first.
+
+        GET /api/v1/device_logs/export/?output=ndjson|csv with optional
+        ``device``, ``room``, ``action``, ``start`` and ``end`` filters.
+        (``output`` rather than ``format``, which DRF reserves for renderer
+        selection.)
+        """
+        query = LogExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        logs = DeviceLog.objects.order_by('timestamp', 'id')
+        if 'device' in params:
+            logs = logs.filter(device_id=params['device'])
+        if 'room' in params:
+            logs = logs.filter(device__room_id=params['room'])
+        if 'action' in params:
+            logs = logs.filter(action=params['action'])
+        if 'start' in params:
+            logs = logs.filter(timestamp__gte=params['start'])
+        if 'end' in params:
+            logs = logs.filter(timestamp__lt=params['end'])
+        return export_response(request, logs, EXPORT_FIELDS, params['output'], 'device_logs')
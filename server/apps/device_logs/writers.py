@@ -0,0 +1,19 @@
+"""Batched DeviceLog inserts."""
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.signals import logs_created
+
+BATCH_SIZE = 1000
+
+
+def write_logs(logs, batch_size=BATCH_SIZE):
+    """Insert ``logs`` with ``bulk_create`` and send ``logs_created``.
+
+    Callers own the transaction; wrap the call in ``transaction.atomic()``
+    when the rows must land together with other writes.
+    """
+    if not logs:
+        return logs
+    DeviceLog.objects.bulk_create(logs, batch_size=batch_size)
+    logs_created.send(sender=DeviceLog, logs=logs)
+    return logs
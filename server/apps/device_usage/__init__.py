@@ -0,0 +1,5 @@
+"""Device usage app package.
+
+Per-device rollups of DeviceLog history (action counts and time spent in
+each status) at minute, hour and day granularity, for usage charts.
+"""
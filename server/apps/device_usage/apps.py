@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class DeviceUsageConfig(AppConfig):
+    name = 'server.apps.device_usage'
+    label = 'device_usage'
+
+    def ready(self):
+        # connect the incremental rollup receivers
+        from . import signals  # noqa: F401
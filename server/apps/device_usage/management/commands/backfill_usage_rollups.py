@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from server.apps.device_usage.rollups import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the device usage rollups (counts, state durations) from the DeviceLog table.'
+
+    def handle(self, *args, **options):
+        written = backfill(stdout=self.stdout if options['verbosity'] > 1 else None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['counts']} count rows and {written['durations']} duration rows "
+            f"for {written['marks']} devices."
+        ))
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('devices', '0003_device_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceStateMark',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='devices.device')),
+                ('state', models.CharField(blank=True, max_length=20, null=True)),
+                ('since', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'device_usage_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='StateDuration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'minute'), ('hour', 'hour'), ('day', 'day')], max_length=6)),
+                ('bucket', models.DateTimeField()),
+                ('state', models.CharField(max_length=20)),
+                ('seconds', models.FloatField(default=0)),
+                ('device', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='devices.device')),
+            ],
+            options={
+                'db_table': 'device_usage_durations',
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='device_usage_dur_gran_idx')],
+                'constraints': [models.UniqueConstraint(fields=('device', 'granularity', 'bucket', 'state'), name='device_usage_durations_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='UsageCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'minute'), ('hour', 'hour'), ('day', 'day')], max_length=6)),
+                ('bucket', models.DateTimeField()),
+                ('action', models.CharField(max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('device', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='devices.device')),
+            ],
+            options={
+                'db_table': 'device_usage_counts',
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='device_usage_counts_gran_idx')],
+                'constraints': [models.UniqueConstraint(fields=('device', 'granularity', 'bucket', 'action'), name='device_usage_counts_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+"""Rollup tables derived from DeviceLog history.
+
+``UsageCount`` holds the number of log rows per device, action and time
+bucket; ``StateDuration`` the seconds a device spent in each status per
+bucket. Both are maintained by ``server.apps.device_usage.rollups`` and can
+be rebuilt from the logs at any time (``manage.py backfill_usage_rollups``).
+"""
+
+from django.db import models
+
+GRANULARITY_CHOICES = [('minute', 'minute'), ('hour', 'hour'), ('day', 'day')]
+
+
+class UsageCount(models.Model):
+    class Meta:
+        db_table = "device_usage_counts"
+        constraints = [
+            # upsert target; also serves per-device chart range scans
+            models.UniqueConstraint(fields=['device', 'granularity', 'bucket', 'action'],
+                                    name='device_usage_counts_key'),
+        ]
+        indexes = [
+            # charts across all devices
+            models.Index(fields=['granularity', 'bucket'], name='device_usage_counts_gran_idx'),
+        ]
+    device = models.ForeignKey('devices.Device', related_name='+', on_delete=models.CASCADE, db_index=False)
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    action = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.action} x{self.count} for Device {self.device_id} at {self.bucket:%Y-%m-%d %H:%M} ({self.granularity})'
+
+
+class StateDuration(models.Model):
+    class Meta:
+        db_table = "device_usage_durations"
+        constraints = [
+            models.UniqueConstraint(fields=['device', 'granularity', 'bucket', 'state'],
+                                    name='device_usage_durations_key'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='device_usage_dur_gran_idx'),
+        ]
+    device = models.ForeignKey('devices.Device', related_name='+', on_delete=models.CASCADE, db_index=False)
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    state = models.CharField(max_length=20)
+    seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f'{self.state} {self.seconds:.0f}s for Device {self.device_id} at {self.bucket:%Y-%m-%d %H:%M} ({self.granularity})'
+
+
+class DeviceStateMark(models.Model):
+    """The status a device entered last and since when.
+
+    The open interval is accounted for when the next status change arrives;
+    ``state`` is None while only the device's creation has been seen.
+    """
+    class Meta:
+        db_table = "device_usage_state"
+    device = models.OneToOneField('devices.Device', primary_key=True, related_name='+', on_delete=models.CASCADE)
+    state = models.CharField(max_length=20, null=True, blank=True)
+    since = models.DateTimeField()
+
+    def __str__(self):
+        return f'Device {self.device_id} {self.state or "unknown"} since {self.since.isoformat()}'
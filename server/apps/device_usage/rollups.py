@@ -0,0 +1,297 @@
+"""Maintain and read the DeviceLog rollups.
+
+``apply_logs`` folds freshly written DeviceLog rows into the rollup tables
+inside the writer's transaction: one ``INSERT ... ON CONFLICT DO UPDATE``
+per table adds the batch's counts and durations to the stored ones, so
+concurrent writers never lose increments.
+
+Counts are kept per minute, hour and day. Durations are kept per hour and
+day only: a device that sat offline for a month would otherwise expand into
+tens of thousands of minute rows. A duration is booked when the status
+change that ends it arrives (``DeviceStateMark`` remembers the open one);
+``usage_series`` adds the still-open intervals at read time, grouped in SQL
+by state and opening bucket so the work does not grow with the devices.
+
+Status changes that arrive older than the device's mark still count, but
+their durations are skipped; ``backfill`` rebuilds everything from the logs
+in timestamp order.
+"""
+
+import datetime
+import logging
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import (
+    Count, DateTimeField, DurationField, Exists, ExpressionWrapper, OuterRef, Sum, Value,
+)
+from django.db.models.functions import Greatest, Trunc
+from django.utils import timezone
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.models import Device
+
+from .models import DeviceStateMark, StateDuration, UsageCount
+
+logger = logging.getLogger(__name__)
+
+STEPS = {
+    'minute': datetime.timedelta(minutes=1),
+    'hour': datetime.timedelta(hours=1),
+    'day': datetime.timedelta(days=1),
+}
+COUNT_GRANULARITIES = ('minute', 'hour', 'day')
+DURATION_GRANULARITIES = ('hour', 'day')
+
+CREATED_ACTION = 'created'
+STATUS_ACTION = 'status_change'
+
+BATCH_SIZE = 1000
+
+
+def bucket_start(moment, granularity):
+    moment = moment.astimezone(datetime.timezone.utc)
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def split_interval(start, end, granularity):
+    """Yield ``(bucket, seconds)`` for the part of [start, end) in each bucket."""
+    step = STEPS[granularity]
+    bucket = bucket_start(start, granularity)
+    while bucket < end:
+        upper = bucket + step
+        seconds = (min(upper, end) - max(bucket, start)).total_seconds()
+        if seconds > 0:
+            yield bucket, seconds
+        bucket = upper
+
+
+def _add_durations(durations, device_id, state, start, end):
+    for granularity in DURATION_GRANULARITIES:
+        for bucket, seconds in split_interval(start, end, granularity):
+            durations[(device_id, granularity, bucket, state)] += seconds
+
+
+def _advance(mark, log, durations):
+    """Return the device's new ``(state, since)`` mark after ``log``."""
+    if log.action == CREATED_ACTION:
+        return mark or (None, log.timestamp)
+    if mark is None:
+        return log.new_value, log.timestamp
+    state, since = mark
+    if log.timestamp < since:
+        logger.debug("Skipping duration of out-of-order status change %s", log.pk)
+        return mark
+    # a mark opened by 'created' learns its state from the first change
+    state = state or log.old_value
+    if state:
+        _add_durations(durations, log.device_id, state, since, log.timestamp)
+    return log.new_value, log.timestamp
+
+
+def upsert_increments(model, key_fields, value_field, increments):
+    """Add ``{key tuple: delta}`` to ``value_field``, creating missing rows."""
+    if not increments:
+        return
+    opts = model._meta
+    fields = [opts.get_field(name) for name in key_fields] + [opts.get_field(value_field)]
+    quote = connection.ops.quote_name
+    table, column = quote(opts.db_table), quote(fields[-1].column)
+    keys = ', '.join(quote(field.column) for field in fields[:-1])
+    sql = (
+        f'INSERT INTO {table} ({keys}, {column}) VALUES ({", ".join(["%s"] * len(fields))}) '
+        f'ON CONFLICT ({keys}) DO UPDATE SET {column} = {table}.{column} + excluded.{column}'
+    )
+    rows = [
+        [field.get_db_prep_value(value, connection) for field, value in zip(fields, (*key, delta))]
+        for key, delta in increments.items()
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            cursor.executemany(sql, rows[start:start + BATCH_SIZE])
+
+
+def _write(counts, durations):
+    upsert_increments(UsageCount, ('device', 'granularity', 'bucket', 'action'), 'count', counts)
+    upsert_increments(StateDuration, ('device', 'granularity', 'bucket', 'state'), 'seconds', durations)
+
+
+def _save_marks(marks):
+    DeviceStateMark.objects.bulk_create(
+        [DeviceStateMark(device_id=pk, state=state, since=since) for pk, (state, since) in marks.items()],
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['device'],
+        update_fields=['state', 'since'],
+    )
+
+
+def apply_logs(logs):
+    """Fold newly written DeviceLog instances into the rollups."""
+    counts = Counter()
+    for log in logs:
+        for granularity in COUNT_GRANULARITIES:
+            counts[(log.device_id, granularity, bucket_start(log.timestamp, granularity), log.action)] += 1
+
+    transitions = sorted(
+        (log for log in logs if log.action in (CREATED_ACTION, STATUS_ACTION)),
+        key=lambda log: (log.timestamp, log.action != CREATED_ACTION),
+    )
+    durations = Counter()
+    marks = {}
+    if transitions:
+        marks = {
+            mark.device_id: (mark.state, mark.since)
+            for mark in DeviceStateMark.objects.filter(device__in={log.device_id for log in transitions})
+        }
+        before = dict(marks)
+        for log in transitions:
+            marks[log.device_id] = _advance(marks.get(log.device_id), log, durations)
+        marks = {pk: mark for pk, mark in marks.items() if before.get(pk) != mark}
+
+    with transaction.atomic():
+        _write(counts, durations)
+        if marks:
+            _save_marks(marks)
+
+
+def backfill(stdout=None):
+    """Rebuild every rollup from the DeviceLog table. Returns row counts."""
+    with transaction.atomic():
+        UsageCount.objects.all().delete()
+        StateDuration.objects.all().delete()
+        DeviceStateMark.objects.all().delete()
+
+        # logs of deleted devices linger until retention purges them
+        logs = DeviceLog.objects.filter(Exists(Device.objects.filter(pk=OuterRef('device_id'))))
+        written = 0
+        for granularity in COUNT_GRANULARITIES:
+            grouped = (
+                logs.order_by()
+                .annotate(bucket=Trunc('timestamp', granularity, tzinfo=datetime.timezone.utc))
+                .values('device_id', 'action', 'bucket')
+                .annotate(n=Count('pk'))
+            )
+            batch = []
+            for row in grouped.iterator(chunk_size=BATCH_SIZE):
+                batch.append(UsageCount(device_id=row['device_id'], granularity=granularity,
+                                        bucket=row['bucket'], action=row['action'], count=row['n']))
+                if len(batch) >= BATCH_SIZE:
+                    written += len(UsageCount.objects.bulk_create(batch))
+                    batch = []
+            written += len(UsageCount.objects.bulk_create(batch))
+            if stdout is not None:
+                stdout.write(f'{granularity}: {written} count rows so far')
+
+        transitions = (
+            logs.filter(action__in=(CREATED_ACTION, STATUS_ACTION))
+            .order_by('device_id', 'timestamp', 'id')
+            .only('device_id', 'action', 'old_value', 'new_value', 'timestamp')
+        )
+        durations = Counter()
+        marks = {}
+        for log in transitions.iterator(chunk_size=BATCH_SIZE):
+            marks[log.device_id] = _advance(marks.get(log.device_id), log, durations)
+            if len(durations) >= BATCH_SIZE:
+                _write({}, durations)
+                durations.clear()
+        _write({}, durations)
+        _save_marks(marks)
+
+    return {
+        'counts': written,
+        'durations': StateDuration.objects.count(),
+        'marks': len(marks),
+    }
+
+
+def open_durations(marks, granularity, start, open_until):
+    """Seconds per ``(bucket, state)`` of the open intervals of ``marks`` in [start, open_until).
+
+    One grouped query returns, per state and bucket the intervals opened
+    in, how many opened there and the sum of their opening offsets; every
+    later bucket up to ``open_until`` is covered by all of them.
+    """
+    opened = Greatest('since', Value(start, output_field=DateTimeField()))
+    groups = (
+        marks.filter(state__isnull=False, since__lt=open_until).order_by()
+        .annotate(bucket=Trunc(opened, granularity, tzinfo=datetime.timezone.utc))
+        .values('state', 'bucket')
+        .annotate(n=Count('pk'), offset=Sum(ExpressionWrapper(
+            opened - Value(start, output_field=DateTimeField()), output_field=DurationField(),
+        )))
+    )
+    opening = defaultdict(dict)
+    for row in groups:
+        opening[row['state']][row['bucket']] = (row['n'], row['offset'])
+
+    step = STEPS[granularity]
+    durations = Counter()
+    for state, buckets in opening.items():
+        bucket = min(buckets)
+        running = 0
+        while bucket < open_until:
+            upper = min(bucket + step, open_until)
+            seconds = running * (upper - bucket).total_seconds()
+            if bucket in buckets:
+                n, offset = buckets[bucket]
+                # each interval opened here covers upper - opened
+                seconds += n * (upper - start).total_seconds() - offset.total_seconds()
+                running += n
+            if seconds:
+                durations[(bucket, state)] += seconds
+            bucket += step
+    return durations
+
+
+def usage_series(granularity, start, end, device_id=None):
+    """Return the non-empty buckets in [start, end), oldest first.
+
+    Each bucket is ``{'bucket', 'counts': {action: n}, 'durations':
+    {state: seconds}}``. Without ``device_id`` the figures are summed over
+    all devices.
+    """
+    series = {}
+
+    def _bucket(moment):
+        if moment not in series:
+            series[moment] = {'bucket': moment, 'counts': {}, 'durations': {}}
+        return series[moment]
+
+    scope = {'granularity': granularity, 'bucket__gte': bucket_start(start, granularity), 'bucket__lt': end}
+    if device_id is not None:
+        scope['device_id'] = device_id
+
+    counts = UsageCount.objects.filter(**scope).values('bucket', 'action').annotate(n=Sum('count')).order_by()
+    for row in counts:
+        _bucket(row['bucket'])['counts'][row['action']] = row['n']
+
+    if granularity in DURATION_GRANULARITIES:
+        durations = StateDuration.objects.filter(**scope).values('bucket', 'state').annotate(s=Sum('seconds')).order_by()
+        for row in durations:
+            _bucket(row['bucket'])['durations'][row['state']] = row['s']
+
+        # the interval each device is still in has not been booked yet
+        marks = DeviceStateMark.objects.all()
+        if device_id is not None:
+            marks = marks.filter(device_id=device_id)
+        for (moment, state), seconds in open_durations(marks, granularity, start, min(end, timezone.now())).items():
+            totals = _bucket(moment)['durations']
+            totals[state] = totals.get(state, 0) + seconds
+
+    return [series[moment] for moment in sorted(series)]
+
+
+def prune_minute_rollups(cutoff, chunk_size=BATCH_SIZE):
+    """Delete minute count rows older than ``cutoff``, a chunk at a time."""
+    total = 0
+    stale = UsageCount.objects.filter(granularity='minute', bucket__lt=cutoff)
+    while True:
+        pks = list(stale.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return total
+        total += UsageCount.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,25 @@
+"""Fold new DeviceLog rows into the rollups as they are written.
+
+Batched writers (bulk device operations, buffered ingestion) send
+``logs_created``; single rows created through the ORM send ``post_save``.
+Both run inside the writing transaction, so logs and rollups commit together.
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.signals import logs_created
+
+from .rollups import apply_logs
+
+
+@receiver(logs_created, dispatch_uid='device_usage_logs_created')
+def logs_written(sender, logs, **kwargs):
+    apply_logs(logs)
+
+
+@receiver(post_save, sender=DeviceLog, dispatch_uid='device_usage_log_saved')
+def log_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        apply_logs([instance])
@@ -0,0 +1,98 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.writers import write_logs
+from server.apps.device_usage.models import DeviceStateMark, StateDuration, UsageCount
+from server.apps.device_usage.rollups import usage_series
+from server.apps.devices.models import Device
+
+T0 = datetime.datetime(2026, 3, 1, 10, 0, tzinfo=datetime.timezone.utc)
+
+
+def at(minutes):
+    return T0 + datetime.timedelta(minutes=minutes)
+
+
+class UsageRollupTests(APITestCase):
+    def setUp(self):
+        self.lamp = Device.objects.create(name='Lamp', device_type='light')
+
+    def _log(self, minutes, action, old=None, new=None):
+        return DeviceLog(device=self.lamp, action=action, old_value=old, new_value=new, timestamp=at(minutes))
+
+    def _write_history(self):
+        write_logs([
+            self._log(0, 'created'),
+            self._log(30, 'status_change', 'offline', 'online'),
+            self._log(31, 'turned_on'),
+            self._log(31, 'turned_on'),
+        ])
+        # single-row writes go through post_save
+        DeviceLog.objects.create(device=self.lamp, action='status_change', old_value='online',
+                                 new_value='offline', timestamp=at(100))
+
+    def _snapshot(self):
+        return (
+            sorted(UsageCount.objects.values_list('granularity', 'bucket', 'action', 'count')),
+            sorted(StateDuration.objects.values_list('granularity', 'bucket', 'state', 'seconds')),
+            list(DeviceStateMark.objects.values_list('device_id', 'state', 'since')),
+        )
+
+    def test_incremental_counts_and_durations(self):
+        self._write_history()
+
+        minute = usage_series('minute', at(0), at(120), self.lamp.pk)
+        self.assertEqual([b['bucket'] for b in minute], [at(0), at(30), at(31), at(100)])
+        self.assertEqual(minute[2]['counts'], {'turned_on': 2})
+
+        hours = usage_series('hour', at(0), at(120), self.lamp.pk)
+        self.assertEqual(hours[0]['counts'], {'created': 1, 'status_change': 1, 'turned_on': 2})
+        self.assertEqual(hours[0]['durations'], {'offline': 1800.0, 'online': 1800.0})
+        self.assertEqual(hours[1]['durations'], {'online': 2400.0, 'offline': 1200.0})
+
+        day = usage_series('day', at(0), at(120), self.lamp.pk)
+        self.assertEqual(day[0]['durations'], {'offline': 1800.0 + 1200.0, 'online': 4200.0})
+
+    def test_backfill_rebuilds_identical_rollups(self):
+        self._write_history()
+        incremental = self._snapshot()
+
+        UsageCount.objects.all().delete()
+        call_command('backfill_usage_rollups', stdout=StringIO())
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_endpoint_reads_rollups(self):
+        self._write_history()
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/usage/', {
+                'granularity': 'hour', 'start': at(0).isoformat(), 'end': at(120).isoformat(),
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['buckets']), 2)
+
+        response = self.client.get('/api/v1/usage/', {
+            'granularity': 'minute', 'start': at(0).isoformat(), 'end': (T0 + datetime.timedelta(days=30)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_open_intervals_are_summed_across_devices(self):
+        plug = Device.objects.create(name='Plug', device_type='plug')
+        sensor = Device.objects.create(name='Sensor', device_type='sensor')
+        DeviceStateMark.objects.all().delete()
+        DeviceStateMark.objects.bulk_create([
+            DeviceStateMark(device=self.lamp, state='online', since=at(10)),
+            DeviceStateMark(device=plug, state='online', since=at(75)),
+            DeviceStateMark(device=sensor, state='offline', since=at(-30)),
+        ])
+
+        hours = usage_series('hour', at(5), at(150))
+        self.assertEqual([(b['bucket'], b['durations']) for b in hours], [
+            (at(0), {'online': 3000.0, 'offline': 3300.0}),
+            (at(60), {'online': 6300.0, 'offline': 3600.0}),
+            (at(120), {'online': 3600.0, 'offline': 1800.0}),
+        ])
+        self.assertEqual(usage_series('hour', at(5), at(150), plug.pk)[0]['durations'], {'online': 2700.0})
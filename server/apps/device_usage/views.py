@@ -0,0 +1,56 @@
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .rollups import STEPS, usage_series
+
+DEFAULT_WINDOWS = {
+    'minute': STEPS['minute'] * 120,
+    'hour': STEPS['hour'] * 48,
+    'day': STEPS['day'] * 30,
+}
+MAX_BUCKETS = 1500
+
+
+class UsageQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=list(STEPS), default='hour')
+    device = serializers.UUIDField(required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        step = STEPS[attrs['granularity']]
+        end = attrs.get('end') or timezone.now()
+        start = attrs.get('start') or end - DEFAULT_WINDOWS[attrs['granularity']]
+        if start >= end:
+            raise serializers.ValidationError({'start': 'Must be before end.'})
+        if (end - start) / step > MAX_BUCKETS:
+            raise serializers.ValidationError(
+                f'At most {MAX_BUCKETS} {attrs["granularity"]} buckets per request; use a coarser granularity.'
+            )
+        return {**attrs, 'start': start, 'end': end}
+
+
+class UsageView(APIView):
+    """Usage chart data: log counts per action and time spent per status.
+
+    GET /api/v1/usage/?granularity=minute|hour|day&device=<id>&start=&end=
+    reads the rollup tables, never the raw logs. Without ``device`` the
+    figures cover all devices. Durations exist at hour and day granularity.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = UsageQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        buckets = usage_series(params['granularity'], params['start'], params['end'], params.get('device'))
+        return Response({
+            'granularity': params['granularity'],
+            'device': params.get('device'),
+            'start': params['start'],
+            'end': params['end'],
+            'buckets': buckets,
+        })
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class DevicesConfig(AppConfig):
+    name = 'server.apps.devices'
+    label = 'devices'
+
+    def ready(self):
+        from server.caching import connect_invalidation
+        from server.events import connect_publishers
+
+        from . import signals  # noqa: F401
+
+        connect_invalidation()
+        connect_publishers()
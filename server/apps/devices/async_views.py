@@ -0,0 +1,71 @@
+"""Async (ASGI-native) read endpoints for devices and their logs.
+
+Same payloads as the DeviceViewSet list/detail/logs responses, served at
+/api/v1/async/devices/... by coroutines over the async ORM. Under ASGI
+(``server/asgi.py``) a poll that waits on the database or the cache holds no
+thread while it waits; see ``server.async_support`` for the bound on the
+threads doing the work.
+"""
+
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.serializers import DeviceLogSerializer
+from server.async_support import cached_json_response, db_slots, json_response, method_not_allowed
+from server.pagination import NameKeysetPagination, TimestampKeysetPagination
+
+from .models import Device
+from .queries import plan_device_queryset
+from .serializers import DeviceSerializer
+
+NOT_FOUND = {'detail': 'No Device matches the given query.'}
+
+
+async def device_list(request):
+    if request.method != 'GET':
+        return method_not_allowed(request)
+    drf_request = Request(request)
+
+    async def build():
+        paginator = NameKeysetPagination()
+        page = await paginator.apaginate_queryset(plan_device_queryset(), drf_request)
+        data = DeviceSerializer(page, many=True, context={'request': drf_request}).data
+        return paginator.get_paginated_data(data)
+
+    async with db_slots():
+        try:
+            return await cached_json_response(request, 'devices', build)
+        except NotFound as exc:
+            return json_response({'detail': exc.detail}, status=404)
+
+
+async def device_detail(request, pk):
+    if request.method != 'GET':
+        return method_not_allowed(request)
+
+    async def build():
+        device = await plan_device_queryset().aget(pk=pk)
+        return DeviceSerializer(device, context={'request': Request(request)}).data
+
+    async with db_slots():
+        try:
+            return await cached_json_response(request, 'devices', build)
+        except Device.DoesNotExist:
+            return json_response(NOT_FOUND, status=404)
+
+
+async def device_logs(request, pk):
+    if request.method != 'GET':
+        return method_not_allowed(request)
+    drf_request = Request(request)
+
+    async with db_slots():
+        if not await Device.objects.filter(pk=pk).aexists():
+            return json_response(NOT_FOUND, status=404)
+        paginator = TimestampKeysetPagination()
+        try:
+            page = await paginator.apaginate_queryset(DeviceLog.objects.filter(device_id=pk), drf_request)
+        except NotFound as exc:
+            return json_response({'detail': exc.detail}, status=404)
+    return json_response(paginator.get_paginated_data(DeviceLogSerializer(page, many=True).data))
@@ -0,0 +1,113 @@
+"""Apply validated bulk device operations in chunked transactions.
+
+Each chunk is one transaction: creates go through ``bulk_create``, updates
+through a single ``in_bulk`` fetch plus ``bulk_update``, deletes through one
+``DELETE ... WHERE id IN``. The DeviceLog rows describing the changes are
+inserted in the same transaction, so a chunk either lands completely,
+history included, or not at all.
+
+Within a chunk creates run first, then updates, then deletes.
+"""
+
+import json
+
+from django.db import transaction
+from django.utils import timezone
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.writers import write_logs
+
+from .models import Device
+from .signals import devices_bulk_changed, state
+
+CHUNK_SIZE = 500
+
+
+def apply_operations(operations, chunk_size=CHUNK_SIZE):
+    """Apply ``operations`` (validated ``BulkDeviceOperationSerializer`` data).
+
+    Returns one result dict per operation, in request order.
+    """
+    results = [None] * len(operations)
+    for start in range(0, len(operations), chunk_size):
+        chunk = list(enumerate(operations[start:start + chunk_size], start))
+        with transaction.atomic():
+            _apply_chunk(chunk, results)
+    return results
+
+
+def _apply_chunk(chunk, results):
+    now = timezone.now()
+    logs = []
+    changed = {}
+
+    creates = [(index, op) for index, op in chunk if op['op'] == 'create']
+    updates = [(index, op) for index, op in chunk if op['op'] == 'update']
+    deletes = [(index, op) for index, op in chunk if op['op'] == 'delete']
+
+    if creates:
+        devices = [Device(**_device_fields(op)) for _, op in creates]
+        Device.objects.bulk_create(devices)
+        changed.update((device.pk, (None, (device.status, device.device_type))) for device in devices)
+        for (index, _), device in zip(creates, devices):
+            results[index] = _result(index, 'create', device.pk, 'created')
+            logs.append(DeviceLog(device=device, action='created', new_value='device created', timestamp=now))
+
+    if updates:
+        existing = Device.objects.in_bulk([op['id'] for _, op in updates])
+        changed_fields = set()
+        touched = {}
+        for index, op in updates:
+            device = existing.get(op['id'])
+            if device is None:
+                results[index] = _result(index, 'update', op['id'], 'not_found')
+                continue
+
+            fields = _device_fields(op)
+            old_status = device.status
+            changes = {}
+            for field, value in fields.items():
+                if getattr(device, field) != value:
+                    setattr(device, field, value)
+                    changes[field] = value
+            results[index] = _result(index, 'update', device.pk, 'updated')
+            if not changes:
+                continue
+
+            device.updated_at = now
+            changed_fields.update(changes)
+            touched[device.pk] = device
+            if 'status' in changes:
+                logs.append(DeviceLog(device=device, action='status_change',
+                                      old_value=old_status, new_value=device.status, timestamp=now))
+            logs.append(DeviceLog(device=device, action='updated',
+                                  new_value=json.dumps(changes, default=str, sort_keys=True), timestamp=now))
+
+        if touched:
+            # bulk_update bypasses auto_now, hence the explicit updated_at
+            Device.objects.bulk_update(touched.values(), sorted(changed_fields | {'updated_at'}))
+            changed.update(
+                (pk, (state(device), (device.status, device.device_type))) for pk, device in touched.items()
+            )
+
+    if deletes:
+        ids = [op['id'] for _, op in deletes]
+        found = set(Device.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        Device.objects.filter(pk__in=found).delete()
+        for index, op in deletes:
+            status = 'deleted' if op['id'] in found else 'not_found'
+            results[index] = _result(index, 'delete', op['id'], status)
+        # devices deleted in this chunk need no history (retention purges it)
+        logs = [log for log in logs if log.device_id not in found]
+
+    write_logs(logs)
+    if changed:
+        devices_bulk_changed.send(sender=Device, device_ids=list(changed), changes=changed)
+
+
+def _device_fields(op):
+    return {field: value for field, value in op.items() if field not in ('op', 'id')}
+
+
+def _result(index, op, pk, status):
+    return {'index': index, 'op': op, 'id': str(pk), 'status': status}
@@ -0,0 +1,125 @@
+"""Delta sync: which devices changed or disappeared since a cursor.
+
+A cursor records two keyset positions: the last ``(updated_at, id)`` of a
+changed device handed out and the last ``(deleted_at, device_id)`` of a
+tombstone handed out. Each call walks both indexes forward from there, so a
+sync costs O(changes) rather than O(devices).
+
+Without a cursor the feed starts with a full snapshot (every device,
+oldest change first) and tombstones from that moment on. Clients keep
+calling with the returned cursor while ``has_more`` is true, then poll with
+the last cursor they received.
+
+Tombstones older than ``DEVICE_TOMBSTONE_TTL_DAYS`` are pruned
+(``manage.py prune_device_tombstones``). A cursor older than that horizon
+may have missed deletes and is refused with 410, so the client resyncs.
+A call that finds no tombstones moves the tombstone position up to
+``TOMBSTONE_COMMIT_LAG`` before it started reading, so a client polling
+steadily never falls behind the horizon. A tombstone gets its
+``deleted_at`` inside the deleting transaction and may commit well after
+that moment; the lag keeps the cursor short of any such tombstone, and a
+snapshot starts the tombstone feed just as far back.
+"""
+
+import datetime
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from server.pagination import decode_cursor, encode_cursor, keyset_filter
+
+from .models import DeviceTombstone
+
+DEVICE_ORDERING = ('updated_at', 'id')
+TOMBSTONE_ORDERING = ('deleted_at', 'device_id')
+# longest a deleting transaction may stay open and still have its
+# tombstones picked up by a cursor moved forward while it ran
+TOMBSTONE_COMMIT_LAG = datetime.timedelta(minutes=5)
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def tombstone_horizon():
+    days = getattr(settings, 'DEVICE_TOMBSTONE_TTL_DAYS', 30)
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def parse_since(token):
+    """Decode a changes cursor. Raises ValueError when malformed."""
+    position = decode_cursor(token)
+    if not isinstance(position, dict) or set(position) != {'d', 't'}:
+        raise ValueError('unexpected cursor shape')
+
+    def _pair(value):
+        if value is None:
+            return None
+        stamp, pk = value
+        parsed = parse_datetime(stamp)
+        if parsed is None:
+            raise ValueError('bad timestamp')
+        # both orderings end in a device UUID
+        return parsed, uuid.UUID(str(pk))
+
+    devices, tombstones = _pair(position['d']), _pair(position['t'])
+    if tombstones is None:
+        raise ValueError('missing tombstone position')
+    return devices, tombstones
+
+
+def _pair_to_json(pair):
+    if pair is None:
+        return None
+    stamp, pk = pair
+    return [stamp.isoformat(), str(pk)]
+
+
+def collect_changes(queryset, since=None, limit=500):
+    """Return ``(changed devices, tombstones, next cursor, has_more)``.
+
+    ``queryset`` is the (planned) Device queryset to read changed rows from.
+    """
+    started = timezone.now()
+    settled = (started - TOMBSTONE_COMMIT_LAG, uuid.UUID(int=0))
+    if since is None:
+        device_pos = None
+        # older tombstones are irrelevant to the snapshot; within the lag,
+        # a delete may not have committed before the snapshot was read
+        tombstone_pos = settled
+    else:
+        device_pos, tombstone_pos = parse_since(since)
+        if tombstone_pos[0] < tombstone_horizon():
+            raise CursorExpired()
+
+    changed_qs = queryset.order_by(*DEVICE_ORDERING)
+    if device_pos is not None:
+        changed_qs = changed_qs.filter(keyset_filter(DEVICE_ORDERING, device_pos))
+    changed = list(changed_qs[:limit + 1])
+
+    tombstone_qs = DeviceTombstone.objects.order_by(*TOMBSTONE_ORDERING).filter(
+        keyset_filter(TOMBSTONE_ORDERING, tombstone_pos)
+    )
+    tombstones = list(tombstone_qs[:limit + 1])
+
+    has_more = len(changed) > limit or len(tombstones) > limit
+    changed, tombstones = changed[:limit], tombstones[:limit]
+
+    if changed:
+        device_pos = (changed[-1].updated_at, changed[-1].pk)
+    if tombstones:
+        tombstone_pos = (tombstones[-1].deleted_at, tombstones[-1].device_id)
+    elif tombstone_pos < settled:
+        # nothing was deleted up to the read, give or take open transactions
+        tombstone_pos = settled
+
+    cursor = encode_cursor({'d': _pair_to_json(device_pos), 't': _pair_to_json(tombstone_pos)})
+    return changed, tombstones, cursor, has_more
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention horizon. Returns the count."""
+    deleted, _ = DeviceTombstone.objects.filter(deleted_at__lt=tombstone_horizon()).delete()
+    return deleted
@@ -0,0 +1,295 @@
+"""Network discovery of smart-home devices.
+
+``DiscoveryScanner`` probes every host of a network over asyncio: a fixed
+pool of ``concurrency`` workers pulls addresses from the network lazily
+(``server.async_support.run_bounded``), so a /16 costs as much memory as a
+/29. Each probe connects to ``port``, sends ``GET <path>``, reads until
+the device closes the connection (at most ``MAX_RESPONSE_BYTES``) and
+expects a JSON description of the device::
+
+    {"name": "Hall Lamp", "device_type": "light", "brand": "Acme",
+     "model": "L1", "mac_address": "aa:bb:cc:dd:ee:ff"}
+
+Connect and read together are bounded by ``timeout`` per host. Hosts that
+accept the connection but answer anything else are reported as
+unidentified and not stored.
+
+Answers are matched against the existing devices through an in-memory
+index of ``mac_address`` and ``ip_address`` loaded once per scan: by MAC
+first, then by IP unless the MACs disagree. Matched devices are written
+only when their address changed. New ones are created ``online`` with a
+``created`` DeviceLog. Writes happen in batches of ``batch_size`` as
+answers arrive, one transaction and one upsert each, like the inventory
+import (``inventory.py``), and send ``devices_bulk_changed``.
+
+``manage.py discover`` scans in the foreground. The API (admins only)
+calls ``start_scan``, which runs the scan on a background thread and keeps
+its state in the cache under a job id for ``JOB_TTL`` seconds; only one scan
+runs at a time. With a shared cache backend (see ``server/caching.py``) the
+job and that limit hold across workers.
+
+Settings (``DEVICE_DISCOVERY``): ``PORT``, ``PATH``, ``TIMEOUT`` (seconds),
+``CONCURRENCY``, ``MAX_HOSTS`` (largest network the API will scan) and
+``BACKGROUND`` (False runs API scans inside the request).
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import math
+import threading
+import uuid
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.writers import write_logs
+from server.async_support import run_bounded
+
+from .models import Device
+from .signals import devices_bulk_changed, state
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'PORT': 80,
+    'PATH': '/device-info',
+    'TIMEOUT': 1.0,
+    'CONCURRENCY': 256,
+    'MAX_HOSTS': 4096,
+    'BACKGROUND': True,
+}
+BATCH_SIZE = 500
+MAX_RESPONSE_BYTES = 64 * 1024
+DEVICE_FIELDS = ('name', 'device_type', 'brand', 'model')
+JOB_TTL = 24 * 60 * 60
+RUNNING_KEY = 'discovery:running'
+
+
+def discovery_options():
+    return {**DEFAULTS, **getattr(settings, 'DEVICE_DISCOVERY', {})}
+
+
+def normalize_mac(mac):
+    if not mac:
+        return None
+    return mac.strip().replace('-', ':').upper() or None
+
+
+def parse_device_info(raw):
+    """Device fields from a raw HTTP response, or None if it describes no device."""
+    head, _, body = raw.partition(b'\r\n\r\n')
+    status = head.split(b'\r\n', 1)[0].split()
+    if len(status) < 2 or status[1] != b'200':
+        return None
+    try:
+        info = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(info, dict) or not info.get('name') or not info.get('device_type'):
+        return None
+    fields = {name: str(info[name])[:Device._meta.get_field(name).max_length]
+              for name in DEVICE_FIELDS if info.get(name)}
+    mac = normalize_mac(info.get('mac_address'))
+    if mac and len(mac) <= Device._meta.get_field('mac_address').max_length:
+        fields['mac_address'] = mac
+    return fields
+
+
+class DeviceIndex:
+    """Known devices by MAC and IP, kept current as the scan writes."""
+
+    def __init__(self):
+        self.by_mac = {}
+        self.by_ip = {}
+        for pk, ip, mac in Device.objects.values_list('pk', 'ip_address', 'mac_address').iterator():
+            self.add(pk, ip, mac)
+
+    def add(self, pk, ip, mac):
+        mac = normalize_mac(mac)
+        if mac:
+            self.by_mac[mac] = (pk, ip, mac)
+        if ip:
+            self.by_ip[ip] = (pk, ip, mac)
+
+    def match(self, ip, mac):
+        """The known device answering at ``ip`` with ``mac``, or None."""
+        if mac and mac in self.by_mac:
+            return self.by_mac[mac][0]
+        known = self.by_ip.get(ip)
+        if known is not None and (not mac or not known[2]):
+            return known[0]
+        return None
+
+
+class DiscoveryScanner:
+    def __init__(self, port=None, path=None, timeout=None, concurrency=None, batch_size=BATCH_SIZE):
+        options = discovery_options()
+        self.port = port or options['PORT']
+        self.path = path or options['PATH']
+        self.timeout = timeout or options['TIMEOUT']
+        self.concurrency = concurrency or options['CONCURRENCY']
+        self.batch_size = batch_size
+        self.stats = {'scanned': 0, 'responded': 0, 'known': 0, 'created': [], 'updated': [], 'unidentified': []}
+        self._index = None
+        self._found = []
+
+    async def probe(self, host):
+        """Return ``(responded, device fields or None)`` for one host."""
+        try:
+            return await asyncio.wait_for(self._probe(host), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False, None
+
+    async def _probe(self, host):
+        reader, writer = await asyncio.open_connection(host, self.port)
+        try:
+            writer.write(
+                f'GET {self.path} HTTP/1.0\r\nHost: {host}\r\nAccept: application/json\r\n'
+                f'Connection: close\r\n\r\n'.encode()
+            )
+            await writer.drain()
+            # the answer may arrive in several segments; it ends when the
+            # device closes the connection
+            chunks, size = [], 0
+            while size < MAX_RESPONSE_BYTES:
+                chunk = await reader.read(MAX_RESPONSE_BYTES - size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+        finally:
+            writer.close()
+        return True, parse_device_info(b''.join(chunks))
+
+    async def scan(self, network):
+        """Probe every host of ``network`` and store what answers. Returns ``self.stats``."""
+        network = ipaddress.ip_network(network, strict=False)
+        self._index = await sync_to_async(DeviceIndex)()
+        hosts = network.hosts() if network.num_addresses > 1 else [network.network_address]
+        await run_bounded(hosts, self._visit, self.concurrency)
+        await self._flush()
+        return self.stats
+
+    async def _visit(self, host):
+        host = str(host)
+        responded, fields = await self.probe(host)
+        self.stats['scanned'] += 1
+        if not responded:
+            return
+        self.stats['responded'] += 1
+        if fields is None:
+            self.stats['unidentified'].append(host)
+            return
+        self._found.append((host, fields))
+        if len(self._found) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        batch, self._found = self._found, []
+        if batch:
+            await sync_to_async(self._store)(batch)
+
+    def _store(self, batch):
+        now = timezone.now()
+        with transaction.atomic():
+            existing = Device.objects.in_bulk(
+                {self._index.match(ip, fields.get('mac_address')) for ip, fields in batch} - {None}
+            )
+            pending = {}
+            created = set()
+            for ip, fields in batch:
+                mac = fields.get('mac_address')
+                pk = self._index.match(ip, mac)
+                device = pending.get(pk) or existing.get(pk)
+                if device is None:
+                    device = Device(ip_address=ip, status='online', last_seen=now, **fields)
+                    created.add(device.pk)
+                elif device.ip_address != ip or (mac and normalize_mac(device.mac_address) != mac):
+                    device.ip_address = ip
+                    device.mac_address = mac or device.mac_address
+                    device.last_seen = now
+                else:
+                    self.stats['known'] += 1
+                    continue
+                self._index.add(device.pk, ip, device.mac_address)
+                pending[device.pk] = device
+
+            if not pending:
+                return
+            Device.objects.bulk_create(
+                pending.values(),
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=['ip_address', 'mac_address', 'last_seen', 'updated_at'],
+            )
+            write_logs([
+                DeviceLog(device_id=pk, action='created', new_value=f'discovered at {pending[pk].ip_address}',
+                          timestamp=now)
+                for pk in created
+            ])
+            changes = {
+                pk: (None if pk in created else state(device), (device.status, device.device_type))
+                for pk, device in pending.items()
+            }
+            devices_bulk_changed.send(sender=Device, device_ids=list(pending), changes=changes)
+
+        self.stats['created'] += [str(pk) for pk in pending if pk in created]
+        self.stats['updated'] += [str(pk) for pk in pending if pk not in created]
+
+
+def _job_key(job_id):
+    return f'discovery:job:{job_id}'
+
+
+def get_scan(job_id):
+    """The state of the scan started as ``job_id``, or None once expired."""
+    return cache.get(_job_key(job_id))
+
+
+def start_scan(network, timeout=None):
+    """Scan ``network`` in the background. Returns the job, or None while another scan runs.
+
+    A job is ``{"id", "network", "status", "result"}``; ``status`` goes from
+    ``running`` to ``done`` (``result`` holds the scanner's stats) or
+    ``failed``.
+    """
+    options = discovery_options()
+    network = ipaddress.ip_network(network, strict=False)
+    timeout = timeout or options['TIMEOUT']
+    job = {'id': str(uuid.uuid4()), 'network': str(network), 'status': 'running', 'result': None}
+    # outlives a scan killed along with its process by one scan's length at most
+    longest = math.ceil(network.num_addresses / options['CONCURRENCY']) * timeout + 60
+    if not cache.add(RUNNING_KEY, job['id'], timeout=longest):
+        return None
+    cache.set(_job_key(job['id']), job, JOB_TTL)
+    if not options['BACKGROUND']:
+        return _run_scan(job, network, timeout)
+    threading.Thread(target=_run_scan_thread, args=(dict(job), network, timeout),
+                     name='device-discovery', daemon=True).start()
+    return job
+
+
+def _run_scan(job, network, timeout):
+    try:
+        job['result'] = async_to_sync(DiscoveryScanner(timeout=timeout).scan)(network)
+        job['status'] = 'done'
+    except Exception:
+        logger.exception("Discovery scan of %s failed", network)
+        job['status'] = 'failed'
+    finally:
+        cache.set(_job_key(job['id']), job, JOB_TTL)
+        cache.delete(RUNNING_KEY)
+    return job
+
+
+def _run_scan_thread(job, network, timeout):
+    try:
+        _run_scan(job, network, timeout)
+    finally:
+        connections.close_all()
@@ -0,0 +1,261 @@
+"""Streaming bulk import of devices, rooms and categories.
+
+``InventoryImporter`` consumes records (dicts from NDJSON lines or CSV rows)
+one batch at a time. Each record has an optional ``kind`` (``device``, the
+default, ``room`` or ``category``).
+
+Devices name their room and category either by id (``room_id``,
+``category_id``) or by name (``room``, ``category``); names are resolved
+through in-memory maps loaded once, and unknown names are created. A device
+row updates an existing device when its ``id`` matches, or else its
+``mac_address``; otherwise it is created. Each batch is one transaction:
+one ``in_bulk`` read of the devices it touches and one
+``bulk_create(update_conflicts=True)`` upsert. Fields a row does not mention
+keep their stored value.
+
+Imports write no DeviceLog history; they send ``devices_bulk_changed`` per
+batch so caches, counters and event subscribers catch up.
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+
+from server.apps.device_categories.models import DeviceCategory
+from server.apps.rooms.models import Room
+
+from .models import Device
+from .signals import devices_bulk_changed, state
+
+BATCH_SIZE = 5000
+
+DEVICE_FIELDS = (
+    'name', 'device_type', 'brand', 'model', 'ip_address', 'mac_address', 'status', 'is_active', 'last_seen',
+)
+REQUIRED_FIELDS = ('name', 'device_type')
+
+
+class InventoryError(ValueError):
+    pass
+
+
+def _to_python(name, value):
+    field = Device._meta.get_field(name)
+    if value is None:
+        return None
+    # NDJSON can carry any JSON type; to_python() stringifies some and
+    # raises TypeError on others
+    boolean = isinstance(field, models.BooleanField)
+    if not isinstance(value, (bool, int, str) if boolean else str):
+        raise InventoryError(f'{name}: expected a {"boolean" if boolean else "string"}, got {type(value).__name__}')
+    if boolean and isinstance(value, str):
+        # CSV spells booleans every which way
+        value = value.strip().lower()
+        value = {'true': True, 'yes': True, 'y': True, 'false': False, 'no': False, 'n': False}.get(value, value)
+    return field.to_python(value)
+
+
+def open_records(path, output_format=None):
+    """Yield ``(line number, record)`` from an NDJSON or CSV file.
+
+    ``path`` may be ``-`` for stdin and may end in ``.gz``. The format is
+    taken from the extension unless ``output_format`` is given.
+    """
+    name = path[:-3] if path.endswith('.gz') else path
+    output_format = output_format or ('csv' if name.endswith('.csv') else 'ndjson')
+    if path == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    elif path.endswith('.gz'):
+        stream = gzip.open(path, 'rt', encoding='utf-8', newline='')
+    else:
+        stream = open(path, encoding='utf-8', newline='')
+
+    with stream:
+        if output_format == 'csv':
+            for number, row in enumerate(csv.DictReader(stream), 2):
+                yield number, {key: value for key, value in row.items() if value != ''}
+        else:
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    yield number, InventoryError(f'invalid JSON: {exc}')
+                    continue
+                if not isinstance(record, dict):
+                    yield number, InventoryError(f'expected a JSON object, got {type(record).__name__}')
+                    continue
+                yield number, record
+
+
+class InventoryImporter:
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.stats = {'created': 0, 'updated': 0, 'rooms': 0, 'categories': 0, 'skipped': 0}
+        self.errors = []
+        self._rooms = {}
+        for pk, name in Room.objects.order_by('-created_at').values_list('pk', 'name'):
+            self._rooms[name] = pk  # oldest wins for duplicate names
+        self._room_ids = set(Room.objects.values_list('pk', flat=True))
+        self._categories = dict(DeviceCategory.objects.values_list('name', 'pk'))
+        self._category_ids = set(self._categories.values())
+
+    def run(self, records, progress=None):
+        """Import ``(line number, record)`` pairs. Returns ``self.stats``."""
+        batch = []
+        for number, record in records:
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+                if progress is not None:
+                    progress(self.stats)
+        if batch:
+            self._import_batch(batch)
+        return self.stats
+
+    def _skip(self, number, message):
+        self.stats['skipped'] += 1
+        self.errors.append((number, message))
+
+    def _import_batch(self, batch):
+        devices = []
+        with transaction.atomic():
+            for number, record in batch:
+                if isinstance(record, Exception):
+                    self._skip(number, str(record))
+                    continue
+                kind = record.get('kind', 'device')
+                try:
+                    if kind == 'room':
+                        self._room(record)
+                    elif kind == 'category':
+                        self._category(record)
+                    elif kind == 'device':
+                        devices.append((number, self._device_fields(record)))
+                    else:
+                        raise InventoryError(f'unknown kind {kind!r}')
+                except (InventoryError, ValidationError) as exc:
+                    self._skip(number, '; '.join(getattr(exc, 'messages', [str(exc)])))
+            if devices:
+                self._upsert_devices(devices)
+
+    def _room(self, record):
+        name = record.get('name')
+        if not name:
+            raise InventoryError('room without name')
+        fields = {'name': name, **({'description': record['description']} if 'description' in record else {})}
+        pk = record.get('id') or self._rooms.get(name)
+        if pk:
+            room, _ = Room.objects.update_or_create(pk=pk, defaults=fields)
+        else:
+            room = Room.objects.create(**fields)
+        self._rooms[name] = room.pk
+        self._room_ids.add(room.pk)
+        self.stats['rooms'] += 1
+
+    def _category(self, record):
+        name = record.get('name')
+        if not name:
+            raise InventoryError('category without name')
+        category, _ = DeviceCategory.objects.update_or_create(name=name, defaults={
+            **({'icon': record['icon']} if 'icon' in record else {}),
+        })
+        self._categories[name] = category.pk
+        self._category_ids.add(category.pk)
+        self.stats['categories'] += 1
+
+    def _related_id(self, record, field, names, ids, model):
+        """Resolve ``<field>_id``, or ``<field>`` as a name (created if new)."""
+        if f'{field}_id' in record:
+            pk = record[f'{field}_id']
+            if pk is None:
+                return None
+            pk = Device._meta.get_field(f'{field}_id').to_python(pk)
+            if pk not in ids:
+                raise InventoryError(f'unknown {field}_id {pk}')
+            return pk
+        name = record[field]
+        if name is None:
+            return None
+        if not isinstance(name, str):
+            raise InventoryError(f'{field}: expected a name, got {type(name).__name__}')
+        if name not in names:
+            names[name] = model.objects.create(name=name).pk
+            ids.add(names[name])
+            self.stats['rooms' if field == 'room' else 'categories'] += 1
+        return names[name]
+
+    def _device_fields(self, record):
+        values = {name: _to_python(name, record[name]) for name in ('id', *DEVICE_FIELDS) if name in record}
+        if values.get('id') is None:
+            values.pop('id', None)
+        if 'room' in record or 'room_id' in record:
+            values['room_id'] = self._related_id(record, 'room', self._rooms, self._room_ids, Room)
+        if 'category' in record or 'category_id' in record:
+            values['category_id'] = self._related_id(
+                record, 'category', self._categories, self._category_ids, DeviceCategory
+            )
+        return values
+
+    def _upsert_devices(self, rows):
+        ids = [fields['id'] for _, fields in rows if fields.get('id')]
+        macs = [fields['mac_address'] for _, fields in rows if not fields.get('id') and fields.get('mac_address')]
+        existing = Device.objects.in_bulk(ids) if ids else {}
+        by_mac = {}
+        if macs:
+            for device in Device.objects.filter(mac_address__in=macs):
+                by_mac.setdefault(device.mac_address, device)
+
+        pending = {}
+        created = set()
+        touched = set()
+        for number, fields in rows:
+            try:
+                # validate only what the row provides; the rest is kept
+                Device(**fields).clean_fields(exclude=[
+                    field.name for field in Device._meta.fields if field.attname not in fields or field.is_relation
+                ] + ['id'])
+            except ValidationError as exc:
+                self._skip(number, '; '.join(exc.messages))
+                continue
+
+            device = pending.get(fields.get('id')) or existing.get(fields.get('id'))
+            if device is None and 'id' not in fields and fields.get('mac_address'):
+                device = by_mac.get(fields['mac_address'])
+            if device is None:
+                missing = [name for name in REQUIRED_FIELDS if not fields.get(name)]
+                if missing:
+                    self._skip(number, f'new device without {", ".join(missing)}')
+                    continue
+                device = Device(**fields)
+                created.add(device.pk)
+            else:
+                for name, value in fields.items():
+                    setattr(device, name, value)
+            if device.mac_address:
+                by_mac.setdefault(device.mac_address, device)
+            touched.update(name for name in fields if name != 'id')
+            pending[device.pk] = device
+
+        if not pending:
+            return
+        Device.objects.bulk_create(
+            pending.values(),
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=sorted(touched | {'updated_at'}),
+        )
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(pending) - len(created)
+        changes = {
+            pk: (None if pk in created else state(device), (device.status, device.device_type))
+            for pk, device in pending.items()
+        }
+        devices_bulk_changed.send(sender=Device, device_ids=list(pending), changes=changes)
@@ -0,0 +1,93 @@
+"""Compare DeviceSerializer with the .values() fast path on large device lists.
+
+    python manage.py bench_device_serializers
+    python manage.py bench_device_serializers --rows 10000 100000 --repeat 5
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from server.apps.device_categories.models import DeviceCategory
+from server.apps.devices.fastpath import device_values_serializer
+from server.apps.devices.models import Device
+from server.apps.devices.queries import plan_device_queryset
+from server.apps.devices.serializers import DeviceSerializer
+from server.apps.rooms.models import Room
+from server.benchmarks import scratch_database
+
+
+class Command(BaseCommand):
+    help = 'Time query, serialization and rendering of device lists through DeviceSerializer and the fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000], help='list sizes to measure')
+        parser.add_argument('--repeat', type=int, default=3, help='runs per size and path (best is reported)')
+        parser.add_argument('--db', default='bench_device_serializers.sqlite3', help='scratch database file')
+
+    def handle(self, *args, **options):
+        with scratch_database(options['db']) as alias:
+            self._generate(alias, max(options['rows']))
+            for rows in options['rows']:
+                self._measure(alias, rows, options['repeat'])
+
+    def _generate(self, alias, rows):
+        rooms = Room.objects.using(alias).bulk_create([Room(name=f'room-{i}') for i in range(50)])
+        categories = DeviceCategory.objects.using(alias).bulk_create(
+            [DeviceCategory(name=f'category-{i}', icon='bulb') for i in range(10)]
+        )
+        rng = random.Random(42)
+        Device.objects.using(alias).bulk_create(
+            [
+                Device(
+                    name=f'device-{i:06}', device_type='light', brand='acme', ip_address=f'10.0.{i // 250 % 256}.{i % 250}',
+                    status=rng.choice(('online', 'offline')),
+                    room=rng.choice(rooms + [None]), category=rng.choice(categories + [None]),
+                )
+                for i in range(rows)
+            ],
+            batch_size=5000,
+        )
+
+    def _measure(self, alias, rows, repeat):
+        renderer = JSONRenderer()
+        plan = device_values_serializer()
+
+        def queryset():
+            return Device.objects.using(alias).order_by('name', 'id')[:rows]
+
+        def serializer_path():
+            instances = list(plan_device_queryset(queryset()))
+            fetched = time.perf_counter()
+            data = DeviceSerializer(instances, many=True).data
+            return fetched, data
+
+        def fast_path():
+            values = list(plan.values(queryset()))
+            fetched = time.perf_counter()
+            return fetched, plan.render(values, using=alias)
+
+        self.stdout.write(f'\n{rows} devices')
+        outputs = {}
+        for label, run in (('serializer', serializer_path), ('fast path', fast_path)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fetched, data = run()
+                serialized = time.perf_counter()
+                body = renderer.render(data)
+                done = time.perf_counter()
+                timings = (fetched - start, serialized - fetched, done - serialized, done - start)
+                if best is None or timings[-1] < best[-1]:
+                    best = timings
+            outputs[label] = body
+            query, serialize, render, total = (t * 1000 for t in best)
+            self.stdout.write(
+                f'  {label:10}  query {query:8.1f}ms  serialize {serialize:8.1f}ms  '
+                f'render {render:7.1f}ms  total {total:8.1f}ms  ({len(body) / 1e6:.1f} MB)'
+            )
+        if outputs['serializer'] != outputs['fast path']:
+            raise CommandError('fast path output differs from DeviceSerializer')
+        self.stdout.write('  identical JSON')
@@ -0,0 +1,74 @@
+"""Micro-benchmark DRF's JSONRenderer/JSONParser against the fast pair.
+
+Payloads are built in memory from unsaved instances, so no database is
+needed:
+
+    python manage.py bench_json_renderers
+    python manage.py bench_json_renderers --rows 1000 --repeat 50
+"""
+
+import io
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from server.apps.device_categories.models import DeviceCategory
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.serializers import DeviceLogSerializer
+from server.apps.devices.models import Device
+from server.apps.devices.serializers import DeviceSerializer
+from server.apps.rooms.models import Room
+from server.benchmarks import summarize, timed
+from server.parsers import FastJSONParser
+from server.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = 'Time rendering and parsing of DeviceSerializer and DeviceLogSerializer payloads with both JSON backends.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='objects per payload')
+        parser.add_argument('--repeat', type=int, default=30)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"fast backend: {'orjson ' + orjson.__version__ if orjson else 'stdlib (orjson not installed)'}")
+        rows, repeat = options['rows'], options['repeat']
+        devices, logs = self._payloads(rows)
+        payloads = {
+            f'DeviceSerializer x{rows}': devices,
+            f'DeviceLogSerializer x{rows}': logs,
+            # what a values()-built response hands the encoder: UUID/datetime objects
+            f'raw log values x{rows}': [
+                {'id': uuid.uuid4(), 'device_id': uuid.uuid4(), 'action': 'turned_on', 'timestamp': timezone.now()}
+                for _ in range(rows)
+            ],
+        }
+        for label, data in payloads.items():
+            self.stdout.write(f'\n{label}')
+            body = JSONRenderer().render(data)
+            for name, renderer, parser in (
+                ('stdlib', JSONRenderer(), JSONParser()),
+                ('fast', FastJSONRenderer(), FastJSONParser()),
+            ):
+                self.stdout.write(f'  {name:6} render {summarize(timed(lambda: renderer.render(data), repeat))}')
+                self.stdout.write(f'  {name:6} parse  {summarize(timed(lambda: parser.parse(io.BytesIO(body)), repeat))}')
+
+    def _payloads(self, rows):
+        now = timezone.now()
+        room = Room(name='Kitchen', description='ground floor', created_at=now)
+        room.num_devices = rows
+        category = DeviceCategory(name='Lights', icon='bulb')
+        category.num_devices = rows
+        devices = [
+            Device(name=f'device-{i}', device_type='light', brand='acme', ip_address='10.0.0.1',
+                   status='online', last_seen=now, created_at=now, updated_at=now, room=room, category=category)
+            for i in range(rows)
+        ]
+        logs = [
+            DeviceLog(id=uuid.uuid4(), device=devices[i], action='turned_on', old_value='off', new_value='on', timestamp=now)
+            for i in range(rows)
+        ]
+        return DeviceSerializer(devices, many=True).data, DeviceLogSerializer(logs, many=True).data
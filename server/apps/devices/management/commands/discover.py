@@ -0,0 +1,47 @@
+"""Scan a network for devices and add the new ones.
+
+    python manage.py discover 192.168.1.0/24
+    python manage.py discover 10.0.0.0/16 --port 8080 --timeout 0.5 --concurrency 1024
+
+See server/apps/devices/discovery.py for the probe and how answers are
+matched against known devices.
+"""
+
+import ipaddress
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand, CommandError
+
+from server.apps.devices.discovery import BATCH_SIZE, DiscoveryScanner
+
+
+class Command(BaseCommand):
+    help = 'Probe every host of a network concurrently and upsert the devices that describe themselves.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('network', help='network in CIDR notation, e.g. 192.168.1.0/24')
+        parser.add_argument('--port', type=int, default=None, help='port to probe (default: DEVICE_DISCOVERY)')
+        parser.add_argument('--path', default=None, help='device description path (default: DEVICE_DISCOVERY)')
+        parser.add_argument('--timeout', type=float, default=None, help='seconds per host')
+        parser.add_argument('--concurrency', type=int, default=None, help='hosts probed at once')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='devices per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            network = ipaddress.ip_network(options['network'], strict=False)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        scanner = DiscoveryScanner(port=options['port'], path=options['path'], timeout=options['timeout'],
+                                   concurrency=options['concurrency'], batch_size=options['batch_size'])
+        started = time.perf_counter()
+        stats = async_to_sync(scanner.scan)(network)
+
+        if options['verbosity'] > 1:
+            for host in stats['unidentified']:
+                self.stdout.write(f'{host}: answered without a device description')
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {stats['scanned']} hosts in {time.perf_counter() - started:.1f}s: {stats['responded']} "
+            f"answered, {len(stats['created'])} new devices, {len(stats['updated'])} moved, "
+            f"{stats['known']} known, {len(stats['unidentified'])} unidentified."
+        ))
@@ -0,0 +1,53 @@
+"""Load devices, rooms and categories from an NDJSON or CSV inventory.
+
+    python manage.py import_inventory devices.ndjson
+    python manage.py import_inventory inventory.csv.gz --batch-size 10000
+    cat devices.ndjson | python manage.py import_inventory - --format ndjson
+
+See server/apps/devices/inventory.py for the record format.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from server.apps.devices.inventory import BATCH_SIZE, InventoryImporter, open_records
+
+MAX_REPORTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = 'Upsert devices (and the rooms/categories they name) from an NDJSON or CSV file in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='inventory file (.ndjson, .csv, optionally .gz) or - for stdin')
+        parser.add_argument('--format', choices=['ndjson', 'csv'], default=None,
+                            help='input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='records per transaction')
+
+    def handle(self, *args, **options):
+        importer = InventoryImporter(batch_size=options['batch_size'])
+        started = time.perf_counter()
+
+        def progress(stats):
+            if options['verbosity'] > 1:
+                done = stats['created'] + stats['updated']
+                self.stdout.write(f'{done} devices, {done / (time.perf_counter() - started):,.0f}/s')
+
+        try:
+            stats = importer.run(open_records(options['path'], options['format']), progress=progress)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+
+        for number, message in importer.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(f'line {number}: {message}')
+        if len(importer.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... and {len(importer.errors) - MAX_REPORTED_ERRORS} more')
+
+        elapsed = time.perf_counter() - started
+        devices = stats['created'] + stats['updated']
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {devices} devices ({stats['created']} created, {stats['updated']} updated), "
+            f"{stats['rooms']} rooms, {stats['categories']} categories, skipped {stats['skipped']} "
+            f"in {elapsed:.1f}s ({devices / elapsed if elapsed else 0:,.0f} devices/s)."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from server.apps.devices.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete device tombstones older than DEVICE_TOMBSTONE_TTL_DAYS.'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones.'))
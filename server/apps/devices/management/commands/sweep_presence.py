@@ -0,0 +1,30 @@
+"""Mark devices offline when their heartbeats stop (server/apps/devices/presence.py).
+
+Run it from cron, or keep it running with --every:
+
+    python manage.py sweep_presence --every 30
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from server.apps.devices.presence import sweep
+
+
+class Command(BaseCommand):
+    help = 'Flip online devices whose last heartbeat is older than DEVICE_PRESENCE["OFFLINE_AFTER"] to offline.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offline-after', type=int, default=None, help='seconds of silence before offline')
+        parser.add_argument('--every', type=float, default=None, help='repeat every N seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            flipped = sweep(offline_after=options['offline_after'])
+            self.stdout.write(self.style.SUCCESS(f'Marked {flipped} devices offline.'))
+            if options['every'] is None:
+                return
+            close_old_connections()
+            time.sleep(options['every'])
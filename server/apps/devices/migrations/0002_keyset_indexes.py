@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_categories', '0001_initial'),
+        ('devices', '0001_initial'),
+        ('rooms', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['name', 'id'], name='devices_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_categories', '0001_initial'),
+        ('devices', '0002_keyset_indexes'),
+        ('rooms', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'device_tombstones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['updated_at', 'id'], name='devices_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devicetombstone',
+            index=models.Index(fields=['deleted_at', 'device_id'], name='device_tombstones_del_idx'),
+        ),
+    ]
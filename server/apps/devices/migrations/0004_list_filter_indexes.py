@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:25
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_categories', '0001_initial'),
+        ('devices', '0003_device_tombstones'),
+        ('rooms', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='device',
+            name='category',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='devices', to='device_categories.devicecategory'),
+        ),
+        migrations.AlterField(
+            model_name='device',
+            name='room',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='devices', to='rooms.room'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['status', 'name', 'id'], name='devices_status_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['device_type', 'name', 'id'], name='devices_type_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['room', 'name', 'id'], name='devices_room_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['category', 'name', 'id'], name='devices_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['is_active', 'name', 'id'], name='devices_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['last_seen', 'id'], name='devices_last_seen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='devices_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(django.db.models.functions.text.Lower('ip_address'), name='devices_ip_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(django.db.models.functions.text.Lower('mac_address'), name='devices_mac_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('device_categories', '0001_initial'),
+        ('devices', '0004_list_filter_indexes'),
+        ('rooms', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(fields=['status', 'last_seen'], name='devices_status_seen_idx'),
+        ),
+    ]
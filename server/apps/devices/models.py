@@ -27,14 +27,81 @@ Acceptance criteria:
 
 
 from django.db import models
+from django.db.models import Count
+from django.db.models.functions import Lower
+from django.db.models.query import ModelIterable
 from django.utils.timezone import now
 from django.apps import apps
 from typing import Optional, TYPE_CHECKING, Any
 import uuid
 
+
+class DeviceQuerySet(models.QuerySet):
+    _count_relations = ()
+
+    def with_related_counts(self, *relations):
+        """Set ``<relation>_device_count`` on every fetched device.
+
+        The counts are loaded once per evaluation, with one ``GROUP BY`` per
+        relation over the FK ids of the fetched devices, so a page costs the
+        same whatever the table size.
+        """
+        clone = self._chain()
+        clone._count_relations = relations
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._count_relations = self._count_relations
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is not None
+        super()._fetch_all()
+        if not fetched and self._count_relations and self._iterable_class is ModelIterable:
+            self._attach_related_counts(self._result_cache)
+
+    def _attach_related_counts(self, devices):
+        for relation in self._count_relations:
+            column = f'{relation}_id'
+            keys = {getattr(device, column) for device in devices} - {None}
+            counts = {}
+            if keys:
+                counts = dict(
+                    self.model._base_manager.using(self.db).filter(**{f'{relation}__in': keys})
+                    .order_by().values(relation).annotate(n=Count('pk')).values_list(relation, 'n')
+                )
+            for device in devices:
+                key = getattr(device, column)
+                if key is not None:
+                    setattr(device, f'{relation}_device_count', counts.get(key, 0))
+
+
 class Device(models.Model):
     class Meta:
         db_table = "devices"
+        indexes = [
+            # keyset pagination order, see server/pagination.py
+            models.Index(fields=['name', 'id'], name='devices_name_id_idx'),
+            # delta sync order, see server/apps/devices/changes.py
+            models.Index(fields=['updated_at', 'id'], name='devices_updated_id_idx'),
+            # list filters (filters.py): each serves a filtered page in
+            # keyset order. The room/category ones also replace the FK indexes.
+            models.Index(fields=['status', 'name', 'id'], name='devices_status_name_idx'),
+            models.Index(fields=['device_type', 'name', 'id'], name='devices_type_name_idx'),
+            models.Index(fields=['room', 'name', 'id'], name='devices_room_name_idx'),
+            models.Index(fields=['category', 'name', 'id'], name='devices_category_name_idx'),
+            models.Index(fields=['is_active', 'name', 'id'], name='devices_active_name_idx'),
+            models.Index(fields=['last_seen', 'id'], name='devices_last_seen_idx'),
+            # presence sweeper (presence.py): online devices by last ping
+            models.Index(fields=['status', 'last_seen'], name='devices_status_seen_idx'),
+            # prefix search, matched as ranges over LOWER(column)
+            models.Index(Lower('name'), name='devices_name_lower_idx'),
+            models.Index(Lower('ip_address'), name='devices_ip_lower_idx'),
+            models.Index(Lower('mac_address'), name='devices_mac_lower_idx'),
+        ]
+    objects = DeviceQuerySet.as_manager()
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     device_type = models.CharField(max_length=50)
@@ -51,9 +118,30 @@ class Device(models.Model):
     # Foreign Keys
     # Use explicit app_label.ModelName strings so Django resolves cross-app
     # relations correctly (avoids interpreting 'Room' as 'devices.Room').
-    room = models.ForeignKey('rooms.Room', related_name='devices', null=True, blank=True, on_delete=models.SET_NULL)
+    # No standalone FK indexes: devices_room_name_idx and
+    # devices_category_name_idx lead with these columns.
+    room = models.ForeignKey('rooms.Room', related_name='devices', null=True, blank=True, on_delete=models.SET_NULL,
+                             db_index=False)
 
-    category = models.ForeignKey('device_categories.DeviceCategory', related_name='devices', null=True, blank=True, on_delete=models.SET_NULL)
+    category = models.ForeignKey('device_categories.DeviceCategory', related_name='devices', null=True, blank=True,
+                                 on_delete=models.SET_NULL, db_index=False)
+
+    # Column values remembered at load time so change hooks (stats counters,
+    # event publishing) can diff a save without re-reading the row.
+    TRACKED_FIELDS = ('status', 'device_type', 'room_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the old values; later saves diff from here
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
 
     def __str__(self):
         return f'{self.name} ({self.device_type})'
@@ -87,3 +175,18 @@ class Device(models.Model):
             'room': room_data,
             'category': category_data,
         }
+
+
+class DeviceTombstone(models.Model):
+    """Marker left behind by a deleted device so delta-sync clients
+    (``/api/v1/devices/changes/``) learn about the delete."""
+    class Meta:
+        db_table = "device_tombstones"
+        indexes = [
+            models.Index(fields=['deleted_at', 'device_id'], name='device_tombstones_del_idx'),
+        ]
+    device_id = models.UUIDField()
+    deleted_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return f'Device {self.device_id} deleted at {self.deleted_at.isoformat()}'
@@ -0,0 +1,221 @@
+"""Device presence: coalesced heartbeats and the offline sweeper.
+
+``POST /api/v1/devices/heartbeat/`` records pings in the process-wide
+``PresenceTracker`` instead of writing them. The tracker keeps the latest
+ping per device in memory, so a device pinging every few seconds costs one
+dict assignment per ping, and writes ``last_seen`` for everything pending
+with one ``bulk_update`` every ``FLUSH_INTERVAL`` seconds. Devices that
+ping while not ``online`` are flipped to ``online`` in the same flush.
+
+``sweep`` flips ``online`` devices whose ``last_seen`` is older than
+``OFFLINE_AFTER`` seconds to ``offline``. Run it with
+``manage.py sweep_presence --every N``. Devices that never sent a heartbeat
+(``last_seen`` is null) are left alone.
+
+Every transition writes one ``status_change`` DeviceLog and bumps
+``updated_at``, and ``devices_bulk_changed`` is sent for the flipped
+devices (cache invalidation, stats counters, the event stream). Plain
+``last_seen`` refreshes do neither; a flush that only moves ``last_seen``
+still bumps the ``devices`` cache version once, so cached payloads and
+ETags pick them up. Delta sync follows ``updated_at`` and does not.
+
+Pings are acknowledged before they are durable, as in the log ingestion
+buffer (``device_logs/ingest.py``); a process killed hard loses at most
+one interval of them, which the next heartbeat repairs. Keep
+``OFFLINE_AFTER`` well above ``FLUSH_INTERVAL``.
+
+Settings (``DEVICE_PRESENCE``): ``FLUSH_INTERVAL`` (seconds, ``None``
+disables the background thread; call ``flush()``), ``OFFLINE_AFTER``
+(seconds) and ``MAX_PENDING`` (distinct devices held between flushes).
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DatabaseError, close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.writers import write_logs
+from server.caching import invalidate
+
+from .models import Device
+from .signals import devices_bulk_changed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FLUSH_INTERVAL': 5.0,
+    'OFFLINE_AFTER': 90,
+    'MAX_PENDING': 100_000,
+}
+ONLINE = 'online'
+OFFLINE = 'offline'
+STATUS_ACTION = 'status_change'
+BATCH_SIZE = 500
+
+
+def set_status(devices, status, now):
+    """Set ``status`` on the ``devices`` queryset, logging each change.
+
+    Runs inside the caller's transaction; returns the flipped devices as
+    ``devices_bulk_changed`` ``changes``.
+    """
+    current = {pk: (old, device_type) for pk, old, device_type in devices.values_list('pk', 'status', 'device_type')}
+    if not current:
+        return {}
+    Device.objects.filter(pk__in=current).update(status=status, updated_at=now)
+    write_logs([
+        DeviceLog(device_id=pk, action=STATUS_ACTION, old_value=old, new_value=status, timestamp=now)
+        for pk, (old, _) in current.items()
+    ])
+    return {pk: (old, (status, old[1])) for pk, old in current.items()}
+
+
+class PresenceTracker:
+    def __init__(self, flush_interval=5.0, max_pending=100_000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def beat(self, device_ids, at=None):
+        """Record a ping from each of ``device_ids``. Returns False when full."""
+        at = at or timezone.now()
+        with self._lock:
+            new = sum(1 for pk in device_ids if pk not in self._pending)
+            if self._stopped.is_set() or len(self._pending) + new > self.max_pending:
+                return False
+            for pk in device_ids:
+                self._pending[pk] = at
+        if self.flush_interval is not None:
+            self._ensure_worker()
+        return True
+
+    def flush(self):
+        """Write pending pings. Returns the number of devices written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    Device.objects.bulk_update(
+                        [Device(pk=pk, last_seen=at) for pk, at in batch.items()], ['last_seen'], batch_size=BATCH_SIZE
+                    )
+                    online = {}
+                    ids = list(batch)
+                    for start in range(0, len(ids), BATCH_SIZE):
+                        devices = Device.objects.filter(pk__in=ids[start:start + BATCH_SIZE]).exclude(status=ONLINE)
+                        online.update(set_status(devices, ONLINE, timezone.now()))
+                    if online:
+                        devices_bulk_changed.send(sender=Device, device_ids=list(online), changes=online)
+                    else:
+                        # only device payloads show last_seen; the signal
+                        # above invalidates everything that embeds devices
+                        invalidate('devices')
+            except DatabaseError:
+                logger.exception("Presence flush failed, requeueing %d devices", len(batch))
+                self._requeue(batch)
+                return 0
+            return len(batch)
+
+    def close(self):
+        """Stop the background thread and flush what is left."""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='device-presence-flusher', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Unexpected error while flushing device presence")
+            finally:
+                close_old_connections()
+
+    def _requeue(self, batch):
+        with self._lock:
+            # pings that arrived meanwhile are newer
+            self._pending = {**batch, **self._pending}
+
+
+def sweep(now=None, offline_after=None):
+    """Flip devices not heard from within ``offline_after`` seconds to offline.
+
+    Returns the number of devices flipped.
+    """
+    now = now or timezone.now()
+    if offline_after is None:
+        offline_after = presence_options()['OFFLINE_AFTER']
+    cutoff = now - datetime.timedelta(seconds=offline_after)
+
+    flipped = 0
+    while True:
+        # devices_status_seen_idx: the online devices, oldest ping first
+        stale = list(
+            Device.objects.filter(status=ONLINE, last_seen__lt=cutoff).order_by('last_seen')
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not stale:
+            break
+        with transaction.atomic():
+            # re-checked under the write lock: a flush may have landed since
+            devices = Device.objects.filter(pk__in=stale, status=ONLINE, last_seen__lt=cutoff)
+            changed = set_status(devices, OFFLINE, now)
+            if changed:
+                devices_bulk_changed.send(sender=Device, device_ids=list(changed), changes=changed)
+        flipped += len(changed)
+    return flipped
+
+
+def presence_options():
+    return {**DEFAULTS, **getattr(settings, 'DEVICE_PRESENCE', {})}
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_tracker():
+    """Return the process-wide tracker, configured from ``DEVICE_PRESENCE``."""
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                options = presence_options()
+                _tracker = PresenceTracker(flush_interval=options['FLUSH_INTERVAL'],
+                                           max_pending=options['MAX_PENDING'])
+    return _tracker
+
+
+@receiver(setting_changed)
+def _reset_tracker(setting, **kwargs):
+    global _tracker
+    if setting == 'DEVICE_PRESENCE' and _tracker is not None:
+        _tracker.close()
+        _tracker = None
@@ -0,0 +1,41 @@
+"""Query planning for device responses.
+
+``DeviceSerializer`` renders nested ``room`` and ``category`` objects, each
+carrying a ``device_count``. Evaluated naively that is two lazy FK fetches and
+two COUNT queries per device. ``plan_device_queryset`` joins the related rows
+and has the counts loaded with one ``GROUP BY`` per relation over the fetched
+page's FK ids (``DeviceQuerySet.with_related_counts``), like the fast path's
+``related_device_count``; a correlated COUNT per row would scan the FK index
+once per device.
+"""
+
+from .models import Device
+
+
+def plan_device_queryset(queryset=None, relations=('room', 'category')):
+    """Return ``queryset`` with the joins and counts the serializer needs.
+
+    ``queryset`` must come from ``Device.objects``. ``relations`` limits both
+    to the nested objects actually rendered (see ``server.projection``).
+    """
+    if queryset is None:
+        queryset = Device.objects.all()
+    if not relations:
+        return queryset
+    return queryset.select_related(*relations).with_related_counts(*relations)
+
+
+def attach_related_counts(device) -> None:
+    """Copy the loaded counts onto the joined room/category instances.
+
+    ``Room.device_count()`` and ``DeviceCategorySerializer`` read
+    ``num_devices`` when it is present and only fall back to a COUNT query
+    for instances that did not come from a planned queryset.
+    """
+    room_count = getattr(device, 'room_device_count', None)
+    if room_count is not None and device.room_id is not None:
+        device.room.num_devices = room_count
+
+    category_count = getattr(device, 'category_device_count', None)
+    if category_count is not None and device.category_id is not None:
+        device.category.num_devices = category_count
@@ -1,15 +1,19 @@
+import ipaddress
+
 from rest_framework import serializers
 
 from server.apps.device_categories.models import DeviceCategory
 from server.apps.devices.models import Device
+from server.apps.devices.queries import attach_related_counts
 from server.apps.rooms.models import Room
+from server.projection import SparseFieldsMixin
 
 
 from server.apps.rooms.serializers import RoomSerializer
 from server.apps.device_categories.serializers import DeviceCategorySerializer
 
 
-class DeviceSerializer(serializers.ModelSerializer):
+class DeviceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # nested read-only representations
     room = RoomSerializer(read_only=True)
     category = DeviceCategorySerializer(read_only=True)
@@ -39,3 +43,136 @@ class DeviceSerializer(serializers.ModelSerializer):
             "category_id",
         )
         read_only_fields = ("id", "created_at", "updated_at", "room", "category")
+
+    def to_representation(self, instance):
+        attach_related_counts(instance)
+        return super().to_representation(instance)
+
+
+class BulkDeviceListSerializer(serializers.ListSerializer):
+    """Validates a batch of operations, resolving room/category references
+    with one query per table instead of one per item."""
+
+    def to_internal_value(self, data):
+        operations = super().to_internal_value(data)
+
+        room_ids = {op['room_id'] for op in operations if op.get('room_id')}
+        category_ids = {op['category_id'] for op in operations if op.get('category_id')}
+        known_rooms = set(Room.objects.filter(pk__in=room_ids).values_list('pk', flat=True))
+        known_categories = set(DeviceCategory.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+
+        errors = []
+        for op in operations:
+            item_errors = {}
+            if op.get('room_id') and op['room_id'] not in known_rooms:
+                item_errors['room_id'] = [f'Invalid pk "{op["room_id"]}" - object does not exist.']
+            if op.get('category_id') and op['category_id'] not in known_categories:
+                item_errors['category_id'] = [f'Invalid pk "{op["category_id"]}" - object does not exist.']
+            errors.append(item_errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return operations
+
+
+class BulkDeviceOperationSerializer(serializers.ModelSerializer):
+    """One item of a bulk request: ``{"op": "create"|"update"|"delete", ...}``.
+
+    Creates carry device fields, updates carry ``id`` plus the fields to
+    change, deletes carry only ``id``.
+    """
+    OPERATIONS = ('create', 'update', 'delete')
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    id = serializers.UUIDField(required=False)
+    room_id = serializers.UUIDField(required=False, allow_null=True)
+    category_id = serializers.UUIDField(required=False, allow_null=True)
+
+    class Meta:
+        model = Device
+        list_serializer_class = BulkDeviceListSerializer
+        fields = (
+            "op",
+            "id",
+            "name",
+            "device_type",
+            "brand",
+            "model",
+            "ip_address",
+            "mac_address",
+            "status",
+            "is_active",
+            "last_seen",
+            "room_id",
+            "category_id",
+        )
+        extra_kwargs = {field: {'required': False} for field in ('name', 'device_type')}
+
+    def validate(self, attrs):
+        op = attrs['op']
+        if op == 'create':
+            missing = [field for field in ('name', 'device_type') if field not in attrs]
+            if missing:
+                raise serializers.ValidationError({field: ['This field is required.'] for field in missing})
+            if 'id' in attrs:
+                raise serializers.ValidationError({'id': ['Devices are created with a server-assigned id.']})
+        elif 'id' not in attrs:
+            raise serializers.ValidationError({'id': ['This field is required.']})
+        elif op == 'delete' and set(attrs) - {'op', 'id'}:
+            raise serializers.ValidationError({'op': ['Delete operations only accept an id.']})
+        return attrs
+
+
+class DeviceExportQuerySerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=['ndjson', 'csv'], default='ndjson')
+    room = serializers.UUIDField(required=False)
+    category = serializers.UUIDField(required=False)
+    status = serializers.CharField(max_length=20, required=False)
+    device_type = serializers.CharField(max_length=50, required=False)
+
+
+class HeartbeatSerializer(serializers.Serializer):
+    """``{"devices": [<id>, ...]}``: the devices a hub (or a device itself) heard from."""
+    devices = serializers.ListField(child=serializers.UUIDField(), min_length=1, max_length=10_000)
+
+
+class DiscoverySerializer(serializers.Serializer):
+    """A scan request: a private LAN network no larger than ``max_hosts`` addresses.
+
+    The probed port is ``DEVICE_DISCOVERY['PORT']``; clients cannot pick one.
+    """
+    network = serializers.CharField(max_length=64)
+    timeout = serializers.FloatField(min_value=0.05, max_value=10, required=False)
+
+    def __init__(self, *args, max_hosts=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_hosts = max_hosts
+
+    def validate_network(self, value):
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            raise serializers.ValidationError('Enter a network in CIDR notation, e.g. 192.168.1.0/24.')
+        if not network.is_private:
+            raise serializers.ValidationError('Only private networks can be scanned.')
+        # is_private also covers these, none of which hold LAN devices
+        if network.is_loopback or network.is_link_local or network.is_multicast or network.is_unspecified:
+            raise serializers.ValidationError('Loopback, link-local and multicast networks cannot be scanned.')
+        if self.max_hosts is not None and network.num_addresses > self.max_hosts:
+            raise serializers.ValidationError(f'Networks larger than {self.max_hosts} addresses cannot be scanned.')
+        return network
+
+    def validate(self, attrs):
+        if 'port' in self.initial_data:
+            raise serializers.ValidationError({'port': 'The probed port is set by the server.'})
+        return attrs
+
+
+class DeviceListQuerySerializer(serializers.Serializer):
+    status = serializers.CharField(max_length=20, required=False)
+    device_type = serializers.CharField(max_length=50, required=False)
+    room = serializers.UUIDField(required=False)
+    category = serializers.UUIDField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    last_seen_after = serializers.DateTimeField(required=False)
+    last_seen_before = serializers.DateTimeField(required=False)
+    search = serializers.CharField(max_length=100, required=False, allow_blank=True)
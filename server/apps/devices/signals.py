@@ -0,0 +1,32 @@
+"""Device signals and their in-app receivers.
+
+Signals for Device writes that bypass per-row model signals:
+
+``bulk_create``, ``bulk_update`` and ``QuerySet.update()`` send no
+``post_save``. Code that writes devices that way sends
+``devices_bulk_changed`` with ``device_ids`` (the created or updated primary
+keys) and ``changes``, ``{pk: (old, new)}`` where both are ``state()``
+tuples and ``old`` is None for created devices, so listeners such as the
+stats counters can apply deltas. Bulk deletes go through
+``QuerySet.delete()``, which still sends ``post_delete`` per row.
+
+Receivers here record a ``DeviceTombstone`` for every deleted device.
+"""
+
+from django.db.models.signals import post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Device, DeviceTombstone
+
+devices_bulk_changed = Signal()
+
+
+def state(device):
+    """The ``(status, device_type)`` of ``device`` as it was loaded, for ``changes``."""
+    loaded = getattr(device, '_loaded_values', {})
+    return loaded.get('status', device.status), loaded.get('device_type', device.device_type)
+
+
+@receiver(post_delete, sender=Device, dispatch_uid='devices_record_tombstone')
+def record_tombstone(sender, instance, **kwargs):
+    DeviceTombstone.objects.create(device_id=instance.pk)
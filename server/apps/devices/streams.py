@@ -0,0 +1,58 @@
+"""Server-Sent Events stream of device status changes and new logs.
+
+GET /api/v1/events/?device=<id>&room=<id> (both repeatable; neither means
+everything). Served natively under ASGI (``server/asgi.py``): each open
+stream is an idle coroutine awaiting its broker queue, not a thread.
+"""
+
+import asyncio
+import json
+import uuid
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from server.events import broker
+
+KEEPALIVE_SECONDS = 15
+
+
+def _topics(request):
+    try:
+        devices = [f'device:{uuid.UUID(value)}' for value in request.GET.getlist('device')]
+        rooms = [f'room:{uuid.UUID(value)}' for value in request.GET.getlist('room')]
+    except ValueError:
+        return None
+    return devices + rooms
+
+
+async def _event_stream(topics):
+    subscription = broker.subscribe(topics)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def device_events(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    if not isinstance(request, ASGIRequest):
+        # a WSGI worker would try to buffer the endless stream
+        return JsonResponse({'detail': 'Event streaming requires the ASGI server (server.asgi:application).'},
+                            status=501)
+    topics = _topics(request)
+    if topics is None:
+        return JsonResponse({'detail': 'device and room must be UUIDs.'}, status=400)
+
+    response = StreamingHttpResponse(_event_stream(topics), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,657 @@
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+
+from server.apps.device_categories.models import DeviceCategory
+from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.discovery import DiscoveryScanner
+from server.apps.devices.models import Device, DeviceTombstone
+from server.apps.devices.presence import get_tracker, sweep
+from server.apps.rooms.models import Room
+from server.db_routing import PIN_COOKIE
+from server.events import broker, device_topics
+from server.pagination import encode_cursor
+
+
+# measure the database work, not the response cache in front of it
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class DeviceListQueryCountTests(APITestCase):
+    url = '/api/v1/devices/'
+
+    def setUp(self):
+        self.rooms = [Room.objects.create(name=f'Room {i}') for i in range(3)]
+        self.categories = [DeviceCategory.objects.create(name=f'Category {i}') for i in range(3)]
+
+    def _add_devices(self, count):
+        start = Device.objects.count()
+        Device.objects.bulk_create([
+            Device(
+                name=f'Device {start + i}',
+                device_type='light',
+                room=self.rooms[i % len(self.rooms)],
+                category=self.categories[i % len(self.categories)],
+            )
+            for i in range(count)
+        ])
+
+    def _list_query_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_query_count_does_not_grow_with_devices(self):
+        self._add_devices(3)
+        small, _ = self._list_query_count()
+
+        self._add_devices(30)
+        large, _ = self._list_query_count()
+
+        self.assertEqual(small, large)
+
+    def test_nested_device_counts_match_database(self):
+        self._add_devices(7)
+        Device.objects.create(name='Loose device', device_type='sensor')
+
+        _, response = self._list_query_count()
+        devices = response.data['results'] if isinstance(response.data, dict) else response.data
+
+        for item in devices:
+            if item['room'] is not None:
+                expected = Device.objects.filter(room_id=item['room']['id']).count()
+                self.assertEqual(item['room']['device_count'], expected)
+            if item['category'] is not None:
+                expected = Device.objects.filter(category_id=item['category']['id']).count()
+                self.assertEqual(item['category']['device_count'], expected)
+
+    @override_settings(DEVICE_LIST_FAST_PATH=False)
+    def test_serializer_path_counts_per_page_not_per_row(self):
+        self._add_devices(7)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['room']['device_count'], 3)
+        page_sql = next(query['sql'] for query in ctx.captured_queries if 'LIMIT' in query['sql'])
+        self.assertNotIn('COUNT', page_sql)
+        self.assertEqual(sum('GROUP BY' in query['sql'] for query in ctx.captured_queries), 2)
+
+        device = Device.objects.filter(room=self.rooms[1]).first()
+        response = self.client.get(f'{self.url}{device.pk}/')
+        self.assertEqual(response.data['room']['device_count'], 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class DeviceListFastPathTests(APITestCase):
+    def test_renders_the_same_bytes_as_the_serializer(self):
+        kitchen = Room.objects.create(name='Kitchen', description='ground floor')
+        lights = DeviceCategory.objects.create(name='Lights', icon='bulb')
+        Device.objects.create(name='Lamp', device_type='light', room=kitchen, category=lights, ip_address='10.0.0.2')
+        Device.objects.create(name='Plug', device_type='plug', room=kitchen, is_active=False, last_seen=timezone.now())
+        Device.objects.create(name='Sensor', device_type='sensor')
+
+        for url in ('/api/v1/devices/', '/api/v1/devices/?page_size=2'):
+            with override_settings(DEVICE_LIST_FAST_PATH=False):
+                expected = self.client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                actual = self.client.get(url)
+            self.assertEqual(actual.content, expected.content)
+            # the three ETag stamps, the page, one GROUP BY per nested device_count
+            self.assertEqual(len(ctx.captured_queries), 6)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        kitchen = Room.objects.create(name='Kitchen')
+        self.lamp = Device.objects.create(name='Lamp', device_type='light', room=kitchen, status='online')
+        Device.objects.create(name='Sensor', device_type='sensor')
+
+    def _page_query(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # after the ETag stamps, the page is the first query with a LIMIT
+        return response.data['results'], next(q['sql'] for q in ctx.captured_queries if 'LIMIT' in q['sql'])
+
+    def test_projects_columns_and_skips_unrequested_joins(self):
+        for fast_path in (True, False):
+            with override_settings(DEVICE_LIST_FAST_PATH=fast_path):
+                results, sql = self._page_query('/api/v1/devices/?fields=id,name,status')
+                self.assertEqual(results[0], {'id': str(self.lamp.pk), 'name': 'Lamp', 'status': 'online'})
+                self.assertNotIn('JOIN', sql)
+                self.assertNotIn('device_type', sql)
+
+                results, sql = self._page_query('/api/v1/devices/?fields=name&expand=room')
+                self.assertEqual(set(results[0]), {'name', 'room'})
+                self.assertEqual(results[0]['room']['device_count'], 1)
+                self.assertNotIn('categories', sql)
+
+    def test_detail_and_logs_accept_fields(self):
+        self.client.post(f'/api/v1/devices/{self.lamp.pk}/logs/', {'action': 'turned_on'}, format='json')
+
+        response = self.client.get(f'/api/v1/devices/{self.lamp.pk}/?expand=')
+        self.assertNotIn('room', response.data)
+        self.assertIn('device_type', response.data)
+
+        response = self.client.get(f'/api/v1/devices/{self.lamp.pk}/logs/?fields=action')
+        self.assertEqual(response.data['results'], [{'action': 'turned_on'}])
+
+    def test_rejects_unknown_names(self):
+        self.assertEqual(self.client.get('/api/v1/devices/?fields=name,secret').status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/devices/?expand=logs').status_code, 400)
+
+
+class DeviceListFilterTests(APITestCase):
+    def setUp(self):
+        self.kitchen = Room.objects.create(name='Kitchen')
+        Device.objects.create(name='Kitchen Lamp', device_type='light', room=self.kitchen, status='online',
+                              ip_address='10.0.0.2', last_seen=timezone.now())
+        Device.objects.create(name='Porch Light', device_type='light', is_active=False,
+                              mac_address='AA:BB:CC:00:11:22')
+        Device.objects.create(name='Thermostat', device_type='thermostat', ip_address='10.0.1.7')
+
+    def _names(self, params):
+        response = self.client.get('/api/v1/devices/', params)
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data['results']]
+
+    def test_equality_and_range_filters(self):
+        self.assertEqual(self._names({'device_type': 'light'}), ['Kitchen Lamp', 'Porch Light'])
+        self.assertEqual(self._names({'room': str(self.kitchen.pk), 'status': 'online'}), ['Kitchen Lamp'])
+        self.assertEqual(self._names({'is_active': 'false'}), ['Porch Light'])
+        self.assertEqual(self._names({'last_seen_after': '2000-01-01T00:00:00Z'}), ['Kitchen Lamp'])
+
+    def test_prefix_search_ignores_case(self):
+        self.assertEqual(self._names({'search': 'kit'}), ['Kitchen Lamp'])
+        self.assertEqual(self._names({'search': '10.0.'}), ['Kitchen Lamp', 'Thermostat'])
+        self.assertEqual(self._names({'search': 'aa:bb'}), ['Porch Light'])
+        self.assertEqual(self._names({'search': 'lamp'}), [])
+
+    def test_rejects_malformed_values(self):
+        self.assertEqual(self.client.get('/api/v1/devices/', {'room': 'kitchen'}).status_code, 400)
+
+
+class KeysetPaginationTests(APITestCase):
+    def _walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def test_walks_devices_with_duplicate_names_in_order(self):
+        devices = [Device.objects.create(name=f'Lamp {i % 3}', device_type='light') for i in range(7)]
+        expected = [str(d.pk) for d in sorted(devices, key=lambda d: (d.name, d.pk.hex))]
+
+        self.assertEqual(self._walk('/api/v1/devices/?page_size=2'), expected)
+
+    def test_walks_device_logs_newest_first(self):
+        device = Device.objects.create(name='Lamp', device_type='light')
+        for i in range(5):
+            self.client.post(f'/api/v1/devices/{device.pk}/logs/', {'action': 'turned_on'}, format='json')
+        expected = [str(pk) for pk in device.logs.order_by('-timestamp', '-id').values_list('pk', flat=True)]
+
+        self.assertEqual(self._walk(f'/api/v1/devices/{device.pk}/logs/?page_size=2'), expected)
+
+    def test_rejects_malformed_cursor(self):
+        response = self.client.get('/api/v1/devices/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkDeviceOperationTests(APITestCase):
+    url = '/api/v1/devices/bulk/'
+
+    def test_applies_mixed_operations_and_logs_them(self):
+        room = Room.objects.create(name='Kitchen')
+        lamp = Device.objects.create(name='Lamp', device_type='light')
+        doomed = Device.objects.create(name='Old plug', device_type='plug')
+        payload = [
+            {'op': 'create', 'name': 'Sensor', 'device_type': 'sensor', 'room_id': str(room.pk)},
+            {'op': 'update', 'id': str(lamp.pk), 'status': 'online'},
+            {'op': 'delete', 'id': str(doomed.pk)},
+        ]
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'updated', 'deleted'])
+        lamp.refresh_from_db()
+        self.assertEqual(lamp.status, 'online')
+        self.assertFalse(Device.objects.filter(pk=doomed.pk).exists())
+        self.assertTrue(Device.objects.filter(name='Sensor', room=room).exists())
+        self.assertEqual(list(lamp.logs.filter(action='status_change').values_list('old_value', 'new_value')),
+                         [('offline', 'online')])
+
+    def test_accepts_ndjson(self):
+        body = '{"op": "create", "name": "A", "device_type": "light"}\n\n{"op": "create", "name": "B", "device_type": "light"}\n'
+
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Device.objects.count(), 2)
+
+    def test_rejects_whole_batch_with_per_item_errors(self):
+        payload = [
+            {'op': 'create', 'name': 'Fine', 'device_type': 'light'},
+            {'op': 'create', 'name': 'Orphan', 'device_type': 'light', 'room_id': '00000000-0000-0000-0000-000000000000'},
+            {'op': 'update', 'status': 'online'},
+        ]
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Device.objects.count(), 0)
+
+
+class ConditionalGetTests(APITestCase):
+    url = '/api/v1/devices/'
+
+    def test_list_304s_without_queries_until_devices_change(self):
+        Device.objects.create(name='Lamp', device_type='light')
+        etag = self.client.get(self.url)['ETag']
+
+        # the newest updated_at, last_seen and tombstone; nothing is serialized
+        with self.assertNumQueries(3):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        Device.objects.create(name='Plug', device_type='plug')
+        refreshed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed['ETag'], etag)
+        self.assertEqual(len(refreshed.data['results']), 2)
+
+    def test_etags_follow_writes_this_process_did_not_see(self):
+        lamp = Device.objects.create(name='Lamp', device_type='light')
+        detail_url = f'{self.url}{lamp.pk}/'
+        listing, detail = self.client.get(self.url)['ETag'], self.client.get(detail_url)['ETag']
+
+        # what another worker's write looks like from here: no version bump
+        with mock.patch('server.caching._bump'):
+            Device.objects.bulk_create([Device(name='Plug', device_type='plug')])
+            Device.objects.filter(pk=lamp.pk).update(last_seen=timezone.now())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=listing).status_code, 200)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['last_seen'])
+
+    def test_detail_revalidates_by_etag_only(self):
+        room = Room.objects.create(name='Hall')
+        lamp = Device.objects.create(name='Lamp', device_type='light', room=room)
+        url = f'{self.url}{lamp.pk}/'
+        first = self.client.get(url)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        room.name = 'Hallway'
+        room.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'],
+                                   HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['room']['name'], 'Hallway')
+
+    def test_room_rename_invalidates_cached_device_list(self):
+        room = Room.objects.create(name='Hall')
+        Device.objects.create(name='Lamp', device_type='light', room=room)
+        etag = self.client.get(self.url)['ETag']
+
+        room.name = 'Hallway'
+        room.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['room']['name'], 'Hallway')
+
+    # 'default' stands in for the replica: rows changed with a queryset
+    # update() (no version bump) play the part of a replica catching up
+    @override_settings(REPLICA_DATABASES=['default'], REPLICA_PIN_SECONDS=5)
+    def test_lagging_replica_reads_are_not_cached_under_the_new_version(self):
+        lamp = Device.objects.create(name='Lamp', device_type='light')
+        self.client.get(self.url)
+        Device.objects.filter(pk=lamp.pk).update(name='Lamp 2')
+        self.assertEqual(self.client.get(self.url).data['results'][0]['name'], 'Lamp 2')
+
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            self.client.get(self.url)
+            Device.objects.filter(pk=lamp.pk).update(name='Lamp 3')
+            self.assertEqual(self.client.get(self.url).data['results'][0]['name'], 'Lamp 2')
+
+            # a client that just wrote reads past the cache
+            self.client.cookies[PIN_COOKIE] = '1'
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['name'], 'Lamp 3')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+@override_settings(DEVICE_PRESENCE={'FLUSH_INTERVAL': None, 'OFFLINE_AFTER': 60, 'MAX_PENDING': 2})
+class PresenceTests(APITestCase):
+    url = '/api/v1/devices/heartbeat/'
+
+    def setUp(self):
+        self.lamp = Device.objects.create(name='Lamp', device_type='light')
+        self.plug = Device.objects.create(name='Plug', device_type='plug', status='online')
+
+    def test_coalesces_pings_and_flushes_in_one_batch(self):
+        for _ in range(3):
+            response = self.client.post(self.url, {'devices': [str(self.lamp.pk), str(self.plug.pk)]}, format='json')
+            self.assertEqual(response.status_code, 202)
+        self.lamp.refresh_from_db()
+        self.assertIsNone(self.lamp.last_seen)
+
+        self.assertEqual(get_tracker().flush(), 2)
+        self.lamp.refresh_from_db()
+        self.assertIsNotNone(self.lamp.last_seen)
+        self.assertEqual(self.lamp.status, 'online')
+        self.assertEqual(list(DeviceLog.objects.values_list('device_id', 'old_value', 'new_value')),
+                         [(self.lamp.pk, 'offline', 'online')])
+
+    def test_last_seen_refresh_changes_etags(self):
+        detail_url = f'/api/v1/devices/{self.plug.pk}/'
+        list_url = '/api/v1/devices/?last_seen_after=2000-01-01T00:00:00Z'
+        detail, listing = self.client.get(detail_url), self.client.get(list_url)
+        self.assertEqual(listing.data['results'], [])
+
+        get_tracker().beat([self.plug.pk])
+        get_tracker().flush()
+
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.data['last_seen'])
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=listing['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([d['id'] for d in response.data['results']], [str(self.plug.pk)])
+
+    def test_refuses_devices_beyond_capacity(self):
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        self.assertEqual(self.client.post(self.url, {'devices': ids}, format='json').status_code, 429)
+
+    def test_sweeper_logs_one_transition_per_device(self):
+        get_tracker().beat([self.plug.pk], at=timezone.now() - datetime.timedelta(minutes=5))
+        get_tracker().flush()
+
+        self.assertEqual(sweep(), 1)
+        self.assertEqual(sweep(), 0)
+        self.plug.refresh_from_db()
+        self.assertEqual(self.plug.status, 'offline')
+        self.assertEqual(DeviceLog.objects.filter(device=self.plug, action='status_change').count(), 1)
+
+
+class FakeDeviceResponder:
+    """Serves canned ``GET /device-info`` answers on loopback addresses.
+
+    ``answers`` maps a host to the response body, or to None for a host that
+    accepts the connection and never answers.
+    """
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.servers = []
+
+    def __enter__(self):
+        self.thread.start()
+        self.port = 0
+        for host in self.answers:
+            server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(self._handler(host), host, self.port), self.loop).result()
+            self.port = server.sockets[0].getsockname()[1]
+            self.servers.append(server)
+        return self
+
+    def __exit__(self, *exc_info):
+        for server in self.servers:
+            server.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def _handler(self, host):
+        async def handle(reader, writer):
+            await reader.readuntil(b'\r\n\r\n')
+            body = self.answers[host]
+            if body is None:
+                # silent until the scanner gives up and hangs up
+                await reader.read()
+            else:
+                # headers and body in separate segments, as many devices send them
+                writer.write(b'HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n')
+                await writer.drain()
+                await asyncio.sleep(0.05)
+                writer.write(body.encode())
+                await writer.drain()
+            writer.close()
+        return handle
+
+
+class DiscoveryTests(APITestCase):
+    url = '/api/v1/devices/discover/'
+
+    def test_scans_dedupes_and_upserts(self):
+        moved = Device.objects.create(name='Plug', device_type='plug', ip_address='10.0.0.9',
+                                      mac_address='aa:bb:cc:00:00:02')
+        answers = {
+            '127.0.0.2': json.dumps({'name': 'Hall Lamp', 'device_type': 'light', 'mac_address': 'aa-bb-cc-00-00-01'}),
+            '127.0.0.3': 'not a device',
+            '127.0.0.4': json.dumps({'name': 'Plug', 'device_type': 'plug', 'mac_address': 'AA:BB:CC:00:00:02'}),
+            '127.0.0.5': None,
+        }
+        with FakeDeviceResponder(answers) as responder:
+            out = StringIO()
+            call_command('discover', '127.0.0.0/29', port=responder.port, timeout=0.5, verbosity=2, stdout=out)
+            self.assertIn('127.0.0.3: answered without a device description', out.getvalue())
+            self.assertIn('Scanned 6 hosts', out.getvalue())
+            self.assertIn('3 answered, 1 new devices, 1 moved, 0 known, 1 unidentified', out.getvalue())
+
+            lamp = Device.objects.get(name='Hall Lamp')
+            self.assertEqual((lamp.ip_address, lamp.mac_address, lamp.status),
+                             ('127.0.0.2', 'AA:BB:CC:00:00:01', 'online'))
+            moved.refresh_from_db()
+            self.assertEqual(moved.ip_address, '127.0.0.4')
+
+            out = StringIO()
+            call_command('discover', '127.0.0.0/29', port=responder.port, timeout=0.5, stdout=out)
+        self.assertIn('0 new devices, 0 moved, 2 known', out.getvalue())
+        self.assertEqual(Device.objects.count(), 2)
+
+    @override_settings(DEVICE_DISCOVERY={'BACKGROUND': False})
+    def test_admins_scan_through_jobs(self):
+        async def probe(scanner, host):
+            if host == '10.0.0.2':
+                return True, {'name': 'Hall Lamp', 'device_type': 'light'}
+            return False, None
+
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        with mock.patch.object(DiscoveryScanner, 'probe', probe):
+            response = self.client.post(self.url, {'network': '10.0.0.0/30', 'timeout': 0.5}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(response['Location']).data
+        self.assertEqual((job['network'], job['status'], job['result']['scanned']), ('10.0.0.0/30', 'done', 2))
+        self.assertEqual(Device.objects.get(pk=job['result']['created'][0]).ip_address, '10.0.0.2')
+        self.assertEqual(self.client.get(f'{self.url}{uuid.uuid4()}/').status_code, 404)
+
+    def test_refuses_anonymous_users_and_unsafe_targets(self):
+        self.assertEqual(self.client.post(self.url, {'network': '10.0.0.0/30'}, format='json').status_code, 403)
+        self.client.force_authenticate(User.objects.create_user('user'))
+        self.assertEqual(self.client.post(self.url, {'network': '10.0.0.0/30'}, format='json').status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user('admin', is_staff=True))
+        for payload in ({'network': '8.8.8.0/24'}, {'network': '10.0.0.0/8'}, {'network': '127.0.0.0/29'},
+                        {'network': '169.254.0.0/24'}, {'network': '::1/128'}, {'network': '10.0.0.0/30', 'port': 22}):
+            self.assertEqual(self.client.post(self.url, payload, format='json').status_code, 400, payload)
+
+
+class DeviceChangesTests(APITestCase):
+    url = '/api/v1/devices/changes/'
+
+    def test_reports_only_changes_and_deletes_after_cursor(self):
+        lamp = Device.objects.create(name='Lamp', device_type='light')
+        plug = Device.objects.create(name='Plug', device_type='plug')
+        snapshot = self.client.get(self.url).data
+        self.assertEqual({d['id'] for d in snapshot['changed']}, {str(lamp.pk), str(plug.pk)})
+
+        idle = self.client.get(self.url, {'since': snapshot['cursor']}).data
+        self.assertEqual((idle['changed'], idle['deleted']), ([], []))
+
+        lamp.status = 'online'
+        lamp.save()
+        plug_id = str(plug.pk)
+        plug.delete()
+        delta = self.client.get(self.url, {'since': idle['cursor']}).data
+
+        self.assertEqual([d['id'] for d in delta['changed']], [str(lamp.pk)])
+        self.assertEqual([d['id'] for d in delta['deleted']], [plug_id])
+        self.assertFalse(delta['has_more'])
+
+    def test_idle_polls_keep_the_cursor_inside_the_retention_window(self):
+        cursor = self.client.get(self.url).data['cursor']
+        later = timezone.now() + datetime.timedelta(days=20)
+        for _ in range(2):
+            with mock.patch('django.utils.timezone.now', return_value=later):
+                response = self.client.get(self.url, {'since': cursor})
+            self.assertEqual(response.status_code, 200)
+            cursor = response.data['cursor']
+            later += datetime.timedelta(days=20)
+
+    def test_late_committed_tombstones_are_not_skipped(self):
+        cursor = self.client.get(self.url).data['cursor']
+        cursor = self.client.get(self.url, {'since': cursor}).data['cursor']
+        # a delete whose transaction was still open during the polls above
+        device_id = uuid.uuid4()
+        DeviceTombstone.objects.create(device_id=device_id, deleted_at=timezone.now() - datetime.timedelta(seconds=2))
+
+        delta = self.client.get(self.url, {'since': cursor}).data
+        self.assertEqual([d['id'] for d in delta['deleted']], [str(device_id)])
+
+    def test_rejects_cursors_with_malformed_ids(self):
+        since = encode_cursor({'d': None, 't': [timezone.now().isoformat(), 'not-a-uuid']})
+        self.assertEqual(self.client.get(self.url, {'since': since}).status_code, 404)
+
+
+class DeviceEventStreamTests(SimpleTestCase):
+    url = '/api/v1/events/'
+
+    async def test_streams_events_for_the_requested_topics(self):
+        lamp, plug = uuid.uuid4(), uuid.uuid4()
+        response = await AsyncClient().get(self.url, {'device': str(lamp)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        event = {'type': 'device.status', 'device': str(lamp)}
+        broker.publish({'type': 'device.deleted', 'device': str(plug)}, device_topics(plug))
+        broker.publish(event, device_topics(lamp))
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        self.assertEqual(chunk.decode(), f'event: device.status\ndata: {json.dumps(event)}\n\n')
+
+        # a disconnect cancels the read; the stream unsubscribes
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertFalse(broker.has_subscribers)
+
+    def test_refuses_to_stream_under_wsgi(self):
+        self.assertEqual(self.client.get(self.url).status_code, 501)
+
+
+class DeviceExportTests(APITestCase):
+    def test_streams_devices_by_name_with_filters(self):
+        kitchen = Room.objects.create(name='Kitchen')
+        Device.objects.create(name='Toaster', device_type='plug', room=kitchen)
+        Device.objects.create(name='Kettle', device_type='plug', room=kitchen)
+        Device.objects.create(name='Lamp', device_type='light')
+
+        response = self.client.get('/api/v1/devices/export/', {'output': 'csv', 'room': str(kitchen.pk)})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="devices.csv"')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,name,device_type,'))
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['Kettle', 'Toaster'])
+
+
+class ImportInventoryTests(APITestCase):
+    def _import(self, suffix, content):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_inventory', handle.name, batch_size=2, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_upserts_devices_and_resolves_names(self):
+        kitchen = Room.objects.create(name='Kitchen')
+        kettle = Device.objects.create(name='Kettle', device_type='plug', mac_address='aa:bb:cc:00:00:01')
+        lines = [
+            {'kind': 'category', 'name': 'Lights', 'icon': 'lightbulb'},
+            {'name': 'Lamp', 'device_type': 'light', 'room': 'Kitchen', 'category': 'Lights'},
+            {'mac_address': 'aa:bb:cc:00:00:01', 'status': 'online', 'room': 'Garage'},
+            {'name': 'Broken', 'device_type': 'light', 'is_active': 'maybe'},
+            {'device_type': 'light'},
+            [1],
+            'x',
+            {'name': 'Clock', 'device_type': 'sensor', 'last_seen': 12345},
+            {'name': 'Fan', 'device_type': 'fan', 'room': {'x': 1}},
+        ]
+        out, err = self._import('.ndjson', '\n'.join(json.dumps(line) for line in lines))
+
+        self.assertIn('Imported 2 devices (1 created, 1 updated)', out)
+        self.assertIn('line 4:', err)
+        self.assertIn('line 5: new device without name', err)
+        self.assertIn('line 6: expected a JSON object, got list', err)
+        self.assertIn('line 7: expected a JSON object, got str', err)
+        self.assertIn('line 8: last_seen: expected a string, got int', err)
+        self.assertIn('line 9: room: expected a name, got dict', err)
+        lamp = Device.objects.get(name='Lamp')
+        self.assertEqual((lamp.room_id, lamp.category.name), (kitchen.pk, 'Lights'))
+        kettle.refresh_from_db()
+        self.assertEqual((kettle.name, kettle.status, kettle.room.name), ('Kettle', 'online', 'Garage'))
+
+    def test_reads_csv(self):
+        out, err = self._import('.csv', 'name,device_type,room,is_active\nLamp,light,Hall,false\nPlug,plug,Hall,\n')
+        self.assertIn('Imported 2 devices (2 created, 0 updated), 1 rooms', out, err)
+        self.assertEqual(Room.objects.get().devices.filter(is_active=False).count(), 1)
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        kitchen = Room.objects.create(name='Kitchen')
+        self.lamp = Device.objects.create(name='Lamp', device_type='light', room=kitchen)
+        Device.objects.create(name='Plug', device_type='plug', room=kitchen)
+        DeviceLog.objects.create(device=self.lamp, action='turned_on')
+
+    def test_payloads_match_the_sync_views(self):
+        for sync_url, async_url in (
+            ('/api/v1/devices/?page_size=1', '/api/v1/async/devices/?page_size=1'),
+            (f'/api/v1/devices/{self.lamp.pk}/', f'/api/v1/async/devices/{self.lamp.pk}/'),
+            (f'/api/v1/devices/{self.lamp.pk}/logs/', f'/api/v1/async/devices/{self.lamp.pk}/logs/'),
+            ('/api/v1/stats/', '/api/v1/async/stats/'),
+        ):
+            expected, actual = self.client.get(sync_url).json(), self.client.get(async_url).json()
+            if 'next' in expected:
+                self.assertEqual(bool(expected.pop('next')), bool(actual.pop('next')))
+            self.assertEqual(actual, expected, async_url)
+
+    def test_missing_device_and_etag(self):
+        self.assertEqual(self.client.get(f'/api/v1/async/devices/{uuid.uuid4()}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/v1/async/devices/{uuid.uuid4()}/logs/').status_code, 404)
+
+        first = self.client.get('/api/v1/async/devices/')
+        again = self.client.get('/api/v1/async/devices/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
@@ -1,5 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
+from . import async_views
+from .streams import device_events
 from .views import DeviceViewSet
 
 router = DefaultRouter()
@@ -11,5 +13,11 @@ urlpatterns = [
     # POST /api/v1/devices/ (create) and GET /api/v1/devices/ (list) are
     # provided by the registered DeviceViewSet.
     path("", include(router.urls)),
+    # Server-Sent Events; needs the ASGI entry point (server/asgi.py)
+    path("events/", device_events, name="device-events"),
+    # async read paths for dashboard polling under ASGI (async_views.py)
+    path("async/devices/", async_views.device_list, name="async-device-list"),
+    path("async/devices/<uuid:pk>/", async_views.device_detail, name="async-device-detail"),
+    path("async/devices/<uuid:pk>/logs/", async_views.device_logs, name="async-device-logs"),
 ]
 
@@ -1,32 +1,124 @@
 import logging
 
+import hashlib
+
+from django.conf import settings
 from django.db import IntegrityError, transaction
+from django.db.models import Max
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import serializers as drf_serializers
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import APIException, NotFound, Throttled
+from rest_framework.permissions import IsAdminUser
 
-from .serializers import DeviceSerializer
+from .bulk import apply_operations
+from .changes import CursorExpired, collect_changes
+from .fastpath import device_values_serializer
+from .filters import DeviceFilterBackend
+from .discovery import discovery_options, get_scan, start_scan
+from .presence import get_tracker
+from .serializers import (
+    BulkDeviceOperationSerializer,
+    DeviceExportQuerySerializer,
+    DeviceSerializer,
+    DiscoverySerializer,
+    HeartbeatSerializer,
+)
 from server.apps.device_logs.serializers import DeviceLogSerializer
 from server.apps.device_logs.models import DeviceLog
-from .models import Device
+from .models import Device, DeviceTombstone
+from .queries import plan_device_queryset
+from server.caching import ResponseCacheMixin, get_version
+from server.exports import export_response
+from server.pagination import NameKeysetPagination, TimestampKeysetPagination
+from server.parsers import FastJSONParser, NDJSONParser
+from server.projection import Projection, SparseFieldsViewMixin
 
 logger = logging.getLogger(__name__)
 
+BULK_MAX_OPERATIONS = 10_000
+CHANGES_PAGE_SIZE = 500
+EXPORT_FIELDS = (
+    'id', 'name', 'device_type', 'brand', 'model', 'ip_address', 'mac_address', 'status', 'is_active',
+    'last_seen', 'room_id', 'category_id', 'created_at', 'updated_at',
+)
+
+
+def _stamp(value):
+    return f'{value.timestamp():.6f}' if value else '-'
 
-class DeviceViewSet(viewsets.ModelViewSet):
+
+class DeviceViewSet(ResponseCacheMixin, SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for CRUD operations on Device model.
+
+    List and detail responses accept ``?fields=`` and ``?expand=room,category``
+    (see ``server.projection``); lists take the filters in ``filters.py``.
     """
     queryset = Device.objects.all()
     serializer_class = DeviceSerializer
+    pagination_class = NameKeysetPagination
+    filter_backends = [DeviceFilterBackend]
+    cache_resource = 'devices'
+    projection_relations = ('room', 'category')
+    projection_always = ('id', 'name')
+
+    def get_queryset(self):
+        # join room/category and annotate their device counts so list and
+        # detail responses do not issue per-row queries; only for the
+        # relations the response embeds
+        return plan_device_queryset(super().get_queryset(), self.get_projection().expand)
+
+    def list(self, request, *args, **kwargs):
+        if not settings.DEVICE_LIST_FAST_PATH:
+            return super().list(request, *args, **kwargs)
+        return self._cached_response('list', self._values_list, request, *args, **kwargs)
+
+    def _values_list(self, request, *args, **kwargs):
+        # same payload as DeviceSerializer, built from .values() rows (fastpath.py)
+        plan = device_values_serializer(self.get_projection().keys)
+        queryset = plan.values(self.filter_queryset(Device.objects.all()), *self.projection_always)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(plan.render(page, using=queryset.db))
+
+    def get_conditional_validators(self, action, request, *args, **kwargs):
+        """ETags from the resource version and the table so polls can 304 before serializing.
+
+        Every device, room and category write bumps the ``devices`` version
+        (``server.caching``), so any such write revalidates every device
+        ETag, including an unrelated device's detail. The version lives in
+        the cache, which is per process unless a shared backend is set up,
+        so the ETags also carry what the database says: detail the device's
+        ``updated_at`` and ``last_seen`` (heartbeats only move the latter),
+        list the newest ``updated_at``, ``last_seen`` and tombstone, three
+        index lookups. A worker that missed a device write thus still sees
+        it; room and category edits have no timestamp and reach other
+        workers only through a shared cache. No Last-Modified for the same
+        reason.
+        """
+        version = get_version(self.cache_resource)
+        if action == 'retrieve':
+            stamps = Device.objects.filter(pk=kwargs.get('pk')).values_list('updated_at', 'last_seen').first()
+            if stamps is None:
+                return None
+            return f'{version}-{_stamp(stamps[0])}-{_stamp(stamps[1])}', None
+
+        # one aggregate per query, so SQLite answers each MAX from its index
+        stamps = (
+            Device.objects.aggregate(latest=Max('updated_at'))['latest'],
+            Device.objects.aggregate(latest=Max('last_seen'))['latest'],
+            DeviceTombstone.objects.aggregate(latest=Max('deleted_at'))['latest'],
+        )
+        query = hashlib.md5(request.get_full_path().encode('utf-8'), usedforsecurity=False).hexdigest()[:12]
+        return f'{version}-{"-".join(_stamp(stamp) for stamp in stamps)}-{query}', None
 
     @action(detail=True, methods=["get", "post"], url_path="logs")
     def logs(self, request, pk=None):
         """Handle logs for a specific device.
 
-        - GET /api/v1/devices/{pk}/logs/  -> list logs (newest first)
+        - GET /api/v1/devices/{pk}/logs/  -> list logs (newest first),
+          honouring ``?fields=``
         - POST /api/v1/devices/{pk}/logs/ -> create a new log for device
         """
         # get_object() will raise 404 if not found and applies any view-level
@@ -34,15 +126,20 @@ class DeviceViewSet(viewsets.ModelViewSet):
         device = self.get_object()
 
         if request.method == 'GET':
-            qs = DeviceLog.objects.filter(device=device).order_by("-timestamp")
+            projection = Projection.from_request(request, DeviceLogSerializer)
+            qs = DeviceLog.objects.filter(device=device).order_by("-timestamp", "-id")
+            only = projection.only("id", "timestamp")
+            if only is not None:
+                qs = qs.only(*only)
 
-            # respect pagination if configured on the view/router
-            page = self.paginate_queryset(qs)
+            # logs are keyed on (timestamp, id), not the device list's (name, id)
+            paginator = TimestampKeysetPagination()
+            page = paginator.paginate_queryset(qs, request, view=self)
             if page is not None:
-                serializer = DeviceLogSerializer(page, many=True)
-                return self.get_paginated_response(serializer.data)
+                serializer = DeviceLogSerializer(page, many=True, fields=projection.keys)
+                return paginator.get_paginated_response(serializer.data)
 
-            serializer = DeviceLogSerializer(qs, many=True)
+            serializer = DeviceLogSerializer(qs, many=True, fields=projection.keys)
             return Response(serializer.data)
 
         # POST: create a new log for this device
@@ -64,7 +161,111 @@ class DeviceViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=201)
 
-    
+    @action(detail=False, methods=["post"], url_path="bulk", parser_classes=[FastJSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Create, update and delete many devices in one request.
+
+        POST /api/v1/devices/bulk/ with a JSON array (or NDJSON, one item per
+        line) of ``{"op": "create"|"update"|"delete", ...}`` items. Returns
+        per-item results in request order.
+        """
+        serializer = BulkDeviceOperationSerializer(data=request.data, many=True, max_length=BULK_MAX_OPERATIONS)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = apply_operations(serializer.validated_data)
+        except IntegrityError:
+            logger.exception("IntegrityError while applying bulk device operations")
+            raise drf_serializers.ValidationError({"detail": "Database integrity error while applying bulk operations."})
+        except Exception:
+            logger.exception("Unexpected error while applying bulk device operations")
+            raise APIException("Internal server error")
+
+        return Response({"results": results})
+
+    @action(detail=False, methods=["post"], url_path="heartbeat")
+    def heartbeat(self, request):
+        """Record that devices are alive.
+
+        POST /api/v1/devices/heartbeat/ with ``{"devices": [<id>, ...]}``.
+        Pings are coalesced in memory and ``last_seen`` is written in batches
+        (presence.py); answers 202, or 429 while the tracker is full.
+        """
+        serializer = HeartbeatSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        devices = serializer.validated_data["devices"]
+        if not get_tracker().beat(devices):
+            raise Throttled(wait=1, detail="Presence tracking is saturated, retry shortly.")
+        return Response({"accepted": len(devices)}, status=202)
+
+    @action(detail=False, methods=["post"], url_path="discover", permission_classes=[IsAdminUser])
+    def discover(self, request):
+        """Start a scan of a network for devices (admins only).
+
+        POST /api/v1/devices/discover/ with ``{"network": "192.168.1.0/24"}``
+        and an optional ``timeout``. Answers 202 with the job and its URL in
+        ``Location``; GET that URL for what was created, updated and found
+        but not identified (see discovery.py). 409 while a scan runs.
+        """
+        serializer = DiscoverySerializer(data=request.data, max_hosts=discovery_options()["MAX_HOSTS"])
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        job = start_scan(params["network"], timeout=params.get("timeout"))
+        if job is None:
+            return Response({"detail": "A discovery scan is already running."}, status=409)
+        return Response(job, status=202, headers={"Location": request.build_absolute_uri(f"{job['id']}/")})
+
+    @action(detail=False, methods=["get"], url_path=r"discover/(?P<job_id>[0-9a-f-]{36})",
+            permission_classes=[IsAdminUser])
+    def discovery_job(self, request, job_id=None):
+        """GET /api/v1/devices/discover/{id}/ -> the state of a scan started above."""
+        job = get_scan(job_id)
+        if job is None:
+            raise NotFound("Unknown or expired discovery scan.")
+        return Response(job)
+
+    @action(detail=False, methods=["get"], url_path="changes")
+    def changes(self, request):
+        """Devices changed and deleted since ``?since=<cursor>``.
+
+        GET /api/v1/devices/changes/ (no cursor) starts with a full snapshot;
+        keep passing the returned ``cursor`` back while ``has_more`` is true,
+        then poll with it to receive only later changes and tombstones.
+        """
+        try:
+            changed, tombstones, cursor, has_more = collect_changes(
+                self.get_queryset(), since=request.query_params.get("since"), limit=CHANGES_PAGE_SIZE
+            )
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        except CursorExpired:
+            return Response({"detail": "Cursor is older than the tombstone retention window; resync without since."},
+                            status=410)
+
+        return Response({
+            "changed": self.get_serializer(changed, many=True).data,
+            "deleted": [{"id": str(t.device_id), "deleted_at": t.deleted_at} for t in tombstones],
+            "cursor": cursor,
+            "has_more": has_more,
+        })
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """Stream all devices as NDJSON (default) or CSV, by name.
+
+        GET /api/v1/devices/export/?output=ndjson|csv with optional ``room``,
+        ``category``, ``status`` and ``device_type`` filters.
+        """
+        query = DeviceExportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        devices = Device.objects.order_by("name", "id")
+        for param, field in (("room", "room_id"), ("category", "category_id"),
+                             ("status", "status"), ("device_type", "device_type")):
+            if param in params:
+                devices = devices.filter(**{field: params[param]})
+        return export_response(request, devices, EXPORT_FIELDS, params["output"], "devices")
+
     # Wrap common mutating operations to provide clearer error handling and
     # logging for database integrity or unexpected failures.
     def create(self, request, *args, **kwargs):
@@ -0,0 +1,129 @@
+"""Concurrent reachability checks of the active devices.
+
+``HealthChecker.run`` checks every ``is_active`` device that has an
+``ip_address`` over asyncio: a fixed pool of ``concurrency`` workers pulls
+devices lazily (``server.async_support.run_bounded``), as the discovery
+scanner does with hosts.
+A check opens a TCP connection to ``port`` and times the handshake; ICMP
+echo would need raw sockets, hence root. ``timeout`` bounds each connect,
+and refused or timed-out connects count as failures.
+
+Results are written in batches of ``batch_size`` as they arrive, one
+transaction each: the latencies go to the device and room histograms
+(``latency.record``); reachable devices get ``last_seen`` and flip from
+``offline`` to ``online``. An unreachable device only flips to
+``offline`` once it has also not been seen (by a check or a heartbeat)
+for the presence ``OFFLINE_AFTER``, so a single dropped connect does not
+fight the heartbeats, and a device checked more often than that needs
+several failed checks in a row. Flips log one ``status_change`` DeviceLog
+each, as presence does, and send ``devices_bulk_changed``; otherwise the
+``last_seen`` refresh invalidates the cached device payloads. A device
+that reports ``error`` keeps it while it answers.
+
+Settings (``DEVICE_HEALTH``): ``PORT``, ``TIMEOUT`` (seconds),
+``CONCURRENCY`` and ``RETENTION_HOURS`` (how long histograms are kept).
+"""
+
+import asyncio
+import datetime
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from server.apps.devices.models import Device
+from server.apps.devices.presence import OFFLINE, ONLINE, presence_options, set_status
+from server.apps.devices.signals import devices_bulk_changed
+from server.async_support import run_bounded
+from server.caching import invalidate
+
+from .latency import record
+
+DEFAULTS = {
+    'PORT': 80,
+    'TIMEOUT': 2.0,
+    'CONCURRENCY': 256,
+    'RETENTION_HOURS': 24 * 7,
+}
+BATCH_SIZE = 500
+
+
+def health_options():
+    return {**DEFAULTS, **getattr(settings, 'DEVICE_HEALTH', {})}
+
+
+class HealthChecker:
+    def __init__(self, port=None, timeout=None, concurrency=None, batch_size=BATCH_SIZE):
+        options = health_options()
+        self.port = port or options['PORT']
+        self.timeout = timeout or options['TIMEOUT']
+        self.concurrency = concurrency or options['CONCURRENCY']
+        self.batch_size = batch_size
+        self.stats = {'checked': 0, 'reachable': 0, 'unreachable': 0, 'skipped': 0, 'online': [], 'offline': []}
+        self._results = []
+
+    async def ping(self, host):
+        """Milliseconds a TCP connect to ``host`` took, or None if it failed."""
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        latency = (time.perf_counter() - started) * 1000
+        writer.close()
+        return latency
+
+    async def run(self, devices=None):
+        """Check ``devices`` (default: all active ones) and store the results. Returns ``self.stats``."""
+        targets = await sync_to_async(self._targets)(devices)
+        await run_bounded(targets, self._check, self.concurrency)
+        await self._flush()
+        return self.stats
+
+    def _targets(self, devices):
+        if devices is None:
+            devices = Device.objects.filter(is_active=True)
+        targets = []
+        for pk, room_id, ip in devices.values_list('pk', 'room_id', 'ip_address').iterator():
+            if ip:
+                targets.append((pk, room_id, ip))
+            else:
+                self.stats['skipped'] += 1
+        return targets
+
+    async def _check(self, target):
+        pk, room_id, ip = target
+        latency = await self.ping(ip)
+        self.stats['checked'] += 1
+        self.stats['unreachable' if latency is None else 'reachable'] += 1
+        self._results.append((pk, room_id, latency))
+        if len(self._results) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self):
+        batch, self._results = self._results, []
+        if batch:
+            await sync_to_async(self._store)(batch)
+
+    def _store(self, batch):
+        now = timezone.now()
+        reachable = [pk for pk, _, latency in batch if latency is not None]
+        unreachable = [pk for pk, _, latency in batch if latency is None]
+        seen_since = now - datetime.timedelta(seconds=presence_options()['OFFLINE_AFTER'])
+        with transaction.atomic():
+            record(batch, now)
+            Device.objects.filter(pk__in=reachable).update(last_seen=now)
+            online = set_status(Device.objects.filter(pk__in=reachable, status=OFFLINE), ONLINE, now)
+            stale = Device.objects.filter(Q(last_seen__isnull=True) | Q(last_seen__lt=seen_since), pk__in=unreachable)
+            offline = set_status(stale.exclude(status=OFFLINE), OFFLINE, now)
+            changes = {**online, **offline}
+            if changes:
+                devices_bulk_changed.send(sender=Device, device_ids=list(changes), changes=changes)
+            elif reachable:
+                invalidate('devices')
+
+        self.stats['online'] += [str(pk) for pk in online]
+        self.stats['offline'] += [str(pk) for pk in offline]
@@ -0,0 +1,154 @@
+"""Latency histograms: recording check results and reading percentiles.
+
+Latencies fall into fixed buckets with upper bounds ``BOUNDS_MS`` plus an
+overflow bucket; a check that failed is counted in ``FAILED_BUCKET`` and
+stays out of the percentiles. ``record`` adds a batch of results to the
+device's and its room's counts for the current hour with one additive
+upsert (``INSERT ... ON CONFLICT DO UPDATE``, as the usage rollups do), so
+concurrent checkers never lose counts.
+
+Percentiles are estimated from the merged buckets by interpolating
+linearly inside the bucket that holds the rank; a rank in the overflow
+bucket reports the last bound. With bounds roughly doubling, the estimate
+is within one bucket's width of the true value.
+"""
+
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.db.models import Sum
+
+from server.apps.device_usage.rollups import bucket_start, upsert_increments
+from server.apps.devices.models import Device
+from server.apps.rooms.models import Room
+
+from .models import SCOPE_CHOICES, LatencyCount
+
+BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+FAILED_BUCKET = -1
+PERCENTILES = {'p50': 0.50, 'p95': 0.95, 'p99': 0.99}
+BATCH_SIZE = 1000
+
+
+def bucket_index(latency_ms):
+    """The bucket of ``latency_ms``, or ``FAILED_BUCKET`` for None."""
+    if latency_ms is None:
+        return FAILED_BUCKET
+    return bisect_left(BOUNDS_MS, latency_ms)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS_MS) + 1)
+        self.failures = 0
+
+    def add(self, bucket, n=1):
+        if bucket == FAILED_BUCKET:
+            self.failures += n
+        else:
+            self.counts[bucket] += n
+
+    def merge(self, other):
+        for bucket, n in enumerate(other.counts):
+            self.counts[bucket] += n
+        self.failures += other.failures
+
+    def percentile(self, q):
+        """Estimated latency in ms below which a ``q`` share of the checks fell."""
+        total = sum(self.counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if bucket == len(BOUNDS_MS):
+                    return float(BOUNDS_MS[-1])
+                lower = BOUNDS_MS[bucket - 1] if bucket else 0
+                return round(lower + (BOUNDS_MS[bucket] - lower) * (rank - seen) / n, 2)
+            seen += n
+        return float(BOUNDS_MS[-1])
+
+    def summary(self):
+        return {
+            'checks': sum(self.counts) + self.failures,
+            'failures': self.failures,
+            **{name: self.percentile(q) for name, q in PERCENTILES.items()},
+        }
+
+    def buckets(self):
+        """``[{'le': bound in ms or None for overflow, 'count'}]``."""
+        return [{'le': le, 'count': n} for le, n in zip((*BOUNDS_MS, None), self.counts)]
+
+
+def record(results, now):
+    """Add ``[(device_id, room_id, latency_ms or None)]`` to the hour of ``now``."""
+    hour = bucket_start(now, 'hour')
+    increments = Counter()
+    for device_id, room_id, latency_ms in results:
+        bucket = bucket_index(latency_ms)
+        increments[('device', device_id, hour, bucket)] += 1
+        if room_id is not None:
+            increments[('room', room_id, hour, bucket)] += 1
+    upsert_increments(LatencyCount, ('scope', 'key', 'hour', 'bucket'), 'count', increments)
+
+
+def histograms(scope, start, end, keys=None):
+    """Return ``{key: Histogram}`` of ``scope`` over the hours in [start, end)."""
+    rows = LatencyCount.objects.filter(scope=scope, hour__gte=bucket_start(start, 'hour'), hour__lt=end)
+    if keys is not None:
+        rows = rows.filter(key__in=keys)
+    merged = defaultdict(Histogram)
+    for row in rows.values('key', 'bucket').annotate(n=Sum('count')).order_by():
+        merged[row['key']].add(row['bucket'], row['n'])
+    return dict(merged)
+
+
+def latency_report(start, end, room_id=None):
+    """Percentiles overall, per room and per device over [start, end).
+
+    With ``room_id`` only that room and its current devices are reported.
+    Devices and rooms deleted since are left out.
+    """
+    devices = Device.objects.all()
+    if room_id is not None:
+        devices = devices.filter(room_id=room_id)
+    per_device = histograms('device', start, end, keys=devices.values('pk') if room_id is not None else None)
+    per_room = histograms('room', start, end, keys=[room_id] if room_id is not None else None)
+
+    names = dict(devices.filter(pk__in=list(per_device)).values_list('pk', 'name')) if per_device else {}
+    room_names = dict(Room.objects.filter(pk__in=list(per_room)).values_list('pk', 'name')) if per_room else {}
+
+    overall = Histogram()
+    device_rows = []
+    for pk, histogram in per_device.items():
+        if pk not in names:
+            continue
+        overall.merge(histogram)
+        device_rows.append({'device': pk, 'name': names[pk], **histogram.summary()})
+    room_rows = [
+        {'room': pk, 'name': room_names[pk], **histogram.summary()}
+        for pk, histogram in per_room.items() if pk in room_names
+    ]
+
+    def slowest_first(row):
+        return row['p95'] is None, -(row['p95'] or 0), row['name']
+
+    return {
+        'overall': {**overall.summary(), 'buckets': overall.buckets()},
+        'rooms': sorted(room_rows, key=slowest_first),
+        'devices': sorted(device_rows, key=slowest_first),
+    }
+
+
+def prune(cutoff, chunk_size=BATCH_SIZE):
+    """Delete counts of hours before ``cutoff``, a chunk at a time."""
+    total = 0
+    # scope__in keeps the (scope, hour) index usable
+    scopes = [scope for scope, _ in SCOPE_CHOICES]
+    stale = LatencyCount.objects.filter(scope__in=scopes, hour__lt=bucket_start(cutoff, 'hour'))
+    while True:
+        pks = list(stale.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return total
+        total += LatencyCount.objects.filter(pk__in=pks).delete()[0]
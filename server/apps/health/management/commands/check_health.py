@@ -0,0 +1,52 @@
+"""Check that the active devices answer and record their latency.
+
+Run it from cron, or keep it running with --every:
+
+    python manage.py check_health
+    python manage.py check_health --every 60 --timeout 1 --concurrency 512
+
+See server/apps/health/checker.py for the check and the status updates.
+Histogram hours older than DEVICE_HEALTH["RETENTION_HOURS"] are pruned on
+each run.
+"""
+
+import datetime
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from server.apps.health.checker import BATCH_SIZE, HealthChecker, health_options
+from server.apps.health.latency import prune
+
+
+class Command(BaseCommand):
+    help = 'Connect to every active device concurrently, record round-trip latency and update statuses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=None, help='port to connect to (default: DEVICE_HEALTH)')
+        parser.add_argument('--timeout', type=float, default=None, help='seconds per device')
+        parser.add_argument('--concurrency', type=int, default=None, help='devices checked at once')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='results per transaction')
+        parser.add_argument('--every', type=float, default=None, help='repeat every N seconds instead of exiting')
+
+    def handle(self, *args, **options):
+        while True:
+            checker = HealthChecker(port=options['port'], timeout=options['timeout'],
+                                    concurrency=options['concurrency'], batch_size=options['batch_size'])
+            started = time.perf_counter()
+            stats = async_to_sync(checker.run)()
+            pruned = prune(timezone.now() - datetime.timedelta(hours=health_options()['RETENTION_HOURS']))
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Checked {stats['checked']} devices in {time.perf_counter() - started:.1f}s: "
+                f"{stats['reachable']} reachable, {stats['unreachable']} unreachable, "
+                f"{stats['skipped']} without an address; {len(stats['online'])} back online, "
+                f"{len(stats['offline'])} marked offline; pruned {pruned} histogram rows."
+            ))
+            if options['every'] is None:
+                return
+            close_old_connections()
+            time.sleep(options['every'])
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LatencyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('device', 'device'), ('room', 'room')], max_length=6)),
+                ('key', models.UUIDField()),
+                ('hour', models.DateTimeField()),
+                ('bucket', models.SmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'health_latency_counts',
+                'indexes': [models.Index(fields=['scope', 'hour'], name='health_latency_scope_hour_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key', 'hour', 'bucket'), name='health_latency_counts_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+"""Round-trip latency histograms written by the health checker.
+
+``LatencyCount`` holds how many checks of one device, or of the devices of
+one room, fell into one latency bucket during one hour. The bucket bounds
+live in ``server.apps.health.latency``; failed checks are counted in
+``FAILED_BUCKET``. Rows are kept for ``DEVICE_HEALTH['RETENTION_HOURS']``.
+"""
+
+from django.db import models
+
+SCOPE_CHOICES = [('device', 'device'), ('room', 'room')]
+
+
+class LatencyCount(models.Model):
+    class Meta:
+        db_table = "health_latency_counts"
+        constraints = [
+            # upsert target
+            models.UniqueConstraint(fields=['scope', 'key', 'hour', 'bucket'], name='health_latency_counts_key'),
+        ]
+        indexes = [
+            # reports over a window, and pruning
+            models.Index(fields=['scope', 'hour'], name='health_latency_scope_hour_idx'),
+        ]
+    scope = models.CharField(max_length=6, choices=SCOPE_CHOICES)
+    # the device or room id; no FK, since rows of either outlive deletions until pruned
+    key = models.UUIDField()
+    hour = models.DateTimeField()
+    bucket = models.SmallIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.scope} {self.key} bucket {self.bucket} x{self.count} at {self.hour:%Y-%m-%d %H:00}'
@@ -0,0 +1,115 @@
+import datetime
+import socket
+from contextlib import ExitStack
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.models import Device
+from server.apps.health.latency import Histogram, bucket_index, prune, record
+from server.apps.health.models import LatencyCount
+from server.apps.rooms.models import Room
+
+
+def listen(stack, hosts):
+    """Listen on the same free port of each loopback host; returns the port.
+
+    The kernel completes the handshake from the backlog, so nothing accepts.
+    """
+    port = 0
+    for host in hosts:
+        server = stack.enter_context(socket.create_server((host, port)))
+        port = server.getsockname()[1]
+    return port
+
+
+class HealthCheckTests(APITestCase):
+    url = '/api/v1/health/'
+
+    def setUp(self):
+        self.room = Room.objects.create(name='Hall')
+        self.lamp = Device.objects.create(name='Lamp', device_type='light', ip_address='127.0.0.2', room=self.room)
+        self.plug = Device.objects.create(name='Plug', device_type='plug', ip_address='127.0.0.3', status='online')
+        self.sensor = Device.objects.create(name='Sensor', device_type='sensor', status='error', room=self.room)
+        Device.objects.create(name='Spare', device_type='plug', ip_address='127.0.0.3', is_active=False)
+
+    def test_checks_active_devices_and_flips_status(self):
+        out = StringIO()
+        with ExitStack() as stack:
+            port = listen(stack, ['127.0.0.2'])
+            call_command('check_health', port=port, timeout=0.5, stdout=out)
+        self.assertIn('Checked 2 devices', out.getvalue())
+        self.assertIn('1 reachable, 1 unreachable, 1 without an address; 1 back online, 1 marked offline',
+                      out.getvalue())
+
+        self.lamp.refresh_from_db()
+        self.plug.refresh_from_db()
+        self.assertEqual((self.lamp.status, self.plug.status), ('online', 'offline'))
+        self.assertIsNotNone(self.lamp.last_seen)
+        self.assertEqual(DeviceLog.objects.filter(action='status_change').count(), 2)
+
+        counts = dict(LatencyCount.objects.values_list('key', 'bucket'))
+        self.assertEqual(counts[self.plug.pk], -1)
+        self.assertGreaterEqual(counts[self.room.pk], 0)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['overall']['checks'], 2)
+        self.assertEqual(response.data['overall']['failures'], 1)
+        self.assertEqual([row['name'] for row in response.data['devices']], ['Lamp', 'Plug'])
+        self.assertIsNone(response.data['devices'][1]['p50'])
+        self.assertEqual(response.data['rooms'][0]['room'], self.room.pk)
+
+    @override_settings(DEVICE_PRESENCE={'FLUSH_INTERVAL': None, 'OFFLINE_AFTER': 60})
+    def test_recently_seen_devices_survive_a_failed_check(self):
+        Device.objects.filter(pk=self.plug.pk).update(last_seen=timezone.now() - datetime.timedelta(seconds=30))
+        Device.objects.filter(pk=self.lamp.pk).update(status='online')
+        lamp_url = f'/api/v1/devices/{self.lamp.pk}/'
+        etag = self.client.get(lamp_url)['ETag']
+        with ExitStack() as stack:
+            port = listen(stack, ['127.0.0.2'])
+            call_command('check_health', port=port, timeout=0.5, stdout=StringIO())
+        self.plug.refresh_from_db()
+        self.assertEqual(self.plug.status, 'online')
+
+        # no status changed; the lamp's last_seen did
+        self.assertEqual(self.client.get(lamp_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        Device.objects.filter(pk=self.plug.pk).update(last_seen=timezone.now() - datetime.timedelta(minutes=5))
+        call_command('check_health', port=port, timeout=0.5, stdout=StringIO())
+        self.plug.refresh_from_db()
+        self.assertEqual(self.plug.status, 'offline')
+
+    def test_reports_percentiles_from_buckets(self):
+        now = timezone.now()
+        record([(self.lamp.pk, self.room.pk, 3.0)] * 90 + [(self.lamp.pk, self.room.pk, 150.0)] * 10, now)
+        record([(self.plug.pk, None, 0.5)] * 10 + [(self.plug.pk, None, None)], now)
+
+        response = self.client.get(self.url, {'hours': 1})
+        lamp, plug = response.data['devices']
+        self.assertEqual((lamp['device'], lamp['checks'], lamp['p50'], lamp['p95'], lamp['p99']),
+                         (self.lamp.pk, 100, 3.67, 150.0, 190.0))
+        self.assertEqual((plug['checks'], plug['failures'], plug['p99']), (11, 1, 0.99))
+        self.assertEqual(response.data['overall']['checks'], 111)
+        self.assertEqual(sum(b['count'] for b in response.data['overall']['buckets']), 110)
+
+        room = self.client.get(self.url, {'room': str(self.room.pk)}).data
+        self.assertEqual([row['device'] for row in room['devices']], [self.lamp.pk])
+        self.assertEqual(room['rooms'][0]['p50'], lamp['p50'])
+
+        self.assertEqual(self.client.get(self.url, {'hours': 10_000}).status_code, 400)
+
+    def test_histogram_edges_and_pruning(self):
+        self.assertEqual([bucket_index(ms) for ms in (None, 0.2, 1, 1.01, 9000)], [-1, 0, 0, 1, 12])
+        histogram = Histogram()
+        histogram.add(bucket_index(9000))
+        self.assertEqual(histogram.summary(), {'checks': 1, 'failures': 0, 'p50': 5000.0, 'p95': 5000.0, 'p99': 5000.0})
+
+        record([(self.lamp.pk, self.room.pk, 1.0)], timezone.now() - datetime.timedelta(days=10))
+        record([(self.lamp.pk, self.room.pk, 1.0)], timezone.now())
+        self.assertEqual(prune(timezone.now() - datetime.timedelta(days=7)), 2)
+        self.assertEqual(LatencyCount.objects.count(), 2)
@@ -0,0 +1,45 @@
+import datetime
+
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .checker import health_options
+from .latency import latency_report
+
+
+class HealthQuerySerializer(serializers.Serializer):
+    hours = serializers.IntegerField(min_value=1, default=24)
+    room = serializers.UUIDField(required=False)
+
+    def validate_hours(self, value):
+        retention = health_options()['RETENTION_HOURS']
+        if value > retention:
+            raise serializers.ValidationError(f'Latencies are kept for {retention} hours.')
+        return value
+
+
+class HealthView(APIView):
+    """Device round-trip latency from the health checks.
+
+    GET /api/v1/health/?hours=24&room=<id> returns checks, failures and
+    p50/p95/p99 latency in milliseconds overall (with its histogram), per
+    room and per device, slowest first. Figures cover whole hours, the
+    current one included; ``manage.py check_health`` produces them.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = HealthQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        end = timezone.now()
+        start = end - datetime.timedelta(hours=params['hours'])
+        return Response({
+            'start': start,
+            'end': end,
+            'room': params.get('room'),
+            **latency_report(start, end, room_id=params.get('room')),
+        })
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['name', 'id'], name='rooms_name_id_idx'),
+        ),
+    ]
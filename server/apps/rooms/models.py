@@ -15,6 +15,9 @@ from django.apps import apps
 class Room(models.Model):
     class Meta:
         db_table = "rooms"
+        indexes = [
+            models.Index(fields=['name', 'id'], name='rooms_name_id_idx'),
+        ]
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     description = models.TextField(null=True, blank=True)
@@ -24,6 +27,11 @@ class Room(models.Model):
         return self.name
 
     def device_count(self) -> int:
+        # Planned querysets (RoomViewSet, plan_device_queryset) annotate the
+        # count up front; only fall back to a COUNT query when they did not.
+        annotated = getattr(self, 'num_devices', None)
+        if annotated is not None:
+            return int(annotated)
         # apps.get_model avoids import cycles and works whether Device is in the same module or another one
         Device = apps.get_model('devices', 'Device')
         try:
@@ -46,6 +54,7 @@ class Room(models.Model):
     if TYPE_CHECKING:  # pragma: no cover - typing only
         devices: Any
         device_set: Any
+        num_devices: int
 
     def to_dict(self):
         return {
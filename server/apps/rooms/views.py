@@ -1,12 +1,17 @@
+from django.db.models import Count
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
 
 from server.apps.rooms.models import Room
+from server.caching import ResponseCacheMixin
+from server.pagination import NameKeysetPagination
 from .serializers import RoomSerializer
 
 
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(ResponseCacheMixin, viewsets.ModelViewSet):
     """Simple Room API - read/write for rooms."""
-    queryset = Room.objects.all().order_by('name')
+    queryset = Room.objects.annotate(num_devices=Count('devices')).order_by('name')
     serializer_class = RoomSerializer
     permission_classes = [AllowAny]
+    cache_resource = 'rooms'
+    pagination_class = NameKeysetPagination
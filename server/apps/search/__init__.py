@@ -0,0 +1,5 @@
+"""Search app package.
+
+Full-text search over devices and device logs, backed by SQLite FTS5
+indexes that triggers keep in sync with the tables.
+"""
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class SearchConfig(AppConfig):
+    name = 'server.apps.search'
+    label = 'search'
+
+    def ready(self):
+        # restore triggers that later migrations dropped by rebuilding a table
+        from .schema import ensure_after_migrate
+        post_migrate.connect(ensure_after_migrate, sender=self)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from server.apps.search.schema import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes from the devices and device_logs tables (e.g. after VACUUM).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Full-text search indexes need SQLite (FTS5).')
+        indexes = rebuild(connection)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(indexes)} search indexes ({", ".join(indexes)}).'))
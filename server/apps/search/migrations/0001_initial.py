@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from server.apps.search.schema import drop_schema, ensure_schema
+
+
+def create_indexes(apps, schema_editor):
+    # FTS5 is SQLite's; other backends get no search indexes
+    if schema_editor.connection.vendor == 'sqlite':
+        ensure_schema(schema_editor.connection)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_schema(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('devices', '0004_list_filter_indexes'),
+        ('device_logs', '0004_log_device_no_cascade'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,44 @@
+"""Ranked full-text queries over the FTS5 indexes (``schema.py``).
+
+Free text becomes an FTS5 expression of quoted terms, all of which must
+match; the last is a prefix so results appear while the user types. Each
+index returns its best ``limit`` hits by ``rank`` (bm25 with the index's
+column weights, which FTS5 orders itself), joined back to the source rows
+by ``rowid``; the hits of both are merged by score. Scores are negated
+bm25, so higher is better, and compare only roughly across the two indexes
+since each ranks against its own term statistics.
+"""
+
+import re
+
+from django.db import connections
+
+from .schema import INDEXES
+
+_WORD = re.compile(r'\w')
+
+
+def match_expression(text):
+    """``kitchen lam`` -> ``"kitchen" "lam"*``; None if there is nothing to match."""
+    terms = [term for term in text.split() if _WORD.search(term)]
+    if not terms:
+        return None
+    quoted = ['"%s"' % term.replace('"', '""') for term in terms]
+    return ' '.join(quoted) + '*'
+
+
+def search(expression, kinds=None, limit=20, using='default'):
+    """Return ``[(kind, pk, score)]`` best first."""
+    hits = []
+    with connections[using].cursor() as cursor:
+        for kind in kinds or INDEXES:
+            index = INDEXES[kind]
+            cursor.execute(
+                f'SELECT source.id, -{index.fts_table}.rank '
+                f'FROM {index.fts_table} JOIN {index.table} AS source ON source.rowid = {index.fts_table}.rowid '
+                f'WHERE {index.fts_table} MATCH %s ORDER BY {index.fts_table}.rank LIMIT %s',
+                [expression, limit],
+            )
+            hits.extend((kind, pk, score) for pk, score in cursor.fetchall())
+    hits.sort(key=lambda hit: hit[2], reverse=True)
+    return hits[:limit]
@@ -0,0 +1,104 @@
+"""FTS5 indexes over ``devices`` and ``device_logs`` and the triggers feeding them.
+
+Each index is an external-content FTS5 table: it stores only the inverted
+index and reads the text back from the source table by ``rowid``. Triggers
+on the source table apply every insert, delete and text-changing update in
+the writing transaction, so ``bulk_create``, the ingestion buffer, the
+retention sweep's raw deletes and ``QuerySet.update()`` are all covered
+without signals.
+
+SQLite drops a table's triggers, and may renumber its rowids, when a
+migration rebuilds the table (or on VACUUM). ``ensure_schema`` runs after
+every ``migrate`` and rebuilds an index whose triggers had gone missing;
+``manage.py rebuild_search_index`` does the same on demand.
+"""
+
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+
+
+class SearchIndex:
+    def __init__(self, table, columns, weights):
+        self.table = table
+        self.columns = columns
+        # bm25() column weights, in column order; stored as the table's rank
+        self.weights = weights
+        self.fts_table = f'{table}_fts'
+
+    @property
+    def triggers(self):
+        return {f'{self.fts_table}_{suffix}' for suffix in ('ai', 'ad', 'au')}
+
+    def ddl(self):
+        columns = ', '.join(self.columns)
+        new = ', '.join(f'new.{column}' for column in self.columns)
+        old = ', '.join(f'old.{column}' for column in self.columns)
+        changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in self.columns)
+        insert = f"INSERT INTO {self.fts_table}(rowid, {columns}) VALUES (new.rowid, {new});"
+        delete = f"INSERT INTO {self.fts_table}({self.fts_table}, rowid, {columns}) VALUES ('delete', old.rowid, {old});"
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5({columns}, content='{self.table}', "
+            f"content_rowid='rowid', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"INSERT INTO {self.fts_table}({self.fts_table}, rank) VALUES ('rank', 'bm25({weights})')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {self.table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {self.table} BEGIN {delete} END",
+            # status/last_seen updates leave the text alone and skip the index
+            f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {columns} ON {self.table} "
+            f"WHEN {changed} BEGIN {delete} {insert} END",
+        ]
+
+
+INDEXES = {
+    'device': SearchIndex('devices', ('name', 'brand', 'model', 'device_type'), (10.0, 5.0, 5.0, 2.0)),
+    'log': SearchIndex('device_logs', ('action', 'old_value', 'new_value'), (2.0, 1.0, 1.0)),
+}
+
+
+def _existing(cursor, kind):
+    cursor.execute('SELECT name FROM sqlite_master WHERE type = %s', [kind])
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_schema(connection):
+    """Create missing indexes and triggers; rebuild the indexes that had any
+    missing. Returns the names of the rebuilt indexes."""
+    rebuilt = []
+    with connection.cursor() as cursor:
+        tables = _existing(cursor, 'table')
+        triggers = _existing(cursor, 'trigger')
+        for name, index in INDEXES.items():
+            complete = index.fts_table in tables and index.triggers <= triggers
+            for statement in index.ddl():
+                cursor.execute(statement)
+            if not complete:
+                cursor.execute(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')")
+                rebuilt.append(name)
+    return rebuilt
+
+
+def rebuild(connection):
+    """Recreate every index from its source table."""
+    with connection.cursor() as cursor:
+        for index in INDEXES.values():
+            for statement in index.ddl():
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')")
+    return list(INDEXES)
+
+
+def drop_schema(connection):
+    with connection.cursor() as cursor:
+        for index in INDEXES.values():
+            for trigger in sorted(index.triggers):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {index.fts_table}')
+
+
+def ensure_after_migrate(sender, using, **kwargs):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if ('search', '0001_initial') not in MigrationRecorder(connection).applied_migrations():
+        return
+    ensure_schema(connection)
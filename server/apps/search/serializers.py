@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .schema import INDEXES
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    type = serializers.ChoiceField(choices=list(INDEXES), required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
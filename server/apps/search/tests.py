@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.writers import write_logs
+from server.apps.devices.models import Device
+from server.apps.search.schema import INDEXES, ensure_schema
+
+
+class SearchTests(APITestCase):
+    url = '/api/v1/search/'
+
+    def setUp(self):
+        self.lamp = Device.objects.create(name='Kitchen Lamp', device_type='light', brand='Philips', model='Hue')
+        self.plug = Device.objects.create(name='Desk Plug', device_type='plug', brand='Kasa')
+        write_logs([DeviceLog(device=self.plug, action='firmware_update', old_value='1.2', new_value='philips bridge')])
+
+    def _results(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['object']['id']) for item in response.data['results']]
+
+    def test_ranks_devices_and_logs_together(self):
+        results = self._results(q='philips')
+        self.assertEqual(results[0], ('device', str(self.lamp.pk)))
+        self.assertEqual(results[1][0], 'log')
+        self.assertEqual(self._results(q='phil', type='log'), results[1:])
+        self.assertEqual(self._results(q='kitchen la'), [('device', str(self.lamp.pk))])
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.lamp.brand = 'Ikea'
+        self.lamp.save()
+        Device.objects.filter(pk=self.plug.pk).update(name='Office Plug')
+        self.assertEqual(self._results(q='ikea'), [('device', str(self.lamp.pk))])
+        self.assertEqual(self._results(q='desk'), [])
+
+        DeviceLog.objects.all().delete()
+        self.lamp.delete()
+        self.assertEqual(self._results(q='philips'), [])
+
+    def test_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:
+            for trigger in INDEXES['device'].triggers:
+                cursor.execute(f'DROP TRIGGER {trigger}')
+        Device.objects.create(name='Garage Door', device_type='opener')
+
+        self.assertEqual(ensure_schema(connection), ['device'])
+        self.assertEqual(len(self._results(q='garage')), 1)
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self._results(q='garage')), 1)
+
+    def test_rejects_queries_without_words(self):
+        self.assertEqual(self.client.get(self.url, {'q': '" - *'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 400)
@@ -0,0 +1,62 @@
+from django.db import connections, router
+from rest_framework import serializers
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.device_logs.serializers import DeviceLogSerializer
+from server.apps.devices.models import Device
+from server.apps.devices.serializers import DeviceSerializer
+
+from .queries import match_expression, search
+from .serializers import SearchQuerySerializer
+
+DEVICE_FIELDS = ('id', 'name', 'device_type', 'brand', 'model', 'status', 'is_active', 'last_seen')
+
+# kind -> (model, serialize a list of instances)
+RESULT_TYPES = {
+    'device': (Device, lambda devices: DeviceSerializer(devices, many=True, fields=DEVICE_FIELDS).data),
+    'log': (DeviceLog, lambda logs: DeviceLogSerializer(logs, many=True).data),
+}
+
+
+class SearchView(APIView):
+    """Ranked full-text search across devices and their logs.
+
+    GET /api/v1/search/?q=<text>[&type=device|log][&limit=20] matches device
+    name, brand, model and type, and log action and old/new values. Results
+    are ``{"type", "score", "object"}``, best first.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        expression = match_expression(params['q'])
+        if expression is None:
+            raise serializers.ValidationError({'q': ['Enter at least one word to search for.']})
+
+        using = router.db_for_read(Device)
+        if connections[using].vendor != 'sqlite':
+            return Response({'detail': 'Full-text search needs the SQLite backend.'}, status=501)
+        kinds = [params['type']] if 'type' in params else None
+        hits = [
+            (kind, RESULT_TYPES[kind][0]._meta.pk.to_python(pk), score)
+            for kind, pk, score in search(expression, kinds, params['limit'], using=using)
+        ]
+
+        objects = {}
+        for kind, (model, serialize) in RESULT_TYPES.items():
+            pks = [pk for hit_kind, pk, _ in hits if hit_kind == kind]
+            if pks:
+                instances = model.objects.using(using).in_bulk(pks)
+                objects[kind] = dict(zip(instances, serialize(list(instances.values()))))
+
+        results = []
+        for kind, pk, score in hits:
+            # a row deleted since the match is skipped
+            if pk in objects[kind]:
+                results.append({'type': kind, 'score': round(score, 4), 'object': objects[kind][pk]})
+        return Response({'results': results})
@@ -0,0 +1,5 @@
+"""Stats app package.
+
+Dashboard summary counts for devices and rooms, computed with a single
+aggregate query or read from materialized counters.
+"""
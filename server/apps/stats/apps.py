@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class StatsConfig(AppConfig):
+    name = 'server.apps.stats'
+    label = 'stats'
+
+    def ready(self):
+        # connect the counter maintenance receivers
+        from . import signals  # noqa: F401
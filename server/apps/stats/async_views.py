@@ -0,0 +1,21 @@
+"""Async (ASGI-native) counterpart of StatsView at /api/v1/async/stats/."""
+
+from django.conf import settings
+
+from server.apps.rooms.models import Room
+from server.async_support import db_slots, json_response, method_not_allowed
+
+from .models import StatCounter
+from .queries import build_stats, counters_payload, stats_queryset
+
+
+async def stats(request):
+    if request.method != 'GET':
+        return method_not_allowed(request)
+    async with db_slots():
+        if getattr(settings, 'STATS_COUNTERS', False):
+            values = {name: value async for name, value in StatCounter.objects.values_list('name', 'value')}
+            return json_response(counters_payload(values))
+        rows = [row async for row in stats_queryset()]
+        total_rooms = rows[0]['rooms'] if rows else await Room.objects.acount()
+    return json_response(build_stats(rows, total_rooms))
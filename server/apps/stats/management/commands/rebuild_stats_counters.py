@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from server.apps.stats.queries import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized dashboard counters (run after enabling STATS_COUNTERS or bulk loads).'
+
+    def handle(self, *args, **options):
+        counters = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(counters)} counters ({counters["devices"]} devices).'))
@@ -0,0 +1,18 @@
+"""Materialized dashboard counters.
+
+One row per counter, named ``devices``, ``rooms``, ``devices:status:<status>``
+or ``devices:type:<device_type>``. Rows are kept current by the receivers in
+``server.apps.stats.signals`` while ``settings.STATS_COUNTERS`` is enabled.
+"""
+
+from django.db import models
+
+
+class StatCounter(models.Model):
+    class Meta:
+        db_table = "stat_counters"
+    name = models.CharField(max_length=120, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}={self.value}'
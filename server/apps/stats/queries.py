@@ -0,0 +1,100 @@
+"""Dashboard statistics.
+
+``compute_stats`` answers from the devices table with one grouped,
+conditionally aggregated query. ``read_counters`` answers from the
+materialized ``StatCounter`` rows instead, which costs one scan of a table
+with a few dozen rows regardless of how many devices exist.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Func, IntegerField, Q, Subquery
+
+from server.apps.devices.models import Device
+from server.apps.rooms.models import Room
+
+from .models import StatCounter
+
+STATUSES = ('online', 'offline', 'error')
+
+
+def stats_queryset():
+    """One row per device_type with per-status counts and the room total."""
+    # COUNT wrapped in Func is not treated as an aggregate, so the subquery
+    # stays ungrouped and returns a single scalar row.
+    room_total = Room.objects.order_by().annotate(
+        n=Func(F('pk'), function='COUNT', output_field=IntegerField())
+    ).values('n')
+    return (
+        Device.objects.order_by()
+        .values('device_type')
+        .annotate(
+            total=Count('pk'),
+            **{status: Count('pk', filter=Q(status=status)) for status in STATUSES},
+            rooms=Subquery(room_total, output_field=IntegerField()),
+        )
+        .order_by('device_type')
+    )
+
+
+def build_stats(rows, total_rooms=None):
+    """Fold ``stats_queryset`` rows into the dashboard payload."""
+    if total_rooms is None:
+        total_rooms = rows[0]['rooms'] if rows else Room.objects.count()
+    return {
+        'total_devices': sum(row['total'] for row in rows),
+        'online_devices': sum(row['online'] for row in rows),
+        'offline_devices': sum(row['offline'] for row in rows),
+        'error_devices': sum(row['error'] for row in rows),
+        'total_rooms': total_rooms,
+        'device_types': [{'device_type': row['device_type'], 'count': row['total']} for row in rows],
+    }
+
+
+def compute_stats():
+    return build_stats(list(stats_queryset()))
+
+
+def read_counters():
+    return counters_payload(dict(StatCounter.objects.values_list('name', 'value')))
+
+
+def counters_payload(values):
+    """Shape ``{counter name: value}`` like ``compute_stats``."""
+    types = sorted(
+        (name.split(':', 2)[2], value)
+        for name, value in values.items()
+        if name.startswith('devices:type:') and value > 0
+    )
+    return {
+        'total_devices': values.get('devices', 0),
+        'online_devices': values.get('devices:status:online', 0),
+        'offline_devices': values.get('devices:status:offline', 0),
+        'error_devices': values.get('devices:status:error', 0),
+        'total_rooms': values.get('rooms', 0),
+        'device_types': [{'device_type': name, 'count': count} for name, count in types],
+    }
+
+
+def bump_counters(deltas):
+    """Apply ``{counter name: delta}`` increments in the current transaction."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    StatCounter.objects.bulk_create([StatCounter(name=name) for name in deltas], ignore_conflicts=True)
+    for name, delta in deltas.items():
+        StatCounter.objects.filter(name=name).update(value=F('value') + delta)
+
+
+def rebuild_counters():
+    """Recompute every counter from the source tables."""
+    counters = Counter(devices=0, rooms=Room.objects.count())
+    for row in Device.objects.order_by().values('device_type', 'status').annotate(n=Count('pk')):
+        counters['devices'] += row['n']
+        counters[f"devices:type:{row['device_type']}"] += row['n']
+        counters[f"devices:status:{row['status']}"] += row['n']
+    with transaction.atomic():
+        StatCounter.objects.all().delete()
+        StatCounter.objects.bulk_create([StatCounter(name=name, value=value) for name, value in counters.items()])
+    return counters
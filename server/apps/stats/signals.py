@@ -0,0 +1,83 @@
+"""Keep ``StatCounter`` rows current while ``settings.STATS_COUNTERS`` is on.
+
+Single-row saves and deletes apply increments, and so do bulk writes from
+the ``changes`` that ``devices_bulk_changed`` carries. A bulk signal sent
+without ``changes`` triggers a full rebuild (one grouped query).
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from server.apps.devices.models import Device
+from server.apps.devices.signals import devices_bulk_changed
+from server.apps.rooms.models import Room
+
+from .queries import bump_counters, rebuild_counters
+
+
+def _enabled():
+    return getattr(settings, 'STATS_COUNTERS', False)
+
+
+def _device_counters(status, device_type):
+    return ('devices', f'devices:status:{status}', f'devices:type:{device_type}')
+
+
+@receiver(post_save, sender=Device, dispatch_uid='stats_device_saved')
+def device_saved(sender, instance, created, **kwargs):
+    if not _enabled():
+        return
+    new = _device_counters(instance.status, instance.device_type)
+    if created:
+        bump_counters({name: 1 for name in new})
+        return
+
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None or not {'status', 'device_type'} <= loaded.keys():
+        # saved without being loaded first; nothing to diff against
+        rebuild_counters()
+        return
+    deltas = dict.fromkeys(new, 1)
+    for name in _device_counters(loaded['status'], loaded['device_type']):
+        deltas[name] = deltas.get(name, 0) - 1
+    bump_counters(deltas)
+
+
+@receiver(post_delete, sender=Device, dispatch_uid='stats_device_deleted')
+def device_deleted(sender, instance, **kwargs):
+    if not _enabled():
+        return
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    status = loaded.get('status', instance.status)
+    device_type = loaded.get('device_type', instance.device_type)
+    bump_counters({name: -1 for name in _device_counters(status, device_type)})
+
+
+@receiver(devices_bulk_changed, dispatch_uid='stats_devices_bulk_changed')
+def devices_bulk_changed_handler(sender, changes=None, **kwargs):
+    if not _enabled():
+        return
+    if changes is None:
+        rebuild_counters()
+        return
+    deltas = Counter()
+    for old, new in changes.values():
+        if old is not None:
+            deltas.subtract(_device_counters(*old))
+        deltas.update(_device_counters(*new))
+    bump_counters(deltas)
+
+
+@receiver(post_save, sender=Room, dispatch_uid='stats_room_saved')
+def room_saved(sender, instance, created, **kwargs):
+    if _enabled() and created:
+        bump_counters({'rooms': 1})
+
+
+@receiver(post_delete, sender=Room, dispatch_uid='stats_room_deleted')
+def room_deleted(sender, instance, **kwargs):
+    if _enabled():
+        bump_counters({'rooms': -1})
@@ -0,0 +1,64 @@
+import datetime
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from server.apps.devices.models import Device
+from server.apps.devices.presence import sweep
+from server.apps.rooms.models import Room
+from server.apps.stats.queries import compute_stats, read_counters
+
+
+class StatsTests(APITestCase):
+    def _populate(self):
+        Room.objects.create(name='Kitchen')
+        Device.objects.create(name='Lamp', device_type='light', status='online')
+        Device.objects.create(name='Strip', device_type='light', status='error')
+        Device.objects.create(name='Plug', device_type='plug')
+
+    def test_endpoint_uses_one_query(self):
+        self._populate()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/stats/')
+        self.assertEqual(response.data, {
+            'total_devices': 3,
+            'online_devices': 1,
+            'offline_devices': 1,
+            'error_devices': 1,
+            'total_rooms': 1,
+            'device_types': [{'device_type': 'light', 'count': 2}, {'device_type': 'plug', 'count': 1}],
+        })
+
+    @override_settings(STATS_COUNTERS=True)
+    def test_counters_track_saves_deletes_and_bulk_writes(self):
+        self._populate()
+        lamp = Device.objects.get(name='Lamp')
+        lamp.status = 'offline'
+        lamp.save()
+        lamp.device_type = 'bulb'
+        lamp.save()
+        Device.objects.get(name='Plug').delete()
+        self.client.post('/api/v1/devices/bulk/', [
+            {'op': 'create', 'name': 'Cam', 'device_type': 'camera', 'status': 'online'},
+        ], format='json')
+
+        self.assertEqual(read_counters(), compute_stats())
+
+    @override_settings(STATS_COUNTERS=True)
+    def test_bulk_signals_apply_deltas_without_rebuilding(self):
+        self._populate()
+        strip, plug = Device.objects.get(name='Strip'), Device.objects.get(name='Plug')
+        Device.objects.filter(name='Lamp').update(last_seen=timezone.now() - datetime.timedelta(hours=1))
+        with mock.patch('server.apps.stats.signals.rebuild_counters', side_effect=AssertionError):
+            response = self.client.post('/api/v1/devices/bulk/', [
+                {'op': 'update', 'id': str(strip.pk), 'status': 'online', 'device_type': 'strip'},
+                {'op': 'update', 'id': str(plug.pk), 'status': 'online'},
+                {'op': 'delete', 'id': str(plug.pk)},
+            ], format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sweep(), 1)
+
+        self.assertEqual(read_counters(), compute_stats())
+        self.assertEqual(read_counters()['online_devices'], 1)
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import async_views
+from .views import StatsView
+
+urlpatterns = [
+    path('stats/', StatsView.as_view(), name='stats'),
+    path('async/stats/', async_views.stats, name='async-stats'),
+]
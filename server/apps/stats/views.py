@@ -0,0 +1,20 @@
+from django.conf import settings
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .queries import compute_stats, read_counters
+
+
+class StatsView(APIView):
+    """Dashboard summary: device totals by status, room count, device types.
+
+    Served from the materialized counters when ``STATS_COUNTERS`` is on,
+    otherwise from one aggregate query over the devices table.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if getattr(settings, 'STATS_COUNTERS', False):
+            return Response(read_counters())
+        return Response(compute_stats())
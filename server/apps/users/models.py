@@ -12,6 +12,8 @@ from django.utils.timezone import now
 class User(models.Model):
     class Meta:
         db_table = "users"
+        # keyset order (username, id) is served by the unique index on
+        # username: usernames never tie, so id is never consulted
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     username = models.CharField(max_length=80, unique=True)
     email = models.EmailField(max_length=120, unique=True)
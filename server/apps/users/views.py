@@ -2,6 +2,7 @@ from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
 
 from server.apps.users.models import User
+from server.pagination import UsernameKeysetPagination
 from .serializers import UserSerializer
 
 
@@ -9,3 +10,4 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('username')
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    pagination_class = UsernameKeysetPagination
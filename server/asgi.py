@@ -5,6 +5,12 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Serve it with an ASGI server, e.g. ``uvicorn server.asgi:application``.
+Long-lived endpoints such as the device event stream (/api/v1/events/)
+only work here, not under runserver/WSGI. The async read views under
+/api/v1/async/ run natively here as well; under WSGI they still work but
+each request gets its own event loop.
 """
 
 import os
@@ -0,0 +1,69 @@
+"""Shared asyncio plumbing: the async (ASGI-native) read views and worker pools.
+
+Django's async ORM runs each query in a worker thread tied to the request.
+``db_slots`` bounds how many async requests run queries or cache calls at
+once (``ASYNC_DB_CONCURRENCY``), and with it the open database connections
+and the SQLite lock contention. The other requests wait as coroutines.
+
+Django's own request signals still take a short hop to a per-request thread
+under ASGI. A slow query therefore occupies one of the bounded slots, not
+one extra thread per waiting poll.
+
+``run_bounded`` is the worker pool of the network scanners (device
+discovery, health checks): it keeps a fixed number of probes in flight
+however many hosts there are.
+"""
+
+import asyncio
+import weakref
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+
+from server.caching import acached_payload
+from server.renderers import dumps
+
+_slots = weakref.WeakKeyDictionary()
+
+
+def db_slots():
+    """The running loop's semaphore for database work."""
+    loop = asyncio.get_running_loop()
+    if loop not in _slots:
+        _slots[loop] = asyncio.Semaphore(getattr(settings, 'ASYNC_DB_CONCURRENCY', 16))
+    return _slots[loop]
+
+
+async def run_bounded(items, worker, concurrency):
+    """Await ``worker(item)`` for every item of ``items``, at most ``concurrency`` at once.
+
+    A fixed pool of tasks pulls from ``items`` lazily, so a huge iterable
+    costs no more memory than the items in flight.
+    """
+    items = iter(items)
+
+    async def drain():
+        # the iterator is shared; tasks only switch at awaits, so next() is safe
+        for item in items:
+            await worker(item)
+
+    await asyncio.gather(*(drain() for _ in range(concurrency)))
+
+
+def json_response(data, status=200):
+    # same bytes as the DRF views' FastJSONRenderer
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def method_not_allowed(request):
+    return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+
+async def cached_json_response(request, resource, build):
+    """Serve ``await build()`` through the response cache with an ETag."""
+    etag, data, not_modified = await acached_payload(request, resource, build)
+    response = HttpResponseNotModified() if not_modified else json_response(data)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,61 @@
+"""Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks never touch the configured databases: they register a throwaway
+SQLite alias pointing at a scratch file, migrate it, and load synthetic rows
+there.
+"""
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.db import connections
+
+
+@contextmanager
+def scratch_database(path, alias='bench', reuse=False, options=None, overrides=None):
+    """Register ``alias`` as a migrated SQLite database stored at ``path``.
+
+    With ``reuse`` an existing file is kept (and only migrated forward), so
+    expensive data sets can be generated once and measured many times.
+    ``options`` overrides the alias' ``OPTIONS`` (connection pragmas etc.),
+    ``overrides`` any other settings key (e.g. ``CONN_MAX_AGE``).
+    """
+    if not reuse:
+        # a stale -wal file would be replayed into the fresh database
+        for stale in (str(path), f'{path}-wal', f'{path}-shm'):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    settings = dict(connections['default'].settings_dict)
+    settings['NAME'] = str(path)
+    if options is not None:
+        settings['OPTIONS'] = dict(options)
+    settings.update(overrides or {})
+    connections.settings[alias] = settings
+    try:
+        call_command('migrate', database=alias, verbosity=0, interactive=False)
+        yield alias
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+
+def timed(fn, repeat):
+    """Run ``fn`` ``repeat`` times and return the per-call durations in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    """Format p50/p95/max of a list of millisecond samples."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f'p50={statistics.median(ordered):.3f}ms p95={p95:.3f}ms max={ordered[-1]:.3f}ms'
@@ -0,0 +1,244 @@
+"""Per-resource response cache for the read-heavy viewsets.
+
+``ResponseCacheMixin`` caches the serialized ``list``/``retrieve`` payload of
+a viewset under a key made of the resource's current version, the request
+path and its sorted query parameters. Every cached payload carries an ETag;
+a request whose ``If-None-Match`` matches is answered 304 before anything is
+fetched or serialized.
+
+Invalidation is by version: writes to a model bump the version of every
+resource whose payload embeds it (``DEPENDENCIES``), which orphans all of
+that resource's entries at once. Bumps happen immediately and again on
+commit, so a reader racing the writing transaction cannot pin stale data
+under the new version.
+
+The cache backend is whatever ``CACHES['default']`` is. The local-memory
+default is per process; deployments with several workers should point it at
+a shared backend (file, redis) so invalidations reach every worker.
+
+With read replicas (``server/db_routing.py``) a version bump can come before
+the replica holds the rows that caused it. Requests pinned to the primary
+bypass the cache and the validators, and replica reads are served but not
+stored while the last bump is younger than ``REPLICA_PIN_SECONDS``.
+
+Viewsets that can derive validators more cheaply than by hashing the payload
+(e.g. from ``updated_at``) override ``get_conditional_validators``; those are
+then evaluated before the cache is even consulted.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
+from rest_framework import status
+from rest_framework.response import Response
+
+from server.db_routing import pinned_to_primary, reading_from_replicas
+from server.renderers import dumps
+
+# model label -> resources whose cached payloads include that model's rows
+DEPENDENCIES = {
+    'devices.Device': ('devices', 'rooms', 'device_categories'),
+    'rooms.Room': ('rooms', 'devices'),
+    'device_categories.DeviceCategory': ('device_categories', 'devices'),
+}
+
+
+def _version_key(resource):
+    return f'api:{resource}:version'
+
+
+def get_version(resource):
+    # Seed from the clock so a version evicted from the cache never comes
+    # back with a value that older entries were stored under.
+    return cache.get_or_set(_version_key(resource), lambda: time.time_ns(), timeout=None)
+
+
+def _bumped_key(resource):
+    return f'api:{resource}:bumped'
+
+
+def _bump(resources):
+    for resource in resources:
+        try:
+            cache.incr(_version_key(resource))
+        except ValueError:
+            cache.set(_version_key(resource), time.time_ns(), timeout=None)
+        if settings.REPLICA_DATABASES:
+            cache.set(_bumped_key(resource), time.time(), timeout=None)
+
+
+def _replica_may_lag(bumped):
+    return bumped is not None and time.time() - bumped < settings.REPLICA_PIN_SECONDS
+
+
+def _bypass_cache(resource):
+    """Whether the current request must neither read nor fill ``resource``'s cache."""
+    if pinned_to_primary():
+        return True
+    return reading_from_replicas() and _replica_may_lag(cache.get(_bumped_key(resource)))
+
+
+async def _abypass_cache(resource):
+    if pinned_to_primary():
+        return True
+    return reading_from_replicas() and _replica_may_lag(await cache.aget(_bumped_key(resource)))
+
+
+def invalidate(*resources):
+    """Drop every cached payload of ``resources``, now and on commit."""
+    _bump(resources)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(resources))
+
+
+def _invalidator(resources):
+    def receiver(sender, **kwargs):
+        invalidate(*resources)
+    return receiver
+
+
+_receivers = []
+
+
+def connect_invalidation():
+    """Connect the invalidation receivers; called from DevicesConfig.ready()."""
+    # imported here: this module is loaded while the app registry populates
+    from server.apps.devices.signals import devices_bulk_changed
+
+    if _receivers:
+        return
+    for label, resources in DEPENDENCIES.items():
+        receiver = _invalidator(resources)
+        _receivers.append(receiver)
+        post_save.connect(receiver, sender=label, weak=False)
+        post_delete.connect(receiver, sender=label, weak=False)
+
+    receiver = _invalidator(DEPENDENCIES['devices.Device'])
+    _receivers.append(receiver)
+    devices_bulk_changed.connect(receiver, weak=False)
+
+
+def _request_digest(path, params):
+    query = urlencode(sorted(params.lists()), doseq=True)
+    return hashlib.md5(f'{path}?{query}'.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def _etag(data):
+    return '"%s"' % hashlib.md5(dumps(data), usedforsecurity=False).hexdigest()
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or etag in (tag.strip() for tag in header.split(','))
+
+
+async def aget_version(resource):
+    return await cache.aget_or_set(_version_key(resource), lambda: time.time_ns(), timeout=None)
+
+
+async def acached_payload(request, resource, build):
+    """Async views' counterpart of ``ResponseCacheMixin``.
+
+    Returns ``(etag, data, not_modified)``. ``build`` is a coroutine function
+    producing the payload; it only runs on a cache miss.
+    """
+    if await _abypass_cache(resource):
+        data = await build()
+        etag = _etag(data)
+        return etag, data, _etag_matches(request, etag)
+    key = f'api:{resource}:{await aget_version(resource)}:async:{_request_digest(request.path, request.GET)}'
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await build()
+        entry = (_etag(data), data)
+        await cache.aset(key, entry, getattr(settings, 'API_CACHE_TIMEOUT', 60))
+    etag, data = entry
+    return etag, data, _etag_matches(request, etag)
+
+
+class ResponseCacheMixin:
+    """Cache ``list``/``retrieve`` payloads of a viewset.
+
+    Set ``cache_resource`` to the resource name used in ``DEPENDENCIES``.
+    """
+    cache_resource = None
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response('list', super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response('retrieve', super().retrieve, request, *args, **kwargs)
+
+    def get_conditional_validators(self, action, request, *args, **kwargs):
+        """Return ``(etag, last_modified)`` without serializing, or None.
+
+        ``etag`` is an unquoted string, ``last_modified`` an aware datetime or
+        None. Returning None falls back to hashing the cached payload.
+        """
+        return None
+
+    def get_cache_key(self, action, request):
+        digest = _request_digest(request.path, request.query_params)
+        return f'api:{self.cache_resource}:{get_version(self.cache_resource)}:{action}:{digest}'
+
+    def _cached_response(self, action, handler, request, *args, **kwargs):
+        if _bypass_cache(self.cache_resource):
+            return self._uncached_response(handler, request, *args, **kwargs)
+        headers = {}
+        validators = self.get_conditional_validators(action, request, *args, **kwargs)
+        if validators is not None:
+            etag, last_modified = validators
+            headers['ETag'] = quote_etag(etag)
+            if last_modified is not None:
+                headers['Last-Modified'] = http_date(last_modified.timestamp())
+            not_modified = get_conditional_response(
+                request,
+                etag=headers['ETag'],
+                last_modified=int(last_modified.timestamp()) if last_modified else None,
+            )
+            if not_modified is not None:
+                return self._with_headers(not_modified, headers)
+
+        key = self.get_cache_key(action, request)
+        if validators is not None:
+            # the validators may see writes the version missed (another
+            # process's cache); keep the payload in step with them
+            key = f'{key}:{etag}'
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = (_etag(response.data), response.data)
+            cache.set(key, entry, getattr(settings, 'API_CACHE_TIMEOUT', 60))
+
+        content_etag, data = entry
+        if validators is None:
+            headers['ETag'] = content_etag
+            if _etag_matches(request, content_etag):
+                return self._with_headers(Response(status=status.HTTP_304_NOT_MODIFIED), headers)
+        return self._with_headers(Response(data), headers)
+
+    def _uncached_response(self, handler, request, *args, **kwargs):
+        # the version-based validators may describe rows this database does
+        # not hold yet, so only the payload's own hash is trusted
+        response = handler(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        headers = {'ETag': _etag(response.data)}
+        if _etag_matches(request, headers['ETag']):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        return self._with_headers(response, headers)
+
+    def _with_headers(self, response, headers):
+        for name, value in headers.items():
+            response[name] = value
+        # let browsers keep the body but revalidate it on every poll
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
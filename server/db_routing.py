@@ -0,0 +1,97 @@
+"""Send API reads to read replicas and everything else to ``default``.
+
+``ReplicaMiddleware`` marks a request as replica-safe when it is a GET/HEAD/
+OPTIONS request from a client that has not written recently. Only then does
+``ReplicaRouter`` route reads of the ``REPLICA_APP_LABELS`` models to one of
+``REPLICA_DATABASES``. Writes, reads inside a transaction, management
+commands and anything outside a request stay on the primary.
+
+A write request (POST/PUT/PATCH/DELETE) sets a short-lived cookie. While it
+lives, that client's reads go to the primary too, so it reads its own writes
+while the replicas catch up (``REPLICA_PIN_SECONDS``).
+
+Replicas lag. Other clients may briefly see older rows. The response cache
+(``server/caching.py``) is skipped by pinned requests and does not store
+replica reads until ``REPLICA_PIN_SECONDS`` after the last write, so a stale
+payload is never cached under the version that write created.
+"""
+
+import contextvars
+import random
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# None outside a request, otherwise whether reads may go to a replica
+_use_replica = contextvars.ContextVar('use_replica', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        if not replicas or not _use_replica.get() or model._meta.app_label not in settings.REPLICA_APP_LABELS:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # lets `migrate --database replica_0` prepare a local SQLite copy;
+        # real replicas get the schema through replication
+        return True
+
+
+def reading_from_replicas():
+    """Whether the current request's reads may be served by a lagging replica."""
+    return bool(settings.REPLICA_DATABASES) and _use_replica.get() is True
+
+
+def pinned_to_primary():
+    """Whether the current request was kept on the primary to read its own writes."""
+    return bool(settings.REPLICA_DATABASES) and _use_replica.get() is False
+
+
+def _pinned(request):
+    return request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+
+
+def _pin(request, response):
+    if request.method not in SAFE_METHODS and settings.REPLICA_DATABASES:
+        response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+
+@sync_and_async_middleware
+def ReplicaMiddleware(get_response):
+    # the async branch keeps async views and event streams on the event loop
+    # under ASGI instead of adapting them through a thread
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _use_replica.set(not _pinned(request))
+            try:
+                response = await get_response(request)
+            finally:
+                _use_replica.reset(token)
+            return _pin(request, response)
+    else:
+        def middleware(request):
+            token = _use_replica.set(not _pinned(request))
+            try:
+                response = get_response(request)
+            finally:
+                _use_replica.reset(token)
+            return _pin(request, response)
+
+    return middleware
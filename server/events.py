@@ -0,0 +1,175 @@
+"""In-process pub/sub feeding the device event stream.
+
+Model signals publish device status changes, deletes and new DeviceLog rows
+to the process-wide ``broker`` once the writing transaction commits.
+Subscribers (one per open event-stream connection) receive the events whose
+topics they asked for: ``device:<id>``, ``room:<id>``, or everything.
+
+Subscribers are plain asyncio queues, so an idle dashboard costs nothing
+but its socket: no polling, no database queries. When nobody is subscribed,
+publishing is skipped before any work (including room lookups) is done.
+
+Each subscriber's queue is bounded; a client that stops reading loses its
+oldest events rather than growing the server's memory. The broker is per
+process; run a single ASGI worker, or put a shared bus in front, for
+events to reach clients connected to other workers.
+"""
+
+import asyncio
+import logging
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(self, loop, topics, maxsize=QUEUE_SIZE):
+        self.loop = loop
+        self.topics = frozenset(topics) if topics else None
+        self.queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def wants(self, topics):
+        return self.topics is None or not self.topics.isdisjoint(topics)
+
+    def _deliver(self, event):
+        # runs on the subscriber's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def subscribe(self, topics=None):
+        """Register a subscription on the running event loop."""
+        subscription = Subscription(asyncio.get_running_loop(), topics)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event, topics):
+        """Deliver ``event`` to matching subscribers; safe from any thread."""
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.wants(topics)]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # the subscriber's loop is gone
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def device_topics(device_id, room_id=None):
+    topics = {f'device:{device_id}'}
+    if room_id is not None:
+        topics.add(f'room:{room_id}')
+    return topics
+
+
+def _publish_on_commit(event, topics):
+    transaction.on_commit(lambda: broker.publish(event, topics))
+
+
+def _device_saved(sender, instance, created, **kwargs):
+    if not broker.has_subscribers:
+        return
+    old_status = (getattr(instance, '_loaded_values', None) or {}).get('status')
+    if not created and old_status == instance.status:
+        return
+    _publish_on_commit({
+        'type': 'device.status',
+        'device': str(instance.pk),
+        'room': str(instance.room_id) if instance.room_id else None,
+        'status': instance.status,
+        'old_status': None if created else old_status,
+        'updated_at': instance.updated_at.isoformat() if instance.updated_at else None,
+    }, device_topics(instance.pk, instance.room_id))
+
+
+def _device_deleted(sender, instance, **kwargs):
+    if not broker.has_subscribers:
+        return
+    _publish_on_commit({
+        'type': 'device.deleted',
+        'device': str(instance.pk),
+        'room': str(instance.room_id) if instance.room_id else None,
+    }, device_topics(instance.pk, instance.room_id))
+
+
+def _devices_bulk_changed(sender, device_ids, **kwargs):
+    if not broker.has_subscribers:
+        return
+    from server.apps.devices.models import Device
+
+    for pk, room_id, status, updated_at in Device.objects.filter(pk__in=device_ids).values_list(
+        'pk', 'room_id', 'status', 'updated_at'
+    ):
+        _publish_on_commit({
+            'type': 'device.changed',
+            'device': str(pk),
+            'room': str(room_id) if room_id else None,
+            'status': status,
+            'updated_at': updated_at.isoformat() if updated_at else None,
+        }, device_topics(pk, room_id))
+
+
+def _publish_logs(logs):
+    if not broker.has_subscribers or not logs:
+        return
+    from server.apps.devices.models import Device
+
+    rooms = dict(Device.objects.filter(pk__in={log.device_id for log in logs}).values_list('pk', 'room_id'))
+    for log in logs:
+        _publish_on_commit({
+            'type': 'device_log.created',
+            'device': str(log.device_id),
+            'log': {
+                'id': str(log.pk),
+                'action': log.action,
+                'old_value': log.old_value,
+                'new_value': log.new_value,
+                'timestamp': log.timestamp.isoformat() if log.timestamp else None,
+            },
+        }, device_topics(log.device_id, rooms.get(log.device_id)))
+
+
+def _log_saved(sender, instance, created, **kwargs):
+    if created:
+        _publish_logs([instance])
+
+
+def _logs_created(sender, logs, **kwargs):
+    _publish_logs(logs)
+
+
+def connect_publishers():
+    """Connect the publishing receivers; called from DevicesConfig.ready()."""
+    from server.apps.device_logs.signals import logs_created
+    from server.apps.devices.signals import devices_bulk_changed
+
+    post_save.connect(_device_saved, sender='devices.Device', dispatch_uid='events_device_saved')
+    post_delete.connect(_device_deleted, sender='devices.Device', dispatch_uid='events_device_deleted')
+    post_save.connect(_log_saved, sender='device_logs.DeviceLog', dispatch_uid='events_log_saved')
+    devices_bulk_changed.connect(_devices_bulk_changed, dispatch_uid='events_devices_bulk_changed')
+    logs_created.connect(_logs_created, dispatch_uid='events_logs_created')
@@ -0,0 +1,177 @@
+"""Keyset (seek) pagination shared by the API viewsets.
+
+Pages are addressed by the sort key of the last row already seen rather than
+by an OFFSET, so fetching page N costs the same index range scan as page 1 and
+rows inserted behind the cursor do not shift later pages. The cursor is an
+opaque, URL-safe token; clients follow the ``next`` link until it is null.
+
+Each subclass declares an ``ordering`` whose fields are non-null and whose
+last field is unique (the primary key), and should be backed by a composite
+index over the same columns.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(position):
+    """Encode a JSON-serializable position as an opaque URL-safe token."""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Inverse of ``encode_cursor``; raises ValueError on malformed tokens."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (TypeError, UnicodeError, binascii.Error) as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def keyset_filter(ordering, position):
+    """Rows strictly after ``position`` in ``ordering``.
+
+    Builds ``(a, b) > (x, y)`` as nested ORs, honouring '-' descending fields.
+    """
+    clause = None
+    equal = Q()
+    for name, value in zip(ordering, position):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        term = equal & Q(**{f'{field}__{lookup}': value})
+        clause = term if clause is None else clause | term
+        equal &= Q(**{field: value})
+    return clause
+
+
+class KeysetPagination(BasePagination):
+    ordering = ('pk',)
+    page_size = api_settings.PAGE_SIZE or 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """``paginate_queryset`` for async views, over the async ORM."""
+        return self._page([row async for row in self._page_queryset(queryset, request)])
+
+    def _page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.read_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position))
+        # fetch one extra row to learn whether another page exists
+        return queryset[:self.page_size + 1]
+
+    def _page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = self.get_position(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+            except (KeyError, ValueError):
+                pass
+            else:
+                if size > 0:
+                    return min(size, self.max_page_size)
+        return self.page_size
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    # -- cursor handling -------------------------------------------------
+
+    def _field_names(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def _model_field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def get_position(self, row):
+        """Return the ordering key of ``row`` as a list of JSON-safe values.
+
+        ``row`` is a model instance or a ``.values()`` dict.
+        """
+        if isinstance(row, dict):
+            row = self.model(**{name: row[name] for name in self._field_names()})
+        position = []
+        for name in self._field_names():
+            value = getattr(row, name)
+            position.append(self._model_field(name).value_to_string(row) if value is not None else None)
+        return position
+
+    def seek_filter(self, position):
+        return keyset_filter(self.ordering, position)
+
+    def read_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            position = decode_cursor(token)
+            names = self._field_names()
+            if not isinstance(position, list) or len(position) != len(names):
+                raise ValueError
+            return [self._model_field(name).to_python(value) for name, value in zip(names, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class NameKeysetPagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class UsernameKeysetPagination(KeysetPagination):
+    ordering = ('username', 'id')
+
+
+class TimestampKeysetPagination(KeysetPagination):
+    """Newest first, as DeviceLog lists have always been returned."""
+    ordering = ('-timestamp', '-id')
@@ -0,0 +1,111 @@
+"""Sparse fieldsets for read endpoints: ``?fields=`` and ``?expand=``.
+
+``fields`` names the keys to return, ``expand`` the nested objects to embed
+on top of them::
+
+    /api/v1/devices/?fields=id,name,status                 flat keys only
+    /api/v1/devices/?fields=id,name&expand=room            ... plus the room
+    /api/v1/devices/?expand=                               every flat key, no nesting
+
+Without either parameter responses are unchanged. Naming a relation in
+``fields`` expands it too. Views push the ``Projection`` down to the query
+(``only()``, ``select_related()``, the count annotations) so unrequested
+columns, joins and subqueries are never executed. Serializers take it via
+``SparseFieldsMixin``.
+"""
+
+from functools import lru_cache
+
+from rest_framework import serializers
+
+
+@lru_cache(maxsize=None)
+def _readable_fields(serializer_class):
+    return tuple(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+def _names(raw):
+    return [name.strip() for name in raw.split(',') if name.strip()]
+
+
+class Projection:
+    def __init__(self, keys, expand):
+        # keys: the response keys in serializer order, or None for all of them
+        self.keys = keys
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request, serializer_class, relations=()):
+        """Parse the query parameters; unknown names are a 400."""
+        readable = _readable_fields(serializer_class)
+        params = request.query_params
+
+        fields = None
+        if 'fields' in params:
+            fields = _names(params['fields'])
+            unknown = [name for name in fields if name not in readable]
+            if unknown:
+                raise serializers.ValidationError({'fields': [f'Unknown field "{name}".' for name in unknown]})
+
+        if 'expand' in params:
+            expand = _names(params['expand'])
+            unknown = [name for name in expand if name not in relations]
+            if unknown:
+                raise serializers.ValidationError({'expand': [f'Cannot expand "{name}".' for name in unknown]})
+        else:
+            expand = [name for name in relations if fields is None or name in fields]
+        expand = tuple(name for name in relations if name in expand)
+
+        if fields is None and expand == tuple(relations):
+            return cls(None, expand)
+        selected = set(expand).union(fields if fields is not None else readable) - (set(relations) - set(expand))
+        return cls(tuple(name for name in readable if name in selected), expand)
+
+    def only(self, *always):
+        """Model fields for ``QuerySet.only()``, or None to load every column.
+
+        ``always`` adds columns the view needs itself (pagination keys).
+        """
+        if self.keys is None:
+            return None
+        return tuple(dict.fromkeys(always + self.keys))
+
+
+class SparseFieldsMixin:
+    """Serializer mixin accepting ``fields=`` (a ``Projection``'s keys)."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name, field in list(self.fields.items()):
+                if name not in fields and not field.write_only:
+                    self.fields.pop(name)
+
+
+class SparseFieldsViewMixin:
+    """Viewset mixin applying the request's ``Projection`` to list and retrieve.
+
+    ``projection_relations`` are the nested serializers ``expand`` may name,
+    ``projection_always`` the columns ``get_queryset`` must load regardless.
+    """
+    projection_relations = ()
+    projection_always = ('id',)
+    projection_actions = ('list', 'retrieve')
+
+    def get_projection(self):
+        if not hasattr(self, '_projection'):
+            if self.action in self.projection_actions:
+                self._projection = Projection.from_request(
+                    self.request, self.get_serializer_class(), self.projection_relations)
+            else:
+                self._projection = Projection(None, tuple(self.projection_relations))
+        return self._projection
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        only = self.get_projection().only(*self.projection_always)
+        return queryset if only is None else queryset.only(*only)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_projection().keys)
+        return super().get_serializer(*args, **kwargs)
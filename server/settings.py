@@ -14,6 +14,8 @@ import os
 from pathlib import Path
 import dotenv
 
+from server.sqlite_profiles import sqlite_profile
+
 dotenv.load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +56,10 @@ INSTALLED_APPS = [
     'server.apps.users',
     'server.apps.device_logs',
     'server.apps.device_categories',
+    'server.apps.stats',
+    'server.apps.device_usage',
+    'server.apps.search',
+    'server.apps.health',
 ]
 
 MIDDLEWARE = [
@@ -62,6 +68,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'server.db_routing.ReplicaMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -99,14 +106,169 @@ WSGI_APPLICATION = 'server.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+#
+# SQLITE_PROFILE picks the connection pragmas and reuse policy, see
+# server/sqlite_profiles.py: "tuned" (WAL, IMMEDIATE transactions) or
+# "baseline" (Django's defaults). `manage.py bench_sqlite_concurrency`
+# compares the two. CONN_MAX_AGE > 0 keeps connections open across requests;
+# only set it when serving over WSGI, not ASGI.
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        **sqlite_profile(
+            os.environ.get('SQLITE_PROFILE', 'tuned'),
+            mmap_size=int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            cache_kib=int(os.environ.get('SQLITE_CACHE_KIB', 64 * 1024)),
+            busy_timeout=float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+            conn_max_age=int(os.environ.get('CONN_MAX_AGE', 0)),
+        ),
+    }
+}
+
+# Read replicas (server/db_routing.py). DATABASE_REPLICAS is a comma-separated
+# list of SQLite files kept in sync with the primary, registered as
+# replica_0, replica_1, ... Safe API requests read the REPLICA_APP_LABELS
+# models from a random replica. A client that just wrote reads from the
+# primary for REPLICA_PIN_SECONDS.
+
+REPLICA_DATABASES = []
+for _index, _path in enumerate(p.strip() for p in os.environ.get('DATABASE_REPLICAS', '').split(',') if p.strip()):
+    DATABASES[f'replica_{_index}'] = {**DATABASES['default'], 'NAME': _path, 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica_{_index}')
+
+REPLICA_APP_LABELS = ('devices', 'device_logs', 'device_categories', 'rooms', 'stats', 'device_usage')
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+DATABASE_ROUTERS = ['server.db_routing.ReplicaRouter']
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+#
+# List endpoints use keyset pagination (server/pagination.py); viewsets pick
+# the subclass matching their ordering and its composite index.
+
+#
+# JSON goes through server/renderers.py, which uses orjson when it is
+# installed (`pip install orjson`) and DRF's stdlib encoder otherwise.
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'server.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    'DEFAULT_RENDERER_CLASSES': [
+        'server.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'server.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Serve /api/v1/stats/ from materialized counters maintained by model
+# signals. Run `manage.py rebuild_stats_counters` after turning this on.
+STATS_COUNTERS = os.environ.get('STATS_COUNTERS', '0') == '1'
+
+# Build /api/v1/devices/ list pages from .values() rows instead of
+# DeviceSerializer instances (server/apps/devices/fastpath.py); same JSON
+DEVICE_LIST_FAST_PATH = os.environ.get('DEVICE_LIST_FAST_PATH', '1') == '1'
+
+# Days a deleted device's tombstone is kept for /api/v1/devices/changes/
+DEVICE_TOMBSTONE_TTL_DAYS = int(os.environ.get('DEVICE_TOMBSTONE_TTL_DAYS', 30))
+
+# Buffered DeviceLog ingestion (server/apps/device_logs/ingest.py)
+DEVICE_LOG_INGEST = {
+    'FLUSH_SIZE': int(os.environ.get('DEVICE_LOG_FLUSH_SIZE', 500)),
+    'FLUSH_INTERVAL': float(os.environ.get('DEVICE_LOG_FLUSH_INTERVAL', 1.0)),
+    'MAX_PENDING': int(os.environ.get('DEVICE_LOG_MAX_PENDING', 50_000)),
+    'MAX_ATTEMPTS': int(os.environ.get('DEVICE_LOG_MAX_ATTEMPTS', 5)),
+}
+
+# Device presence (server/apps/devices/presence.py): heartbeats are coalesced
+# and last_seen is flushed every DEVICE_PRESENCE_FLUSH_INTERVAL seconds;
+# `manage.py sweep_presence` marks devices silent for DEVICE_OFFLINE_AFTER
+# seconds offline.
+DEVICE_PRESENCE = {
+    'FLUSH_INTERVAL': float(os.environ.get('DEVICE_PRESENCE_FLUSH_INTERVAL', 5.0)),
+    'OFFLINE_AFTER': int(os.environ.get('DEVICE_OFFLINE_AFTER', 90)),
+    'MAX_PENDING': int(os.environ.get('DEVICE_PRESENCE_MAX_PENDING', 100_000)),
+}
+
+# Device discovery (server/apps/devices/discovery.py): `manage.py discover`
+# and POST /api/v1/devices/discover/ probe each host's DISCOVERY_PORT for a
+# JSON description at DISCOVERY_PATH. The API is for admins, runs one scan at
+# a time in the background and only scans private LAN networks of at most
+# DISCOVERY_MAX_HOSTS addresses.
+DEVICE_DISCOVERY = {
+    'PORT': int(os.environ.get('DISCOVERY_PORT', 80)),
+    'PATH': os.environ.get('DISCOVERY_PATH', '/device-info'),
+    'TIMEOUT': float(os.environ.get('DISCOVERY_TIMEOUT', 1.0)),
+    'CONCURRENCY': int(os.environ.get('DISCOVERY_CONCURRENCY', 256)),
+    'MAX_HOSTS': int(os.environ.get('DISCOVERY_MAX_HOSTS', 4096)),
+    'BACKGROUND': os.environ.get('DISCOVERY_BACKGROUND', '1') == '1',
+}
+
+# Device health checks (server/apps/health/checker.py): `manage.py
+# check_health` connects to HEALTH_PORT on every active device, at most
+# HEALTH_CONCURRENCY at once, and records the round-trip latency served at
+# /api/v1/health/. Latency histograms are kept for HEALTH_RETENTION_HOURS.
+DEVICE_HEALTH = {
+    'PORT': int(os.environ.get('HEALTH_PORT', 80)),
+    'TIMEOUT': float(os.environ.get('HEALTH_TIMEOUT', 2.0)),
+    'CONCURRENCY': int(os.environ.get('HEALTH_CONCURRENCY', 256)),
+    'RETENTION_HOURS': int(os.environ.get('HEALTH_RETENTION_HOURS', 24 * 7)),
+}
+
+# DeviceLog retention (server/apps/device_logs/retention.py), enforced by
+# `manage.py enforce_log_retention`. DEVICE_LOG_ACTION_TTL_DAYS overrides the
+# default per action, e.g. "heartbeat=7,status_change=365". A TTL of 0
+# keeps that action forever.
+DEVICE_LOG_RETENTION = {
+    'DEFAULT_TTL_DAYS': int(os.environ.get('DEVICE_LOG_TTL_DAYS', 90)),
+    'ACTION_TTL_DAYS': {
+        action.strip(): int(days)
+        for action, _, days in (
+            item.partition('=') for item in os.environ.get('DEVICE_LOG_ACTION_TTL_DAYS', '').split(',') if item.strip()
+        )
+    },
+    # expired rows are appended here as monthly gzip NDJSON segments; empty
+    # disables archiving
+    'ARCHIVE_DIR': os.environ.get('DEVICE_LOG_ARCHIVE_DIR', str(BASE_DIR / 'log_archive')),
+    'CHUNK_SIZE': int(os.environ.get('DEVICE_LOG_RETENTION_CHUNK_SIZE', 5000)),
+    # minute-level usage rollups are dropped after this; hour/day are kept
+    'MINUTE_ROLLUP_TTL_DAYS': int(os.environ.get('DEVICE_USAGE_MINUTE_TTL_DAYS', 14)),
+}
+
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Backs the API response cache (server/caching.py). CACHE_BACKEND is one of
+# locmem (per-process, the default), file, redis, or a dotted backend path.
+
+_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+_cache_backend = os.environ.get('CACHE_BACKEND', 'locmem')
+
+CACHES = {
+    'default': {
+        'BACKEND': _CACHE_BACKENDS.get(_cache_backend, _cache_backend),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'smarthome-api'),
     }
 }
 
+# Seconds a cached list/detail payload may live without being invalidated
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 60))
 
+# Async read views (/api/v1/async/...): how many requests per process may
+# run queries or cache calls at once; the rest wait as coroutines
+ASYNC_DB_CONCURRENCY = int(os.environ.get('ASYNC_DB_CONCURRENCY', 16))
 
 
 # Password validation
@@ -0,0 +1,53 @@
+"""SQLite connection profiles for ``DATABASES``.
+
+``baseline`` is Django's default: rollback journal, deferred transactions,
+a 5 second busy timeout and a fresh connection per request.
+
+``tuned`` is meant for serving the API and ingesting logs concurrently:
+
+- ``journal_mode=WAL`` lets readers proceed while a writer commits, instead
+  of every write locking the whole file;
+- ``synchronous=NORMAL`` fsyncs at checkpoints rather than every commit
+  (a power cut may lose the last transactions, never corrupt the file);
+- ``mmap_size``, ``cache_size`` and ``temp_store=MEMORY`` keep hot pages and
+  sort scratch space in memory;
+- ``transaction_mode=IMMEDIATE`` takes the write lock when a transaction
+  begins, so two writers queue on the busy timeout instead of deadlocking
+  on a lock upgrade and failing with "database is locked";
+- ``CONN_MAX_AGE`` defaults to 0, a fresh connection (and the pragmas
+  above) per request. Django's persistent connections are per thread, and
+  under ASGI every async view and event stream runs its ORM calls on
+  arbitrary threads, so reused connections pile up instead of being shared.
+  Only raise ``conn_max_age`` for a WSGI deployment; health checks are on so
+  a reused connection that went away is replaced rather than failing.
+
+WAL needs the database on a local filesystem, and it leaves ``-wal`` and
+``-shm`` files next to the database.
+"""
+
+PROFILES = ('baseline', 'tuned')
+
+
+def sqlite_profile(name, mmap_size=256 * 1024 * 1024, cache_kib=64 * 1024, busy_timeout=20, conn_max_age=0):
+    """Return the ``DATABASES`` entry keys (OPTIONS, CONN_MAX_AGE...) for ``name``."""
+    if name == 'baseline':
+        return {'OPTIONS': {}, 'CONN_MAX_AGE': 0}
+    if name != 'tuned':
+        raise ValueError(f'unknown SQLite profile {name!r}, expected one of {", ".join(PROFILES)}')
+    pragmas = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA mmap_size={int(mmap_size)}',
+        # negative cache_size is in KiB rather than pages
+        f'PRAGMA cache_size=-{int(cache_kib)}',
+        'PRAGMA temp_store=MEMORY',
+    )
+    return {
+        'OPTIONS': {
+            'init_command': '; '.join(pragmas),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': busy_timeout,
+        },
+        'CONN_MAX_AGE': conn_max_age,
+        'CONN_HEALTH_CHECKS': True,
+    }
@@ -0,0 +1,210 @@
+import asyncio
+import datetime
+import io
+import os
+import tempfile
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.sessions.models import Session
+from django.db import connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from server.apps.device_logs.models import DeviceLog
+from server.apps.devices.models import Device
+from server.apps.devices.signals import devices_bulk_changed
+from server.apps.rooms.models import Room
+from server.db_routing import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter
+from server.events import Broker, device_topics
+from server.parsers import FastJSONParser
+from server.renderers import FastJSONRenderer
+from server.sqlite_profiles import sqlite_profile
+
+
+class BrokerTests(SimpleTestCase):
+    def test_delivers_by_topic_and_drops_oldest_when_full(self):
+        async def scenario():
+            broker = Broker()
+            lamp = broker.subscribe(['device:lamp'])
+            kitchen = broker.subscribe(['room:kitchen'])
+            everything = broker.subscribe()
+            everything.queue = asyncio.Queue(1)
+
+            broker.publish({'n': 1}, device_topics('lamp', 'kitchen'))
+            broker.publish({'n': 2}, device_topics('plug'))
+            await asyncio.sleep(0)
+
+            received = [[s.queue.get_nowait() for _ in range(s.queue.qsize())] for s in (lamp, kitchen, everything)]
+            broker.unsubscribe(lamp)
+            return received, everything.dropped, broker
+
+        (lamp, kitchen, everything), dropped, broker = asyncio.run(scenario())
+        self.assertEqual(lamp, [{'n': 1}])
+        self.assertEqual(kitchen, [{'n': 1}])
+        self.assertEqual(everything, [{'n': 2}])
+        self.assertEqual(dropped, 1)
+
+
+class EventPublishingTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('server.events.broker', mock.Mock(has_subscribers=True))
+        self.broker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [(event['type'], event['device'], topics) for (event, topics), _ in self.broker.publish.call_args_list]
+
+    def test_device_writes_publish_to_device_and_room_topics_after_commit(self):
+        room = Room.objects.create(name='Hall')
+        with self.captureOnCommitCallbacks() as callbacks:
+            lamp = Device.objects.create(name='Lamp', device_type='light', room=room)
+            lamp.name = 'Hall Lamp'
+            lamp.save()
+            plug = Device.objects.create(name='Plug', device_type='plug')
+            plug_id = plug.pk
+            devices_bulk_changed.send(sender=Device, device_ids=[plug_id])
+            plug.delete()
+            self.broker.publish.assert_not_called()
+        for callback in callbacks:
+            callback()
+
+        lamp_topics = {f'device:{lamp.pk}', f'room:{room.pk}'}
+        plug_topics = {f'device:{plug_id}'}
+        # the rename is no status change
+        self.assertEqual(self.published(), [
+            ('device.status', str(lamp.pk), lamp_topics),
+            ('device.status', str(plug_id), plug_topics),
+            ('device.changed', str(plug_id), plug_topics),
+            ('device.deleted', str(plug_id), plug_topics),
+        ])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    Device.objects.create(name='Lamp', device_type='light')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+
+
+class SqliteProfileTests(SimpleTestCase):
+    def pragmas(self, profile):
+        with tempfile.TemporaryDirectory() as tmp:
+            settings = {**connections['default'].settings_dict, 'NAME': os.path.join(tmp, 'db.sqlite3'), **profile}
+            connection = DatabaseWrapper(settings, alias='profile_test')
+            try:
+                with connection.cursor() as cursor:
+                    return {
+                        pragma: cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+                        for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store', 'busy_timeout')
+                    }
+            finally:
+                connection.close()
+
+    def test_tuned_profile_applies_pragmas_on_connect(self):
+        profile = sqlite_profile('tuned', mmap_size=1 << 20, cache_kib=2048, busy_timeout=7)
+        self.assertEqual(profile['CONN_MAX_AGE'], 0)
+        self.assertEqual(self.pragmas(profile), {
+            'journal_mode': 'wal', 'synchronous': 1, 'mmap_size': 1 << 20,
+            'cache_size': -2048, 'temp_store': 2, 'busy_timeout': 7000,
+        })
+
+    def test_baseline_keeps_sqlite_defaults(self):
+        pragmas = self.pragmas(sqlite_profile('baseline'))
+        self.assertEqual(pragmas['journal_mode'], 'delete')
+        self.assertEqual(pragmas['synchronous'], 2)
+        with self.assertRaises(ValueError):
+            sqlite_profile('fast')
+
+
+@override_settings(REPLICA_DATABASES=['replica_0'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def route(self, request):
+        """Run ``request`` through the middleware, recording where reads would go."""
+        routed = {}
+
+        def view(request):
+            router = ReplicaRouter()
+            routed['device'] = router.db_for_read(Device)
+            routed['log'] = router.db_for_read(DeviceLog)
+            routed['session'] = router.db_for_read(Session)
+            routed['write'] = router.db_for_write(Device)
+            return HttpResponse()
+
+        return routed, ReplicaMiddleware(view)(request)
+
+    def test_safe_requests_read_from_replicas(self):
+        routed, response = self.route(RequestFactory().get('/api/v1/devices/'))
+        self.assertEqual(routed, {'device': 'replica_0', 'log': 'replica_0', 'session': 'default', 'write': 'default'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        # outside a request nothing is routed to a replica
+        self.assertEqual(ReplicaRouter().db_for_read(Device), 'default')
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        routed, response = self.route(RequestFactory().patch('/api/v1/devices/x/'))
+        self.assertEqual(routed['device'], 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        factory = RequestFactory()
+        factory.cookies[PIN_COOKIE] = '1'
+        routed, _ = self.route(factory.get('/api/v1/devices/'))
+        self.assertEqual(routed['device'], 'default')
+
+    def test_async_views_stay_on_the_event_loop(self):
+        routed = {}
+
+        async def view(request):
+            routed['device'] = ReplicaRouter().db_for_read(Device)
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        asyncio.run(middleware(RequestFactory().get('/api/v1/devices/')))
+        self.assertEqual(routed['device'], 'replica_0')
+        response = asyncio.run(middleware(RequestFactory().post('/api/v1/devices/')))
+        self.assertEqual(routed['device'], 'default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_without_replicas_everything_uses_default(self):
+        routed, response = self.route(RequestFactory().post('/api/v1/devices/'))
+        self.assertEqual(set(routed.values()), {'default'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+class FastJSONTests(SimpleTestCase):
+    payload = {
+        'id': uuid.UUID('6f1c1f5e-3b0a-4c55-9d2f-2f7c1b9d0a11'),
+        'seen': datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        'price': Decimal('1.50'),
+        'name': 'Lamp \u2028 \u00e9',
+        'counts': {1: 2},
+        'items': [None, True, 1.5, ('a', 'b')],
+    }
+
+    def test_renders_like_drf(self):
+        expected = JSONRenderer().render(self.payload)
+        self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+        with mock.patch('server.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+        # indented output is left to the stdlib
+        self.assertEqual(
+            FastJSONRenderer().render(self.payload, 'application/json; indent=2'),
+            JSONRenderer().render(self.payload, 'application/json; indent=2'),
+        )
+
+    def test_parses_like_drf(self):
+        body = b'{"name": "Lamp \xc3\xa9", "values": [1, 2.5, null]}'
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for parser in (FastJSONParser(), JSONParser()):
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(b'{"name": NaN}'))
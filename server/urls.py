@@ -31,4 +31,8 @@ urlpatterns = [
     path(f'{baseurl}', include('server.apps.users.urls')),
     path(f'{baseurl}', include('server.apps.device_logs.urls')),
     path(f'{baseurl}', include('server.apps.device_categories.urls')),
+    path(f'{baseurl}', include('server.apps.stats.urls')),
+    path(f'{baseurl}', include('server.apps.device_usage.urls')),
+    path(f'{baseurl}', include('server.apps.search.urls')),
+    path(f'{baseurl}', include('server.apps.health.urls')),
 ]